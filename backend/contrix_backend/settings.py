@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 import os
+from kombu import Queue
+from celery.schedules import crontab
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -29,7 +32,8 @@ SECRET_KEY = os.environ.get("SECRET_KEY", "django-insecure-b2**51-z$wo-t6jc0^5qe
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = int(os.environ.get("DEBUG", default=0))
 
-ALLOWED_HOSTS = os.environ.get("ALLOWED_HOSTS", "localhost 127.0.0.1").split(" ")
+# "backend" is the host WAHA uses for webhooks and media downloads (see WAHA_MEDIA_BASE_URL)
+ALLOWED_HOSTS = os.environ.get("ALLOWED_HOSTS", "localhost 127.0.0.1 backend").split(" ")
 
 
 # Application definition
@@ -46,6 +50,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'corsheaders',
     'django_celery_results',
+    'django_celery_beat',
     
     # Local apps
     'core',
@@ -135,6 +140,11 @@ STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Property images (core.media): disk cache of MediaAsset bytes, and the backend URL WAHA nodes fetch them from
+MEDIA_CACHE_DIR = os.path.join(MEDIA_ROOT, 'cache')
+WAHA_MEDIA_BASE_URL = os.environ.get('WAHA_MEDIA_BASE_URL', 'http://backend:8000')
+# Contact CSVs waiting for the import worker (kept out of MEDIA_ROOT, which nginx serves)
+IMPORT_UPLOAD_DIR = os.path.join(BASE_DIR, 'imports')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -147,20 +157,135 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOWED_ORIGINS = os.environ.get("CORS_ALLOWED_ORIGINS", "http://localhost:3000 http://localhost:3001").split(" ")
 CSRF_TRUSTED_ORIGINS = os.environ.get("CSRF_TRUSTED_ORIGINS", "http://localhost:3000 http://localhost:3001").split(" ")
 
+# Redis (broker, shared cache, counters)
+REDIS_URL = os.environ.get("REDIS_URL", "redis://redis:6379/0")
+
+# Cache Configuration (shared across gunicorn and celery workers)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get("CACHE_URL", "redis://redis:6379/1"),
+        'KEY_PREFIX': 'contrix',
+    }
+}
+
 # Celery Configuration
-CELERY_BROKER_URL = os.environ.get("REDIS_URL", "redis://redis:6379/0")
+CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = "django-db"
 CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Queue topology: each workload gets its own queue (and worker pool in docker-compose)
+# so a long WhatsApp send run can't starve imports, Meta posts or session lifecycle work.
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_QUEUES = (
+    Queue('default'),
+    Queue('orchestration'),
+    Queue('sending'),
+    Queue('meta'),
+    Queue('imports'),
+    Queue('sessions'),
+)
+CELERY_TASK_ROUTES = {
+    'core.tasks.start_campaign_task': {'queue': 'orchestration'},
+    'core.tasks.check_campaign_completion': {'queue': 'orchestration'},
+    'core.tasks.reconcile_campaign_stats_task': {'queue': 'orchestration'},
+    'core.tasks.check_waha_nodes': {'queue': 'orchestration'},
+    'core.tasks.apply_waha_acks': {'queue': 'orchestration'},
+    'core.tasks.dispatch_scheduled_campaigns': {'queue': 'orchestration'},
+    'core.tasks.maintain_messagelog_partitions': {'queue': 'orchestration'},
+    'core.tasks.refresh_message_rollups': {'queue': 'orchestration'},
+    'core.tasks.rebuild_suppression_list': {'queue': 'orchestration'},
+    'core.tasks.flush_phone_counters_task': {'queue': 'orchestration'},
+    'core.tasks.reset_phone_daily_counters': {'queue': 'orchestration'},
+    'core.tasks.prepare_campaign_audience': {'queue': 'orchestration'},
+    'core.tasks.process_phone_queue': {'queue': 'sending'},
+    'core.tasks.post_campaign_to_meta': {'queue': 'meta'},
+    'core.tasks.import_contacts_task': {'queue': 'imports'},
+    'core.tasks.provision_waha_session': {'queue': 'sessions'},
+    'core.tasks.restart_waha_session': {'queue': 'sessions'},
+    'core.tasks.stop_waha_session': {'queue': 'sessions'},
+    'core.tasks.teardown_waha_session': {'queue': 'sessions'},
+}
+# Send tasks are long; don't let one worker hoard a backlog of them
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Redis priorities: 0 (instant broadcasts) is served before 5 (scheduled campaigns).
+# visibility_timeout must outlive a send time slice for acks_late tasks.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+    'visibility_timeout': 60 * 60,
+}
+# process_phone_queue yields and re-enqueues the rest of its targets after this long
+SEND_TASK_SLICE_SECONDS = int(os.environ.get('SEND_TASK_SLICE_SECONDS', 15 * 60))
+
+# Periodic jobs (run by `celery -A contrix_backend beat`). The database scheduler
+# syncs these entries into django_celery_beat, where they can be tuned from the admin.
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_BEAT_SCHEDULE = {
+    'dispatch-scheduled-campaigns': {
+        'task': 'core.tasks.dispatch_scheduled_campaigns',
+        'schedule': 60,
+    },
+    'maintain-messagelog-partitions': {
+        'task': 'core.tasks.maintain_messagelog_partitions',
+        'schedule': 24 * 60 * 60,
+    },
+    # Hourly analytics rollups (core.rollups); each run rebuilds the hours since the last one
+    # plus hours changed by receipts and retries
+    'refresh-message-rollups': {
+        'task': 'core.tasks.refresh_message_rollups',
+        'schedule': 5 * 60,
+    },
+    # Opt-outs are mirrored to Redis as they happen; this repairs anything missed
+    'rebuild-suppression-list': {
+        'task': 'core.tasks.rebuild_suppression_list',
+        'schedule': 24 * 60 * 60,
+    },
+    # Phone send counters live in Redis (core.phone_counters)
+    'flush-phone-counters': {
+        'task': 'core.tasks.flush_phone_counters_task',
+        'schedule': 60,
+    },
+    'reset-phone-daily-counters': {
+        'task': 'core.tasks.reset_phone_daily_counters',
+        'schedule': crontab(hour=0, minute=0),
+    },
+    'reconcile-campaign-stats': {
+        'task': 'core.tasks.reconcile_campaign_stats_task',
+        'schedule': 60 * 60,
+    },
+    'check-waha-nodes': {
+        'task': 'core.tasks.check_waha_nodes',
+        'schedule': 60,
+    },
+    # Safety net in case a drain was lost; normally drains are triggered by the webhook
+    'apply-waha-acks': {
+        'task': 'core.tasks.apply_waha_acks',
+        'schedule': 60,
+    },
+}
+
 # DRF Configuration
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50
 }
 
+# MessageLog partitions (core.partitions): monthly, created ahead by a daily job.
+# With retention set, older partitions are archived to MESSAGELOG_ARCHIVE_DIR as .csv.gz.
+MESSAGELOG_PARTITIONS_AHEAD = 3
+MESSAGELOG_RETENTION_MONTHS = int(os.environ.get('MESSAGELOG_RETENTION_MONTHS', 0))
+MESSAGELOG_ARCHIVE_DIR = os.environ.get('MESSAGELOG_ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+
+# Analytics rollups (core.rollups): each refresh rebuilds the hours since the previous one
+# and the hours receipts and retries touched. This lookback is only the fallback when the
+# last-refresh watermark is missing (first run, Redis flushed).
+ROLLUP_LOOKBACK_HOURS = int(os.environ.get('ROLLUP_LOOKBACK_HOURS', 48))
+
 # Meta API Configuration (Facebook & Instagram)
 META_APP_ID = os.environ.get('META_APP_ID', '1634605851238506')
 META_APP_SECRET = os.environ.get('META_APP_SECRET', 'feb408ef1153acdb19324943d756380c')
@@ -189,3 +314,18 @@ CSRF_COOKIE_SECURE = True
 # CORS_ALLOWED_ORIGINS = ['https://contrix.zaikron.com']
 
 WAHA_API_KEY = os.environ.get('WAHA_API_KEY', '')
+
+# Delivery/read receipts: WAHA posts message.ack events here (must be reachable from WAHA
+# and allowed by ALLOWED_HOSTS, e.g. http://backend:8000/api/webhooks/waha/). Empty = disabled.
+WAHA_WEBHOOK_URL = os.environ.get('WAHA_WEBHOOK_URL', '')
+# Required with WAHA_WEBHOOK_URL: WAHA signs each event with it and unsigned events are rejected
+WAHA_WEBHOOK_HMAC_KEY = os.environ.get('WAHA_WEBHOOK_HMAC_KEY', '')
+if WAHA_WEBHOOK_URL and not WAHA_WEBHOOK_HMAC_KEY:
+    raise ImproperlyConfigured("WAHA_WEBHOOK_URL requires WAHA_WEBHOOK_HMAC_KEY")
+
+# Backend address WAHA downloads campaign images from (core.media); its host must be in
+# ALLOWED_HOSTS, or every sendImage download is rejected with a 400 DisallowedHost
+WAHA_MEDIA_BASE_URL = os.environ.get('WAHA_MEDIA_BASE_URL', 'http://backend:8000')
+
+# WAHA containers registered on first migrate (further nodes are added via /api/waha-nodes/)
+WAHA_NODES = os.environ.get('WAHA_NODES', 'http://waha:3000 http://waha2:3000').split(' ')
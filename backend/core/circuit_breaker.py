@@ -0,0 +1,163 @@
+import time
+import logging
+from django.conf import settings
+from redis.exceptions import RedisError
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker for one WAHA node, shared by every worker via Redis.
+
+    closed    -> calls flow; outcomes are counted in BUCKET_SECONDS buckets over WINDOW_SECONDS.
+                 Once MIN_CALLS have been seen and FAILURE_RATE of them failed, the circuit opens.
+    open      -> calls are refused instantly until COOLDOWN_SECONDS have passed.
+    half_open -> exactly one probe call is let through (SET NX); success closes, failure re-opens.
+
+    Redis errors fail open (calls allowed) so a Redis hiccup never stops sending.
+    """
+    WINDOW_SECONDS = getattr(settings, 'CIRCUIT_WINDOW_SECONDS', 60)
+    BUCKET_SECONDS = 10
+    MIN_CALLS = getattr(settings, 'CIRCUIT_MIN_CALLS', 5)
+    FAILURE_RATE = getattr(settings, 'CIRCUIT_FAILURE_RATE', 0.5)
+    COOLDOWN_SECONDS = getattr(settings, 'CIRCUIT_COOLDOWN_SECONDS', 30)
+    PROBE_TIMEOUT_SECONDS = 15
+
+    def __init__(self, name, client=None):
+        self.name = name
+        self._client = client
+        prefix = f"cb:{name}"
+        self.state_key = f"{prefix}:state"
+        self.probe_key = f"{prefix}:probe"
+        self.bucket_prefix = f"{prefix}:bucket:"
+
+    @property
+    def redis(self):
+        return self._client or get_redis()
+
+    # --- state -----------------------------------------------------------
+
+    def _read_state(self):
+        data = self.redis.hgetall(self.state_key)
+        return data.get('state', CLOSED), float(data.get('opened_at', 0))
+
+    def state(self):
+        try:
+            state, opened_at = self._read_state()
+        except RedisError:
+            return CLOSED
+        if state == OPEN and time.time() >= opened_at + self.COOLDOWN_SECONDS:
+            return HALF_OPEN
+        return state
+
+    def retry_after(self):
+        """Seconds until the next probe may be attempted (0 when calls are allowed)."""
+        try:
+            state, opened_at = self._read_state()
+        except RedisError:
+            return 0
+        if state == CLOSED:
+            return 0
+        return max(0.0, opened_at + self.COOLDOWN_SECONDS - time.time())
+
+    def allow(self):
+        """Should a call be attempted right now? Claims the probe slot when half-open."""
+        try:
+            state, opened_at = self._read_state()
+            if state == CLOSED:
+                return True
+            if time.time() < opened_at + self.COOLDOWN_SECONDS:
+                return False
+            # Cooldown over: a single caller gets to probe the node
+            if self.redis.set(self.probe_key, '1', nx=True, ex=self.PROBE_TIMEOUT_SECONDS):
+                self.redis.hset(self.state_key, 'state', HALF_OPEN)
+                return True
+            return False
+        except RedisError as e:
+            logger.warning(f"CIRCUIT_REDIS_ERROR ({self.name}): {e}")
+            return True
+
+    # --- outcomes --------------------------------------------------------
+
+    def _bucket_key(self, now):
+        return f"{self.bucket_prefix}{int(now // self.BUCKET_SECONDS)}"
+
+    def _window_totals(self, now):
+        current = int(now // self.BUCKET_SECONDS)
+        count = self.WINDOW_SECONDS // self.BUCKET_SECONDS
+        pipe = self.redis.pipeline()
+        for bucket in range(current - count + 1, current + 1):
+            pipe.hmget(f"{self.bucket_prefix}{bucket}", 'ok', 'fail')
+        ok = fail = 0
+        for bucket_ok, bucket_fail in pipe.execute():
+            ok += int(bucket_ok or 0)
+            fail += int(bucket_fail or 0)
+        return ok, fail
+
+    def _count(self, field, now):
+        key = self._bucket_key(now)
+        pipe = self.redis.pipeline()
+        pipe.hincrby(key, field, 1)
+        pipe.expire(key, self.WINDOW_SECONDS + self.BUCKET_SECONDS)
+        pipe.execute()
+
+    def record_success(self):
+        now = time.time()
+        try:
+            state, _ = self._read_state()
+            if state != CLOSED:
+                self.close()
+                logger.info(f"CIRCUIT_CLOSED: {self.name} recovered")
+            self._count('ok', now)
+        except RedisError as e:
+            logger.warning(f"CIRCUIT_REDIS_ERROR ({self.name}): {e}")
+
+    def record_failure(self):
+        now = time.time()
+        try:
+            state, _ = self._read_state()
+            if state == HALF_OPEN:
+                self.trip(now)
+                return
+            if state == OPEN:
+                return
+            self._count('fail', now)
+            ok, fail = self._window_totals(now)
+            total = ok + fail
+            if total >= self.MIN_CALLS and fail / total >= self.FAILURE_RATE:
+                self.trip(now)
+        except RedisError as e:
+            logger.warning(f"CIRCUIT_REDIS_ERROR ({self.name}): {e}")
+
+    def trip(self, now=None):
+        now = now or time.time()
+        pipe = self.redis.pipeline()
+        pipe.hset(self.state_key, mapping={'state': OPEN, 'opened_at': now})
+        pipe.delete(self.probe_key)
+        pipe.execute()
+        logger.warning(f"CIRCUIT_OPEN: {self.name} refusing calls for {self.COOLDOWN_SECONDS}s")
+
+    def close(self):
+        pipe = self.redis.pipeline()
+        pipe.delete(self.state_key, self.probe_key)
+        for key in self.redis.scan_iter(f"{self.bucket_prefix}*"):
+            pipe.delete(key)
+        pipe.execute()
+
+
+def breaker_for(api_url):
+    """The shared breaker guarding one WAHA node."""
+    return CircuitBreaker(api_url)
+
+
+def is_node_failure(status_code=None, exception=None):
+    """Outcomes that say something about the node's health (not about the request)."""
+    if exception is not None:
+        return True
+    return status_code is not None and status_code >= 500
@@ -0,0 +1,56 @@
+import hashlib
+from django.core.cache import cache
+from .models import WhatsAppGroup
+
+# Bumped on every group sync; old cache entries simply stop being addressed and expire.
+GROUPS_VERSION_KEY = 'core:groups_version'
+RESOLVE_TTL = 60 * 60
+
+
+def _groups_version():
+    version = cache.get(GROUPS_VERSION_KEY)
+    if version is None:
+        cache.add(GROUPS_VERSION_KEY, 1, None)
+        version = cache.get(GROUPS_VERSION_KEY, 1)
+    return version
+
+
+def invalidate_group_resolution():
+    """Call after groups are synced, edited or deleted."""
+    try:
+        cache.incr(GROUPS_VERSION_KEY)
+    except ValueError:
+        cache.set(GROUPS_VERSION_KEY, 2, None)
+
+
+def resolve_group_jids(jids):
+    """
+    Map JIDs to the serialized WhatsAppGroup rows currently synced for them
+    ({jid: [group, ...]}, one JID can be synced on several phones).
+    One query per distinct JID set, then served from cache until the next sync.
+    """
+    # Local import: serializers import this module
+    from .serializers import WhatsAppGroupSerializer
+
+    unique_jids = sorted(set(jids))
+    if not unique_jids:
+        return {}
+
+    digest = hashlib.sha1('\n'.join(unique_jids).encode()).hexdigest()
+    cache_key = f'core:groups:{_groups_version()}:{digest}'
+    resolved = cache.get(cache_key)
+    if resolved is not None:
+        return resolved
+
+    resolved = {}
+    groups = WhatsAppGroup.objects.filter(group_id__in=unique_jids).order_by('name', 'id')
+    for group in WhatsAppGroupSerializer(groups, many=True).data:
+        resolved.setdefault(group['group_id'], []).append(dict(group))
+
+    cache.set(cache_key, resolved, RESOLVE_TTL)
+    return resolved
+
+
+def groups_for_collection(group_ids, resolved):
+    """Serialized groups for one collection, in the collection's JID order."""
+    return [group for jid in dict.fromkeys(group_ids) for group in resolved.get(jid, [])]
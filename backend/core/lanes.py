@@ -0,0 +1,46 @@
+import logging
+from redis.exceptions import RedisError
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# A phone has two lanes: instant work (broadcasts, quick sends) and bulk campaigns.
+# While a phone's instant lane is open, bulk senders on that phone stop at the next
+# target boundary and hand their remaining targets back to the queue, so the phone
+# keeps a single pacing budget and instant work starts within one target's sends.
+URGENT_LANE_TTL_SECONDS = 2 * 60 * 60
+# How long a pre-empted bulk sender waits before checking the lane again
+BULK_YIELD_SECONDS = 30
+
+
+def urgent_lane_key(phone_id):
+    return f"phone:{phone_id}:urgent"
+
+
+def open_urgent_lane(phone_id):
+    """One more instant task is pending or running on this phone."""
+    try:
+        pipe = get_redis().pipeline()
+        pipe.incr(urgent_lane_key(phone_id))
+        # Backstop for a worker that died without closing its lane
+        pipe.expire(urgent_lane_key(phone_id), URGENT_LANE_TTL_SECONDS)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"LANES_REDIS_ERROR (phone {phone_id}): {e}")
+
+
+def close_urgent_lane(phone_id):
+    try:
+        client = get_redis()
+        if client.decr(urgent_lane_key(phone_id)) <= 0:
+            client.delete(urgent_lane_key(phone_id))
+    except RedisError as e:
+        logger.warning(f"LANES_REDIS_ERROR (phone {phone_id}): {e}")
+
+
+def has_urgent_work(phone_id):
+    """Should bulk sending on this phone step aside? Redis errors never block sending."""
+    try:
+        return int(get_redis().get(urgent_lane_key(phone_id)) or 0) > 0
+    except RedisError:
+        return False
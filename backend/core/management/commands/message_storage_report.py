@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+
+def _mib(n):
+    return f"{(n or 0) / 1024 ** 2:,.1f} MiB"
+
+
+class Command(BaseCommand):
+    help = "Report MessageLog/MessageBody storage, and what it would be with message_text copied into every row."
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT pg_total_relation_size('core_messagelog'),
+                       pg_total_relation_size('core_messagebody'),
+                       (SELECT count(*) FROM core_messagebody)
+            """)
+            log_table, body_table, bodies = cursor.fetchone()
+            cursor.execute("""
+                SELECT count(*),
+                       count(l.body_id),
+                       coalesce(sum(pg_column_size(l.message_text)), 0),
+                       coalesce(sum(pg_column_size(b.content)), 0)
+                FROM core_messagelog l
+                LEFT JOIN core_messagebody b ON b.id = l.body_id
+            """)
+            rows, linked, inline_bytes, referenced_bytes = cursor.fetchone()
+
+        # "Before": every linked row carrying its own copy of the body
+        before = log_table + referenced_bytes
+        after = log_table + body_table
+        self.stdout.write(f"MessageLog rows:      {rows:,} ({linked:,} linked to a body, {rows - linked:,} inline)")
+        self.stdout.write(f"Distinct bodies:      {bodies:,}")
+        self.stdout.write(f"Inline message_text:  {_mib(inline_bytes)}")
+        self.stdout.write(f"Before (copied text): ~{_mib(before)}")
+        self.stdout.write(f"After (deduplicated): {_mib(after)}  (core_messagelog {_mib(log_table)} + core_messagebody {_mib(body_table)})")
+        if before:
+            self.stdout.write(self.style.SUCCESS(f"Saved ~{_mib(before - after)} ({100 * (before - after) / before:.1f}%)"))
+        self.stdout.write(
+            "Space freed by the backfill is reused by new rows; run VACUUM FULL or pg_repack "
+            "on core_messagelog to return it to the OS."
+        )
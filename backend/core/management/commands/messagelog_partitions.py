@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.partitions import (
+    ARCHIVE_DIR, MONTHS_AHEAD, RETENTION_MONTHS, archive_partition, ensure_partitions,
+    expired_partitions, list_partitions, restore_archive,
+)
+
+
+class Command(BaseCommand):
+    help = "Manage monthly MessageLog partitions: create ahead, archive expired ones, restore archives."
+
+    def add_arguments(self, parser):
+        sub = parser.add_subparsers(dest='action', required=True)
+
+        sub.add_parser('list', help="Show attached partitions")
+
+        create = sub.add_parser('create', help="Create partitions for this month and the coming ones")
+        create.add_argument('--months-ahead', type=int, default=MONTHS_AHEAD)
+
+        archive = sub.add_parser('archive', help="Detach partitions past retention, write them to .csv.gz and drop them")
+        archive.add_argument('--retention-months', type=int, default=RETENTION_MONTHS)
+        archive.add_argument('--dir', default=ARCHIVE_DIR)
+        archive.add_argument('--dry-run', action='store_true')
+
+        restore = sub.add_parser('restore', help="Re-attach a partition from an archive file")
+        restore.add_argument('path')
+
+    def handle(self, *args, **options):
+        action = options['action']
+        if action == 'list':
+            for month, name in list_partitions():
+                self.stdout.write(f"{name}  {month:%Y-%m}")
+        elif action == 'create':
+            created = ensure_partitions(options['months_ahead'])
+            self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partitions: {', '.join(created) or '-'}"))
+        elif action == 'archive':
+            if not options['retention_months']:
+                raise CommandError("Set --retention-months (or MESSAGELOG_RETENTION_MONTHS) to archive anything.")
+            for month, name in expired_partitions(options['retention_months']):
+                if options['dry_run']:
+                    self.stdout.write(f"Would archive {name}")
+                    continue
+                path, rows = archive_partition(name, options['dir'])
+                self.stdout.write(self.style.SUCCESS(f"Archived {name}: {rows} rows -> {path}"))
+        elif action == 'restore':
+            name, rows = restore_archive(options['path'])
+            self.stdout.write(self.style.SUCCESS(f"Restored {rows} rows into {name}"))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.nodes import nodes_with_load, plan_rebalance, session_name_for
+from core.tasks import provision_waha_session, teardown_waha_session
+
+
+class Command(BaseCommand):
+    help = "Plan (and optionally apply) phone moves off overloaded or unhealthy WAHA nodes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--apply', action='store_true',
+            help="Reassign phones and re-provision their sessions. Moved phones must be re-paired (QR/code).",
+        )
+
+    def handle(self, *args, **options):
+        for node in nodes_with_load():
+            state = 'healthy' if node.is_healthy else 'UNHEALTHY'
+            active = '' if node.is_active else ' (inactive)'
+            self.stdout.write(f"{node.name:<20} {node.session_count}/{node.max_sessions} sessions  {state}{active}")
+
+        moves = plan_rebalance()
+        if not moves:
+            self.stdout.write(self.style.SUCCESS("Nodes are balanced, nothing to move."))
+            return
+
+        self.stdout.write("")
+        for phone, source, target in moves:
+            source_name = source.name if source else '-'
+            self.stdout.write(f"MOVE {phone.name} ({phone.id}): {source_name} -> {target.name}")
+
+        if not options['apply']:
+            self.stdout.write(self.style.WARNING(f"{len(moves)} moves planned. Re-run with --apply to execute."))
+            return
+
+        for phone, source, target in moves:
+            old_api_url, old_session = phone.api_url, phone.session_name
+            with transaction.atomic():
+                phone.node = target
+                phone.api_url = target.api_url
+                phone.session_name = session_name_for(target, phone.id)
+                phone.status = 'DISCONNECTED'
+                phone.save(update_fields=['node', 'api_url', 'session_name', 'status', 'updated_at'])
+                phone.record_transition('PENDING')
+            if source is not None:
+                teardown_waha_session.delay(old_api_url, old_session)
+            provision_waha_session.delay(phone.id)
+
+        self.stdout.write(self.style.SUCCESS(f"Applied {len(moves)} moves. Re-pair the moved phones."))
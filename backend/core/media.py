@@ -0,0 +1,121 @@
+import io
+import os
+import mmap
+import hashlib
+import logging
+from functools import lru_cache
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from PIL import Image, UnidentifiedImageError
+from .models import MediaAsset
+
+logger = logging.getLogger(__name__)
+
+# Property images. Bytes live in MediaAsset (Postgres) and are written once to a
+# content-addressed disk cache, then served memory-mapped at /api/media/<sha256>/.
+# WAHA is handed that URL, so a campaign photo is never re-uploaded per recipient:
+# every node fetches it from the backend over the internal network.
+MEDIA_CACHE_DIR = getattr(settings, 'MEDIA_CACHE_DIR', os.path.join(settings.MEDIA_ROOT, 'cache'))
+# Backend address as seen from the WAHA containers
+MEDIA_BASE_URL = getattr(settings, 'WAHA_MEDIA_BASE_URL', 'http://backend:8000')
+MAX_MEDIA_BYTES = 5 * 1024 * 1024  # WhatsApp image limit
+CHUNK_SIZE = 256 * 1024
+
+_FORMATS = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp'}
+
+
+class InvalidMedia(ValueError):
+    pass
+
+
+def image_type(data):
+    """Content type of an image WhatsApp accepts, judged from the bytes (not the upload's claim)."""
+    if not data:
+        raise InvalidMedia("Empty file")
+    if len(data) > MAX_MEDIA_BYTES:
+        raise InvalidMedia(f"Images are limited to {MAX_MEDIA_BYTES // (1024 * 1024)} MB")
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.verify()
+            image_format = image.format
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise InvalidMedia("Not a readable image")
+    if image_format not in _FORMATS:
+        raise InvalidMedia(f"Unsupported image format {image_format}; use JPEG, PNG or WebP")
+    return _FORMATS[image_format]
+
+
+def store_media(data, filename=''):
+    """MediaAsset for these bytes, created on first upload (identical files share one)."""
+    content_type = image_type(data)
+    digest = hashlib.sha256(data).hexdigest()
+    asset = MediaAsset.objects.defer('data').filter(sha256=digest).first()
+    if asset is not None:
+        return asset
+    try:
+        with transaction.atomic():
+            return MediaAsset.objects.create(
+                sha256=digest, content_type=content_type, filename=filename[:255], size=len(data), data=data
+            )
+    except IntegrityError:
+        return MediaAsset.objects.defer('data').get(sha256=digest)
+
+
+def cache_path(sha256):
+    return os.path.join(MEDIA_CACHE_DIR, sha256[:2], sha256)
+
+
+def cached_file(sha256):
+    """Path of the cached bytes, written from the database on first use."""
+    path = cache_path(sha256)
+    if os.path.exists(path):
+        return path
+    data = MediaAsset.objects.filter(sha256=sha256).values_list('data', flat=True).get()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.partial'
+    with open(tmp_path, 'wb') as cached:
+        cached.write(data)
+    # Content-addressed: concurrent writers produce the same file, last rename wins
+    os.replace(tmp_path, path)
+    return path
+
+
+@lru_cache(maxsize=1024)
+def _media_info(sha256):
+    asset = MediaAsset.objects.filter(sha256=sha256).values('content_type', 'size').get()
+    return asset['content_type'], asset['size']
+
+
+def media_info(sha256):
+    """(content type, size) of an asset, or None. Cached per process: an asset never changes under its hash."""
+    try:
+        return _media_info(sha256)
+    except MediaAsset.DoesNotExist:
+        # Not cached, so an upload arriving later is found
+        return None
+
+
+@lru_cache(maxsize=64)
+def mapped(sha256):
+    """Read-only mapping of a cached file, kept per process; pages are shared via the OS cache."""
+    with open(cached_file(sha256), 'rb') as cached:
+        return mmap.mmap(cached.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def iter_media(sha256):
+    view = mapped(sha256)
+    for offset in range(0, len(view), CHUNK_SIZE):
+        yield view[offset:offset + CHUNK_SIZE]
+
+
+def media_path(asset):
+    return f'/api/media/{asset.sha256}/'
+
+
+def media_reference(asset):
+    """WAHA `file` argument: a URL the node downloads from, instead of the bytes."""
+    return {
+        'mimetype': asset.content_type,
+        'filename': asset.filename or f'{asset.sha256[:12]}.{asset.content_type.split("/")[1]}',
+        'url': f'{MEDIA_BASE_URL}{media_path(asset)}',
+    }
@@ -0,0 +1,23 @@
+import hashlib
+from functools import lru_cache
+from django.db import IntegrityError, transaction
+from .models import MessageBody
+
+
+def content_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=1024)
+def body_id_for(content):
+    """Id of the MessageBody holding content, created on first use. Bodies are immutable, so ids are cached per worker."""
+    digest = content_hash(content)
+    body_id = MessageBody.objects.filter(sha256=digest).values_list('id', flat=True).first()
+    if body_id is not None:
+        return body_id
+    try:
+        with transaction.atomic():
+            return MessageBody.objects.create(sha256=digest, content=content).id
+    except IntegrityError:
+        # Another worker stored the same body first
+        return MessageBody.objects.get(sha256=digest).id
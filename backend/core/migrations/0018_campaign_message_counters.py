@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:25
+
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    """Seed the new counters from existing logs in one grouped UPDATE."""
+    schema_editor.execute(
+        """
+        UPDATE core_campaign c
+        SET sent_count = s.sent, failed_count = s.failed,
+            delivered_count = s.delivered, read_count = s.read
+        FROM (
+            SELECT campaign_id,
+                   COUNT(*) FILTER (WHERE status IN ('SENT', 'DELIVERED', 'READ')) AS sent,
+                   COUNT(*) FILTER (WHERE status = 'FAILED') AS failed,
+                   COUNT(*) FILTER (WHERE status IN ('DELIVERED', 'READ')) AS delivered,
+                   COUNT(*) FILTER (WHERE status = 'READ') AS read
+            FROM core_messagelog
+            WHERE campaign_id IS NOT NULL
+            GROUP BY campaign_id
+        ) s
+        WHERE c.id = s.campaign_id
+        """
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_contactcategory_campaign_target_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='delivered_count',
+            field=models.IntegerField(default=0, help_text='Messages DELIVERED or READ'),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='failed_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='read_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='sent_count',
+            field=models.IntegerField(default=0, help_text='Messages not failed (SENT, DELIVERED or READ)'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:26
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build indexes without locking writes on the (large) log table
+    atomic = False
+
+    dependencies = [
+        ('core', '0018_campaign_message_counters'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='messagelog',
+            index=models.Index(fields=['-sent_at', '-id'], name='msglog_sent_at_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='messagelog',
+            index=models.Index(fields=['campaign', '-sent_at'], name='msglog_campaign_sent_at_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_messagelog_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='whatsappgroup',
+            name='group_id',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+    ]
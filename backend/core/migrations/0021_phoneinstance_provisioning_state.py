@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_whatsappgroup_group_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='phoneinstance',
+            name='provisioning_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='phoneinstance',
+            name='provisioning_history',
+            field=models.JSONField(blank=True, default=list, help_text='Recent lifecycle transitions (newest last)'),
+        ),
+        migrations.AddField(
+            model_name='phoneinstance',
+            name='provisioning_state',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROVISIONING', 'Provisioning'), ('READY', 'Ready'), ('RESTARTING', 'Restarting'), ('STOPPING', 'Stopping'), ('STOPPED', 'Stopped'), ('FAILED', 'Failed')], default='READY', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='phoneinstance',
+            name='provisioning_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:28
+
+import django.db.models.deletion
+from urllib.parse import urlparse
+from django.conf import settings
+from django.db import migrations, models
+
+
+def register_existing_nodes(apps, schema_editor):
+    """Register the configured nodes plus any node already used by a phone, and link phones."""
+    WahaNode = apps.get_model('core', 'WahaNode')
+    PhoneInstance = apps.get_model('core', 'PhoneInstance')
+
+    urls = [u for u in getattr(settings, 'WAHA_NODES', []) if u]
+    urls += [u for u in PhoneInstance.objects.values_list('api_url', flat=True).distinct() if u not in urls]
+    for api_url in urls:
+        base_name = urlparse(api_url).hostname or api_url
+        name, suffix = base_name, 2
+        while WahaNode.objects.filter(name=name).exclude(api_url=api_url).exists():
+            name, suffix = f"{base_name}-{suffix}", suffix + 1
+        node, _ = WahaNode.objects.get_or_create(api_url=api_url, defaults={'name': name})
+        # Existing deployments may already run more phones per node than a fresh
+        # Core node allows; never start out "over capacity".
+        hosted = PhoneInstance.objects.filter(api_url=api_url).count()
+        if hosted > node.max_sessions:
+            node.max_sessions = hosted
+            node.save(update_fields=['max_sessions'])
+        PhoneInstance.objects.filter(api_url=api_url).update(node=node)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_phoneinstance_provisioning_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WahaNode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(help_text='e.g., waha2', max_length=100, unique=True)),
+                ('api_url', models.CharField(help_text='WAHA API URL (e.g. http://waha2:3000)', max_length=255, unique=True)),
+                ('max_sessions', models.IntegerField(default=1, help_text="WAHA Core hosts a single 'default' session; Plus can host more")),
+                ('is_active', models.BooleanField(default=True, help_text='Inactive nodes receive no new phones')),
+                ('is_healthy', models.BooleanField(default=True)),
+                ('last_health_check', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='phoneinstance',
+            name='node',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='phones', to='core.wahanode'),
+        ),
+        migrations.RunPython(register_existing_nodes, migrations.RunPython.noop),
+    ]
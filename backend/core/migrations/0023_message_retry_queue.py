@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:31
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Concurrent index build on the log table
+    atomic = False
+
+    dependencies = [
+        ('core', '0022_wahanode_registry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='recovered_count',
+            field=models.IntegerField(default=0, help_text='Messages that succeeded only after a retry'),
+        ),
+        migrations.AddField(
+            model_name='messagelog',
+            name='attempts',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='messagelog',
+            name='error_class',
+            field=models.CharField(blank=True, default='', help_text='e.g. timeout, server_error, rejected (see core.retries)', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='messagelog',
+            name='next_retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name='messagelog',
+            index=models.Index(condition=models.Q(('next_retry_at__isnull', False)), fields=['next_retry_at'], name='msglog_retry_queue_idx'),
+        ),
+    ]
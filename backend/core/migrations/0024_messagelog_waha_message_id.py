@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:32
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Concurrent index build on the log table
+    atomic = False
+
+    dependencies = [
+        ('core', '0023_message_retry_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messagelog',
+            name='waha_message_id',
+            field=models.CharField(blank=True, help_text='WAHA message key, matched by delivery/read receipts', max_length=128, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name='messagelog',
+            index=models.Index(fields=['waha_message_id'], name='msglog_waha_message_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_messagelog_waha_message_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='first_sent_at',
+            field=models.DateTimeField(blank=True, help_text='First successful WhatsApp send (time-to-first-send = first_sent_at - started_at)', null=True),
+        ),
+    ]
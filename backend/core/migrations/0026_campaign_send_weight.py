@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_campaign_first_sent_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='send_weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text="Share of a shared phone's send rate relative to other running campaigns"),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_campaign_send_weight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='recurrence',
+            field=models.CharField(choices=[('NONE', 'One-off'), ('DAILY', 'Daily'), ('WEEKLY', 'Weekly')], default='NONE', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='scheduled_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='campaignsettings',
+            name='send_window_end',
+            field=models.TimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='campaignsettings',
+            name='send_window_start',
+            field=models.TimeField(blank=True, help_text='Empty = any time', null=True),
+        ),
+        migrations.AlterField(
+            model_name='campaign',
+            name='status',
+            field=models.CharField(choices=[('DRAFT', 'Draft'), ('SCHEDULED', 'Scheduled'), ('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('PAUSED', 'Paused'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='DRAFT', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='CampaignAudience',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contact_ids', models.JSONField(default=list)),
+                ('group_ids', models.JSONField(default=list)),
+                ('prepared_at', models.DateTimeField(auto_now=True)),
+                ('campaign', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='audience', to='core.campaign')),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_campaign_scheduling'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messagelog',
+            name='template_vars',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='messagelog',
+            name='message_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
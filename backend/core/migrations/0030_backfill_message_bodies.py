@@ -0,0 +1,66 @@
+from django.db import migrations, transaction
+
+BATCH_SIZE = 5000
+
+# Bodies for one chunk of logs, walked in id order (keyset, so every chunk is an index range scan)
+INSERT_BODIES = """
+    INSERT INTO core_messagebody (sha256, content, created_at)
+    SELECT DISTINCT encode(sha256(convert_to(src.content, 'UTF8')), 'hex'), src.content, now()
+    FROM (
+        SELECT CASE WHEN l.template_vars IS NULL THEN l.message_text ELSE p.content END AS content
+        FROM core_messagelog l
+        LEFT JOIN core_property p ON p.id = l.property_id
+        WHERE l.id > %s::uuid AND l.id <= %s::uuid AND l.body_id IS NULL
+    ) src
+    WHERE src.content IS NOT NULL AND src.content <> ''
+    ON CONFLICT (sha256) DO NOTHING
+"""
+
+LINK_BODIES = """
+    UPDATE core_messagelog l
+    SET body_id = b.id, message_text = ''
+    FROM core_messagelog src
+    LEFT JOIN core_property p ON p.id = src.property_id
+    JOIN core_messagebody b ON b.sha256 = encode(sha256(convert_to(
+        CASE WHEN src.template_vars IS NULL THEN src.message_text ELSE p.content END, 'UTF8')), 'hex')
+    WHERE l.id = src.id AND src.id > %s::uuid AND src.id <= %s::uuid AND src.body_id IS NULL
+"""
+
+
+def backfill_message_bodies(apps, schema_editor):
+    """
+    Move message_text into MessageBody in chunks, each in its own transaction, so the
+    table is never locked for long; a re-run after an interruption skips linked rows.
+    Personalized rows (template_vars set) point at their property's current template.
+    """
+    connection = schema_editor.connection
+    last_id = '00000000-0000-0000-0000-000000000000'
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT max(id::text) FROM (
+                    SELECT id FROM core_messagelog WHERE id > %s::uuid ORDER BY id LIMIT %s
+                ) chunk
+                """,
+                [last_id, BATCH_SIZE],
+            )
+            chunk_end = cursor.fetchone()[0]
+        if chunk_end is None:
+            break
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(INSERT_BODIES, [last_id, chunk_end])
+            cursor.execute(LINK_BODIES, [last_id, chunk_end])
+        last_id = chunk_end
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0029_message_bodies'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_message_bodies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+import re
+from datetime import datetime, timezone as dt_timezone
+from django.db import migrations
+from core.partitions import MONTHS_AHEAD, add_months, create_partition_sql, month_start
+
+LEGACY_TABLE = 'core_messagelog_unpartitioned'
+
+
+def partition_messagelog(apps, schema_editor):
+    """
+    Rebuild core_messagelog as a table range-partitioned by sent_at (monthly).
+
+    Postgres requires the partition key in every unique constraint, so the primary key
+    becomes (id, sent_at); Django keeps treating id as the pk, which stays unique because
+    ids are UUIDs. Every index and foreign key is recreated under its original name.
+    Rows are copied in one transaction: run during a maintenance window on large tables.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE core_messagelog RENAME TO {LEGACY_TABLE}')
+        cursor.execute(
+            """
+            SELECT indexdef FROM pg_indexes
+            WHERE tablename = %s AND indexname <> %s
+            """,
+            [LEGACY_TABLE, 'core_messagelog_pkey'],
+        )
+        index_defs = [
+            re.sub(rf' ON (ONLY )?(\S+\.)?{LEGACY_TABLE} ', ' ON core_messagelog ', row[0])
+            for row in cursor.fetchall()
+        ]
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f'
+            """,
+            [LEGACY_TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute(
+            f"""
+            CREATE TABLE core_messagelog (LIKE {LEGACY_TABLE} INCLUDING DEFAULTS INCLUDING STORAGE)
+            PARTITION BY RANGE (sent_at)
+            """
+        )
+        cursor.execute('ALTER TABLE core_messagelog ADD PRIMARY KEY (id, sent_at)')
+
+        cursor.execute(f'SELECT min(sent_at) FROM {LEGACY_TABLE}')
+        oldest = cursor.fetchone()[0]
+        current = month_start(datetime.now(dt_timezone.utc))
+        month = month_start(oldest) if oldest else current
+        while month <= add_months(current, MONTHS_AHEAD):
+            cursor.execute(create_partition_sql(month))
+            month = add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO core_messagelog SELECT * FROM {LEGACY_TABLE}')
+        cursor.execute(f'DROP TABLE {LEGACY_TABLE}')
+
+        for index_def in index_defs:
+            cursor.execute(index_def)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE core_messagelog ADD CONSTRAINT {name} {definition}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_backfill_message_bodies'),
+    ]
+
+    operations = [
+        # Irreversible: going back means copying every row into a plain table again
+        migrations.RunPython(partition_messagelog),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_partition_messagelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('platform', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('error_class', models.CharField(blank=True, default='', max_length=30)),
+                ('count', models.IntegerField(default=0)),
+                ('campaign', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.campaign')),
+                ('phone_instance', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.phoneinstance')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='msgrollup_hour_idx'), models.Index(fields=['campaign', 'hour'], name='msgrollup_campaign_hour_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_message_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='messagelog',
+            name='error_class',
+            field=models.CharField(blank=True, default='', help_text='e.g. timeout, server_error, rejected (see core.retries); suppressed or duplicate when SKIPPED', max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='messagelog',
+            name='status',
+            field=models.CharField(choices=[('SENT', 'Sent'), ('DELIVERED', 'Delivered'), ('READ', 'Read'), ('FAILED', 'Failed'), ('SKIPPED', 'Skipped')], default='SENT', max_length=20),
+        ),
+    ]
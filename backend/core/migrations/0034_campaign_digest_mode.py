@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0033_messagelog_skipped'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='digest_mode',
+            field=models.BooleanField(default=False, help_text='Send all properties to a recipient as one combined message (split at WhatsApp length limits)'),
+        ),
+    ]
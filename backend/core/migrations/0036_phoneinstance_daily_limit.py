@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0035_media_assets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='phoneinstance',
+            name='daily_limit',
+            field=models.PositiveIntegerField(default=0, help_text='Max successful sends per day (TIME_ZONE); 0 = unlimited'),
+        ),
+    ]
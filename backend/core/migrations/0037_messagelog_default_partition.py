@@ -0,0 +1,17 @@
+from django.db import migrations
+from core.partitions import DEFAULT_PARTITION, PARENT_TABLE
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_phoneinstance_daily_limit'),
+    ]
+
+    operations = [
+        # Inserts past the last monthly partition land here instead of failing
+        migrations.RunSQL(
+            f'CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT',
+            f'DROP TABLE IF EXISTS {DEFAULT_PARTITION}',
+        ),
+    ]
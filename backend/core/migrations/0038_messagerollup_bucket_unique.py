@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_messagelog_default_partition'),
+    ]
+
+    operations = [
+        # Buckets written twice by overlapping refreshes hold identical rows: keep one
+        migrations.RunSQL(
+            """
+            DELETE FROM core_messagerollup a USING core_messagerollup b
+            WHERE a.id > b.id
+              AND a.hour = b.hour AND a.campaign_id = b.campaign_id AND a.phone_instance_id = b.phone_instance_id
+              AND a.platform = b.platform AND a.status = b.status AND a.error_class = b.error_class
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='messagerollup',
+            constraint=models.UniqueConstraint(fields=('hour', 'campaign', 'phone_instance', 'platform', 'status', 'error_class'), name='msgrollup_bucket_uniq'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:23
+
+from django.db import migrations, models
+
+from core.phones import chat_id_for
+
+BATCH_SIZE = 5000
+
+
+def backfill_chat_ids(apps, schema_editor):
+    Contact = apps.get_model('core', 'Contact')
+    batch = []
+    for contact in Contact.objects.only('id', 'phone').iterator(chunk_size=BATCH_SIZE):
+        contact.chat_id = chat_id_for(contact.phone) or ''
+        batch.append(contact)
+        if len(batch) >= BATCH_SIZE:
+            Contact.objects.bulk_update(batch, ['chat_id'])
+            batch = []
+    if batch:
+        Contact.objects.bulk_update(batch, ['chat_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_messagerollup_bucket_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='chat_id',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_chat_ids, migrations.RunPython.noop),
+    ]
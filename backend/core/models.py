@@ -1,6 +1,8 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.postgres.fields import ArrayField
+from .phones import chat_id_for
 
 class TimeStampedModel(models.Model):
     """Abstract base class with created/updated timestamps"""
@@ -10,6 +12,24 @@ class TimeStampedModel(models.Model):
     class Meta:
         abstract = True
 
+class WahaNode(TimeStampedModel):
+    """A WAHA container that can host WhatsApp sessions"""
+    name = models.CharField(max_length=100, unique=True, help_text="e.g., waha2")
+    api_url = models.CharField(max_length=255, unique=True, help_text="WAHA API URL (e.g. http://waha2:3000)")
+    max_sessions = models.IntegerField(default=1, help_text="WAHA Core hosts a single 'default' session; Plus can host more")
+    is_active = models.BooleanField(default=True, help_text="Inactive nodes receive no new phones")
+
+    # Health (maintained by check_waha_nodes)
+    is_healthy = models.BooleanField(default=True)
+    last_health_check = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.api_url})"
+
 class PhoneInstance(TimeStampedModel):
     """Represents a connected WhatsApp session (Multi-session support)"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -20,6 +40,7 @@ class PhoneInstance(TimeStampedModel):
     
     # Load Balancing
     load_percentage = models.IntegerField(default=25, help_text="Percentage of traffic to route here (0-100)")
+    node = models.ForeignKey(WahaNode, on_delete=models.SET_NULL, null=True, blank=True, related_name='phones')
     api_url = models.CharField(max_length=255, default='http://waha:3000', help_text="WAHA API URL (e.g. http://waha:3000)")
     
     # Status
@@ -29,18 +50,57 @@ class PhoneInstance(TimeStampedModel):
         ('PAUSED', 'Paused'),
     ]
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DISCONNECTED')
+
+    # WAHA session lifecycle (driven by background tasks, see core.tasks)
+    PROVISIONING_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PROVISIONING', 'Provisioning'),
+        ('READY', 'Ready'),
+        ('RESTARTING', 'Restarting'),
+        ('STOPPING', 'Stopping'),
+        ('STOPPED', 'Stopped'),
+        ('FAILED', 'Failed'),
+    ]
+    provisioning_state = models.CharField(max_length=20, choices=PROVISIONING_CHOICES, default='READY')
+    provisioning_error = models.TextField(blank=True, default='')
+    provisioning_updated_at = models.DateTimeField(null=True, blank=True)
+    provisioning_history = models.JSONField(default=list, blank=True, help_text="Recent lifecycle transitions (newest last)")
     
-    # Metrics
+    # Metrics (counted in Redis and flushed here periodically, see core.phone_counters)
     total_sent = models.IntegerField(default=0)
     sent_today = models.IntegerField(default=0)
+    daily_limit = models.PositiveIntegerField(default=0, help_text="Max successful sends per day (TIME_ZONE); 0 = unlimited")
+
+    PROVISIONING_HISTORY_LIMIT = 20
 
     def __str__(self):
         return f"{self.name} ({self.session_name})"
 
+    def record_transition(self, state, error=''):
+        """
+        Move the session lifecycle to `state`, keeping a short audit trail.
+        The row is re-read under a lock, so the view and the lifecycle task never
+        append to each other's stale copy of the history.
+        """
+        with transaction.atomic():
+            current = (
+                PhoneInstance.objects.select_for_update()
+                .only('provisioning_state', 'provisioning_history')
+                .get(pk=self.pk)
+            )
+            now = timezone.now()
+            history = list(current.provisioning_history or [])
+            history.append({'from': current.provisioning_state, 'to': state, 'at': now.isoformat(), 'error': error})
+            self.provisioning_history = history[-self.PROVISIONING_HISTORY_LIMIT:]
+            self.provisioning_state = state
+            self.provisioning_error = error
+            self.provisioning_updated_at = now
+            self.save(update_fields=['provisioning_state', 'provisioning_error', 'provisioning_updated_at', 'provisioning_history', 'updated_at'])
+
 class WhatsAppGroup(TimeStampedModel):
     """Synced WhatsApp Groups"""
     phone_instance = models.ForeignKey(PhoneInstance, on_delete=models.CASCADE, related_name='groups')
-    group_id = models.CharField(max_length=100) # e.g. 1203630239@g.us
+    group_id = models.CharField(max_length=100, db_index=True) # e.g. 1203630239@g.us
     name = models.CharField(max_length=255)
     participants_count = models.IntegerField(default=0)
     
@@ -76,6 +136,8 @@ class Contact(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255, blank=True)
     phone = models.CharField(max_length=50, unique=True)
+    # phone normalized (core.phones), so one number stored in several formats matches
+    chat_id = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
     
     # Tags implemented as ArrayField (Postgres specific)
     tags = ArrayField(models.CharField(max_length=50), blank=True, default=list)
@@ -88,14 +150,35 @@ class Contact(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
     imported_at = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        self.chat_id = chat_id_for(self.phone) or ''
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'chat_id'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.name} - {self.phone}"
 
+class MediaAsset(models.Model):
+    """An image stored once by SHA-256; served to WAHA from a disk cache (core.media)"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    content_type = models.CharField(max_length=50)
+    filename = models.CharField(max_length=255, blank=True)
+    size = models.PositiveIntegerField()
+    # Source of truth; never loaded on the send path (see core.media.cached_file)
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.filename or self.sha256[:12]
+
 class Property(TimeStampedModel):
     """Real Estate Property Details"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=255, blank=True)
     content = models.TextField(default='')
+    # Sent as an image with the content as its caption
+    media = models.ForeignKey(MediaAsset, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     
 
 
@@ -122,6 +205,7 @@ class Campaign(TimeStampedModel):
     
     STATUS_CHOICES = [
         ('DRAFT', 'Draft'),
+        ('SCHEDULED', 'Scheduled'),
         ('QUEUED', 'Queued'),
         ('RUNNING', 'Running'),
         ('PAUSED', 'Paused'),
@@ -135,6 +219,25 @@ class Campaign(TimeStampedModel):
     total_groups = models.IntegerField(default=0)
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Scheduling (dispatched by core.tasks.dispatch_scheduled_campaigns)
+    scheduled_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    RECURRENCE_CHOICES = [
+        ('NONE', 'One-off'),
+        ('DAILY', 'Daily'),
+        ('WEEKLY', 'Weekly'),
+    ]
+    recurrence = models.CharField(max_length=10, choices=RECURRENCE_CHOICES, default='NONE')
+
+    send_weight = models.PositiveSmallIntegerField(default=1, help_text="Share of a shared phone's send rate relative to other running campaigns")
+    digest_mode = models.BooleanField(default=False, help_text="Send all properties to a recipient as one combined message (split at WhatsApp length limits)")
+    first_sent_at = models.DateTimeField(null=True, blank=True, help_text="First successful WhatsApp send (time-to-first-send = first_sent_at - started_at)")
+
+    # Denormalized message counters (maintained by core.stats, reconciled periodically)
+    sent_count = models.IntegerField(default=0, help_text="Messages not failed (SENT, DELIVERED or READ)")
+    failed_count = models.IntegerField(default=0)
+    delivered_count = models.IntegerField(default=0, help_text="Messages DELIVERED or READ")
+    read_count = models.IntegerField(default=0)
+    recovered_count = models.IntegerField(default=0, help_text="Messages that succeeded only after a retry")
     
     # Platform selection
     send_to_whatsapp = models.BooleanField(default=True)
@@ -153,6 +256,50 @@ class CampaignSettings(models.Model):
     pause_every_x_messages = models.IntegerField(default=5, help_text="Pulse size")
     pause_duration_seconds = models.IntegerField(default=30, help_text="Rest duration")
     max_messages_per_hour = models.IntegerField(default=0, help_text="0 = Unlimited")
+    # Daily send window in TIME_ZONE (may wrap midnight); sends outside it carry over to the next one
+    send_window_start = models.TimeField(null=True, blank=True, help_text="Empty = any time")
+    send_window_end = models.TimeField(null=True, blank=True)
+
+class CampaignAudience(models.Model):
+    """Recipients resolved ahead of a scheduled start, so sending begins as soon as the window opens"""
+    campaign = models.OneToOneField(Campaign, on_delete=models.CASCADE, related_name='audience')
+    contact_ids = models.JSONField(default=list)
+    group_ids = models.JSONField(default=list)
+    prepared_at = models.DateTimeField(auto_now=True)
+
+class MessageRollup(models.Model):
+    """Hourly MessageLog counts per campaign/phone/platform/status/error class (maintained by core.rollups)"""
+    hour = models.DateTimeField()
+    campaign = models.ForeignKey(Campaign, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    phone_instance = models.ForeignKey(PhoneInstance, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    platform = models.CharField(max_length=20)
+    status = models.CharField(max_length=20)
+    error_class = models.CharField(max_length=30, blank=True, default='')
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        # Hours are rebuilt wholesale (delete + insert) under a lock; the constraint catches a
+        # bucket written twice. Rows merged by a deleted campaign or phone (SET_NULL, like
+        # MessageLog) have NULLs, which don't collide, and simply sum together in queries.
+        indexes = [
+            models.Index(fields=['hour'], name='msgrollup_hour_idx'),
+            models.Index(fields=['campaign', 'hour'], name='msgrollup_campaign_hour_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hour', 'campaign', 'phone_instance', 'platform', 'status', 'error_class'],
+                name='msgrollup_bucket_uniq',
+            ),
+        ]
+
+class MessageBody(models.Model):
+    """A message body (static text or template source) stored once, addressed by its SHA-256"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256[:12]
 
 class MessageLog(models.Model):
     """Audit trail for every message sent"""
@@ -164,17 +311,30 @@ class MessageLog(models.Model):
     property = models.ForeignKey(Property, on_delete=models.SET_NULL, null=True)
     
     waha_group_id = models.CharField(max_length=100, blank=True, null=True, help_text="Legacy/Dual store") 
+    waha_message_id = models.CharField(max_length=128, blank=True, null=True, help_text="WAHA message key, matched by delivery/read receipts")
     
-    message_text = models.TextField()
+    # The body is shared by every log that sent it; personalized logs also keep the
+    # variables they were rendered with (see render_text). message_text only holds
+    # rows written before bodies existed.
+    # No index: nothing looks logs up by body, and building one would lock the table
+    body = models.ForeignKey(MessageBody, on_delete=models.PROTECT, null=True, blank=True, related_name='+', db_index=False)
+    message_text = models.TextField(blank=True, default='')
+    template_vars = models.JSONField(null=True, blank=True)
     
     STATUS_CHOICES = [
         ('SENT', 'Sent'),
         ('DELIVERED', 'Delivered'),
         ('READ', 'Read'),
         ('FAILED', 'Failed'),
+        ('SKIPPED', 'Skipped'),
     ]
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='SENT')
     error_message = models.TextField(blank=True, null=True)
+    error_class = models.CharField(max_length=30, blank=True, default='', help_text="e.g. timeout, server_error, rejected (see core.retries); suppressed or duplicate when SKIPPED")
+
+    # Retry queue: a FAILED log with next_retry_at set is waiting for another attempt
+    attempts = models.IntegerField(default=1)
+    next_retry_at = models.DateTimeField(null=True, blank=True)
 
     PLATFORM_CHOICES = [
         ('WHATSAPP', 'WhatsApp'),
@@ -182,4 +342,32 @@ class MessageLog(models.Model):
         ('INSTAGRAM', 'Instagram'),
     ]
     platform = models.CharField(max_length=20, choices=PLATFORM_CHOICES, default='WHATSAPP')
-    sent_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination for /logs (ordering: -sent_at, -id)
+            models.Index(fields=['-sent_at', '-id'], name='msglog_sent_at_id_idx'),
+            # Per-campaign log views and completion checks
+            models.Index(fields=['campaign', '-sent_at'], name='msglog_campaign_sent_at_idx'),
+            # Receipt (message.ack) lookups
+            models.Index(fields=['waha_message_id'], name='msglog_waha_message_id_idx'),
+            # Delayed retry queue (tiny: only rows waiting for a retry)
+            models.Index(
+                fields=['next_retry_at'], name='msglog_retry_queue_idx',
+                condition=models.Q(next_retry_at__isnull=False),
+            ),
+        ]
+
+    def render_text(self):
+        """The message as the recipient received it."""
+        if self.body_id is not None:
+            source = self.body.content
+        elif self.template_vars is not None:
+            source = self.property.content if self.property else ''
+        else:
+            return self.message_text
+        if self.template_vars is None:
+            return source
+        from .templating import render_message
+        return render_message(source, self.template_vars)
@@ -0,0 +1,117 @@
+import logging
+import requests
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from .models import WahaNode, PhoneInstance
+from .waha import waha_headers
+
+logger = logging.getLogger(__name__)
+
+
+class NoNodeCapacity(Exception):
+    """Raised when no healthy WAHA node has a free session slot."""
+
+
+def nodes_with_load(queryset=None):
+    queryset = WahaNode.objects.all() if queryset is None else queryset
+    return queryset.annotate(session_count=Count('phones'))
+
+
+def _load(node, session_count):
+    return session_count / node.max_sessions if node.max_sessions > 0 else float('inf')
+
+
+@transaction.atomic
+def assign_node():
+    """
+    Pick the healthy, active node with the lowest load (sessions / max_sessions).
+    Candidate rows are locked so concurrent phone creations can't both grab the last slot;
+    the caller must save its PhoneInstance inside the same transaction.
+    """
+    candidates = list(
+        WahaNode.objects.select_for_update()
+        .filter(is_active=True, is_healthy=True)
+        .order_by('name')
+    )
+    if not candidates:
+        raise NoNodeCapacity("No healthy WAHA node is registered")
+
+    counts = dict(
+        PhoneInstance.objects.filter(node__in=candidates)
+        .values_list('node_id')
+        .annotate(n=Count('id'))
+    )
+    available = [
+        (node, counts.get(node.id, 0)) for node in candidates
+        if counts.get(node.id, 0) < node.max_sessions
+    ]
+    if not available:
+        raise NoNodeCapacity("All WAHA nodes are at max_sessions")
+
+    node, _ = min(available, key=lambda pair: (_load(*pair), pair[1], pair[0].name))
+    return node
+
+
+def session_name_for(node, phone_id):
+    """WAHA Core only serves the 'default' session; multi-session nodes need unique names."""
+    if node.max_sessions <= 1:
+        return "default"
+    return f"phone_{phone_id.hex[:12]}"
+
+
+def check_node_health(node, timeout=5):
+    """Ping a node and persist the result. Returns True if healthy."""
+    error = ''
+    try:
+        r = requests.get(f"{node.api_url}/ping", headers=waha_headers(), timeout=timeout)
+        healthy = r.status_code == 200
+        if not healthy:
+            error = f"HTTP {r.status_code}"
+    except requests.RequestException as e:
+        healthy = False
+        error = str(e)
+
+    if healthy != node.is_healthy:
+        logger.warning(f"WAHA_NODE: {node.name} is now {'healthy' if healthy else 'UNHEALTHY'} {error}")
+    node.is_healthy = healthy
+    node.last_error = error
+    node.last_health_check = timezone.now()
+    node.save(update_fields=['is_healthy', 'last_error', 'last_health_check', 'updated_at'])
+    return healthy
+
+
+def plan_rebalance():
+    """
+    Plan phone moves off overloaded or unhealthy nodes onto the least-loaded healthy ones.
+    Returns a list of (phone, from_node, to_node); nothing is changed.
+    """
+    nodes = list(nodes_with_load().filter(is_active=True))
+    load = {node.id: node.session_count for node in nodes}
+    targets = [node for node in nodes if node.is_healthy]
+
+    moves = []
+    for node in nodes:
+        excess = load[node.id] if not node.is_healthy else load[node.id] - node.max_sessions
+        if excess <= 0:
+            continue
+        # Newest phones move first: older ones are most likely paired and warmed up
+        for phone in PhoneInstance.objects.filter(node=node).order_by('-created_at')[:excess]:
+            free = [t for t in targets if t.id != node.id and load[t.id] < t.max_sessions]
+            if not free:
+                break
+            target = min(free, key=lambda t: (_load(t, load[t.id]), load[t.id], t.name))
+            moves.append((phone, node, target))
+            load[node.id] -= 1
+            load[target.id] += 1
+
+    # Phones without a node (e.g. their node was deleted)
+    for phone in PhoneInstance.objects.filter(node__isnull=True).order_by('created_at'):
+        free = [t for t in targets if load[t.id] < t.max_sessions]
+        if not free:
+            break
+        target = min(free, key=lambda t: (_load(t, load[t.id]), load[t.id], t.name))
+        moves.append((phone, None, target))
+        load[target.id] += 1
+
+    return moves
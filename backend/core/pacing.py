@@ -0,0 +1,223 @@
+import time
+import random
+import logging
+from collections import Counter
+from datetime import timedelta
+import redis
+from django.conf import settings
+from django.utils import timezone
+from .redis_client import get_redis
+from .scheduling import next_window_start
+
+logger = logging.getLogger(__name__)
+
+HOUR = 60 * 60
+
+
+def delay_bounds(settings_obj):
+    """(min, max) seconds between two sends from one phone."""
+    min_delay = settings_obj.delay_between_messages_min
+    max_delay = settings_obj.delay_between_messages_max
+    # WARMUP MODE: a new/at-risk account gets doubled delays with a floor
+    if settings_obj.warmup_mode:
+        min_delay = max(min_delay * 2, 20)
+        max_delay = max(max_delay * 2, 40)
+    return min_delay, max_delay
+
+
+# Adaptive delay (AIMD) per phone: the mean delay between sends shrinks by a fixed step
+# after a streak of successes and is multiplied on errors that signal WAHA or WhatsApp
+# pushing back, always within the campaign's delay_bounds. The state lives in Redis so
+# it carries across tasks and campaigns; each campaign clamps it to its own bounds.
+AIMD_SUCCESS_STREAK = getattr(settings, 'PACING_SUCCESS_STREAK', 10)
+AIMD_DECREASE_SECONDS = getattr(settings, 'PACING_DECREASE_SECONDS', 1.0)
+AIMD_INCREASE_FACTOR = getattr(settings, 'PACING_INCREASE_FACTOR', 2.0)
+AIMD_STATE_TTL = 7 * 24 * HOUR
+# Errors caused by the recipient (e.g. 'rejected') say nothing about our send rate
+THROTTLE_ERRORS = {'rate_limited', 'timeout', 'connection', 'server_error'}
+JITTER = 0.15
+
+# KEYS: state   ARGV: initial, low, high, success(0/1), streak, step, factor, ttl
+_ADJUST = """
+local delay = tonumber(redis.call('HGET', KEYS[1], 'delay') or ARGV[1])
+local streak = tonumber(redis.call('HGET', KEYS[1], 'streak') or '0')
+local low, high = tonumber(ARGV[2]), tonumber(ARGV[3])
+delay = math.min(math.max(delay, low), high)
+if ARGV[4] == '1' then
+    streak = streak + 1
+    if streak >= tonumber(ARGV[5]) then
+        delay = math.max(low, delay - tonumber(ARGV[6]))
+        streak = 0
+    end
+else
+    delay = math.min(high, delay * tonumber(ARGV[7]))
+    streak = 0
+end
+redis.call('HSET', KEYS[1], 'delay', delay, 'streak', streak)
+redis.call('EXPIRE', KEYS[1], ARGV[8])
+return tostring(delay)
+"""
+
+
+def pacing_key(phone_id):
+    return f"phone:{phone_id}:pacing"
+
+
+def _clamp(value, low, high):
+    return min(max(value, low), high)
+
+
+def current_delay(phone_id, settings_obj):
+    """The phone's adaptive mean delay under this campaign's bounds (the midpoint until it has learned one)."""
+    low, high = delay_bounds(settings_obj)
+    try:
+        delay = get_redis().hget(pacing_key(phone_id), 'delay')
+    except redis.RedisError as e:
+        logger.warning(f"PACING: adaptive delay unavailable ({e}); using the midpoint")
+        delay = None
+    return _clamp(float(delay), low, high) if delay is not None else (low + high) / 2
+
+
+def next_delay(phone_id, settings_obj):
+    """
+    Seconds to wait before the next send: the adaptive mean with some human jitter.
+    Drawn inside the bounds rather than clamped to them, so a phone that has converged
+    to the minimum still varies its interval instead of repeating exactly `low`.
+    """
+    low, high = delay_bounds(settings_obj)
+    delay = current_delay(phone_id, settings_obj)
+    return random.uniform(max(low, delay * (1 - JITTER)), min(high, delay * (1 + JITTER)))
+
+
+def record_send_outcome(phone_id, settings_obj, success, error_class=None):
+    """Feed one send result into the phone's controller. Returns the new mean delay (None if unchanged)."""
+    if not success and error_class not in THROTTLE_ERRORS:
+        return None
+    low, high = delay_bounds(settings_obj)
+    try:
+        delay = float(get_redis().eval(
+            _ADJUST, 1, pacing_key(phone_id),
+            (low + high) / 2, low, high, 1 if success else 0,
+            AIMD_SUCCESS_STREAK, AIMD_DECREASE_SECONDS, AIMD_INCREASE_FACTOR, AIMD_STATE_TTL,
+        ))
+    except redis.RedisError as e:
+        logger.warning(f"PACING: could not update adaptive delay ({e})")
+        return None
+    if not success:
+        logger.info(f"🐢 Phone {phone_id} backing off to {delay:.1f}s between sends ({error_class})")
+    return delay
+
+
+# Hourly cap (CampaignSettings.max_messages_per_hour): counted per campaign and phone
+# in clock-hour buckets, checked before each target.
+
+def hourly_count_key(campaign_id, phone_id, hour):
+    return f"campaign:{campaign_id}:phone:{phone_id}:sent:{hour}"
+
+
+def hourly_cap_wait(campaign_id, phone_id, cap, now=None):
+    """0 while under the cap (or uncapped), else seconds until the next hour starts."""
+    if not cap:
+        return 0
+    now = now or time.time()
+    hour = int(now // HOUR)
+    try:
+        sent = int(get_redis().get(hourly_count_key(campaign_id, phone_id, hour)) or 0)
+    except redis.RedisError as e:
+        logger.warning(f"PACING: hourly count unavailable ({e}); not capping")
+        return 0
+    if sent < cap:
+        return 0
+    return (hour + 1) * HOUR - now
+
+
+def count_hourly_send(campaign_id, phone_id, cap, now=None):
+    if not cap:
+        return
+    key = hourly_count_key(campaign_id, phone_id, int((now or time.time()) // HOUR))
+    try:
+        pipe = get_redis().pipeline()
+        pipe.incr(key)
+        pipe.expire(key, 2 * HOUR)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"PACING: could not count send ({e})")
+
+
+# The simulation steps through every message, so it is only run up to this many
+SIMULATION_MAX_MESSAGES = getattr(settings, 'SIMULATION_MAX_MESSAGES', 200_000)
+
+
+def _hour_floor(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def simulate_phone(settings_obj, targets, messages_per_target, start, mean_delay=None):
+    """
+    Replay one phone's send loop on a virtual clock, using the mean delay (the phone's
+    adaptive delay when given, else the midpoint of the bounds) and rest.
+    Same rules as core.tasks: send window and hourly cap checked before each target,
+    a delay before each message, a rest after every pause_every_x_messages sends.
+    Returns (finish time, messages per clock hour).
+    """
+    if mean_delay is None:
+        low, high = delay_bounds(settings_obj)
+        mean_delay = (low + high) / 2
+    delay = timedelta(seconds=mean_delay)
+    rest = timedelta(seconds=settings_obj.pause_duration_seconds)
+    pulse = settings_obj.pause_every_x_messages
+    cap = settings_obj.max_messages_per_hour
+    windowed = settings_obj.send_window_start is not None and settings_obj.send_window_end is not None
+
+    clock = start
+    sent = 0
+    hourly = Counter()
+    for _ in range(targets):
+        while True:
+            if windowed:
+                clock = next_window_start(settings_obj, clock)
+            if cap and hourly[_hour_floor(clock)] >= cap:
+                clock = _hour_floor(clock) + timedelta(hours=1)
+                continue
+            break
+        for _ in range(messages_per_target):
+            clock += delay
+            hourly[_hour_floor(clock)] += 1
+            sent += 1
+            if pulse > 0 and sent % pulse == 0:
+                clock += rest
+    return clock, hourly
+
+
+def simulate_send_schedule(settings_obj, phone_targets, messages_per_target, start=None, delays=None):
+    """
+    Dry-run projection for a campaign. phone_targets is [(phone id, name, target count)]
+    and delays optionally maps a phone id to its current mean delay; phones send in
+    parallel, so the campaign takes as long as its busiest phone.
+    Assumes every send succeeds and no other campaign shares the phones.
+    """
+    start = start or timezone.now()
+    finish = start
+    phones = []
+    hourly = Counter()
+    for phone_id, name, targets in phone_targets:
+        mean_delay = (delays or {}).get(phone_id) or sum(delay_bounds(settings_obj)) / 2
+        phone_finish, phone_hourly = simulate_phone(settings_obj, targets, messages_per_target, start, mean_delay)
+        finish = max(finish, phone_finish)
+        hourly.update(phone_hourly)
+        phones.append({
+            'phone_id': str(phone_id),
+            'phone': name,
+            'targets': targets,
+            'messages': targets * messages_per_target,
+            'duration_seconds': round((phone_finish - start).total_seconds()),
+            'mean_delay_seconds': mean_delay,
+        })
+    return {
+        'starts_at': start.isoformat(),
+        'finishes_at': finish.isoformat(),
+        'duration_seconds': round((finish - start).total_seconds()),
+        'messages': sum(phone['messages'] for phone in phones),
+        'phones': phones,
+        'hourly': [{'hour': hour.isoformat(), 'messages': count} for hour, count in sorted(hourly.items())],
+    }
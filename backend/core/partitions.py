@@ -0,0 +1,188 @@
+import os
+import re
+import csv
+import gzip
+import logging
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# core_messagelog is range-partitioned by sent_at, one partition per calendar month (UTC)
+PARENT_TABLE = 'core_messagelog'
+PARTITION_PREFIX = f'{PARENT_TABLE}_p'
+_PARTITION_RE = re.compile(rf'^{PARTITION_PREFIX}(\d{{4}})_(\d{{2}})$')
+# Catches rows no monthly partition covers (e.g. the daily job stopped running), so sends
+# keep working; ensure_partitions moves them into their month once it exists
+DEFAULT_PARTITION = f'{PARENT_TABLE}_default'
+
+MONTHS_AHEAD = getattr(settings, 'MESSAGELOG_PARTITIONS_AHEAD', 3)
+# 0 keeps everything
+RETENTION_MONTHS = getattr(settings, 'MESSAGELOG_RETENTION_MONTHS', 0)
+ARCHIVE_DIR = getattr(settings, 'MESSAGELOG_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archive'))
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month):
+    return f'{PARTITION_PREFIX}{month.year:04d}_{month.month:02d}'
+
+
+def partition_month(name):
+    """Month a partition covers, or None for tables that aren't monthly partitions."""
+    match = _PARTITION_RE.match(name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=dt_timezone.utc)
+
+
+def _range_sql(month):
+    return f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+
+
+def create_partition_sql(month):
+    return f'CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT_TABLE} {_range_sql(month)}'
+
+
+def create_partition(month):
+    """
+    Create one monthly partition. Rows the default partition caught for that month are
+    moved into it first, since Postgres refuses a partition whose rows sit in the default.
+    Returns the number of rows moved.
+    """
+    name = partition_name(month)
+    bounds = [month, add_months(month, 1)]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'SELECT 1 FROM {DEFAULT_PARTITION} WHERE sent_at >= %s AND sent_at < %s LIMIT 1', bounds)
+        if cursor.fetchone() is None:
+            cursor.execute(create_partition_sql(month))
+            return 0
+        cursor.execute(f'CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION} WHERE sent_at >= %s AND sent_at < %s RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """,
+            bounds,
+        )
+        moved = cursor.rowcount
+        cursor.execute(f'ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} {_range_sql(month)}')
+    logger.warning(f"MESSAGELOG_PARTITIONS: {name} was missing; moved {moved} rows in from {DEFAULT_PARTITION}")
+    return moved
+
+
+def default_partition_rows():
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM {DEFAULT_PARTITION}')
+        return cursor.fetchone()[0]
+
+
+def list_partitions():
+    """Attached monthly partitions as [(month, name)], oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [PARENT_TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    return sorted((partition_month(name), name) for name in names if partition_month(name))
+
+
+def oldest_retained_month():
+    partitions = list_partitions()
+    return partitions[0][0] if partitions else None
+
+
+def ensure_partitions(months_ahead=MONTHS_AHEAD, now=None):
+    """Create this month's partition and the next months_ahead. Returns the names created."""
+    existing = {name for _, name in list_partitions()}
+    current = month_start(now or datetime.now(dt_timezone.utc))
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if partition_name(month) not in existing:
+            create_partition(month)
+            created.append(partition_name(month))
+    return created
+
+
+def expired_partitions(retention_months=RETENTION_MONTHS, now=None):
+    """Partitions entirely older than the retention window."""
+    if not retention_months:
+        return []
+    cutoff = add_months(month_start(now or datetime.now(dt_timezone.utc)), -retention_months)
+    return [(month, name) for month, name in list_partitions() if add_months(month, 1) <= cutoff]
+
+
+def archive_path(name, directory=ARCHIVE_DIR):
+    return os.path.join(directory, f'{name}.csv.gz')
+
+
+def archive_partition(name, directory=ARCHIVE_DIR):
+    """
+    Detach a partition, dump it to <directory>/<name>.csv.gz and drop it.
+    The table is only dropped once the file is complete and its row count matches.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = archive_path(name, directory)
+    if os.path.exists(path):
+        raise FileExistsError(f'{path} already exists')
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}')
+
+    tmp_path = f'{path}.partial'
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM {name}')
+        rows = cursor.fetchone()[0]
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', newline='') as archive:
+            cursor.copy_expert(f'COPY {name} TO STDOUT WITH (FORMAT csv, HEADER true)', archive)
+    with open(tmp_path, 'rb') as archive:
+        os.fsync(archive.fileno())
+
+    with gzip.open(tmp_path, 'rt', encoding='utf-8', newline='') as archive:
+        # Rows may contain quoted newlines, so count records rather than lines
+        archived = sum(1 for _ in csv.reader(archive)) - 1
+    if archived != rows:
+        raise RuntimeError(f'{name}: archived {archived} rows, table has {rows}; partition left detached')
+
+    os.replace(tmp_path, path)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE {name}')
+    logger.info(f"MESSAGELOG_ARCHIVE: {name} ({rows} rows) -> {path}")
+    return path, rows
+
+
+def restore_archive(path):
+    """Load an archive written by archive_partition back into its monthly partition."""
+    name = os.path.basename(path).split('.', 1)[0]
+    month = partition_month(name)
+    if month is None:
+        raise ValueError(f'{path} is not a {PARENT_TABLE} partition archive')
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Load into a standalone table, then attach it: the data is validated once against the range
+        cursor.execute(f'CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as archive:
+            cursor.copy_expert(f'COPY {name} FROM STDIN WITH (FORMAT csv, HEADER true)', archive)
+        cursor.execute(f'SELECT count(*) FROM {name}')
+        rows = cursor.fetchone()[0]
+        cursor.execute(f'ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} {_range_sql(month)}')
+    logger.info(f"MESSAGELOG_RESTORE: {path} -> {name} ({rows} rows)")
+    return name, rows
@@ -0,0 +1,149 @@
+import logging
+from datetime import timedelta
+import redis
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from .models import PhoneInstance
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# PhoneInstance.total_sent / sent_today are counted in Redis on the send path (INCR, no
+# row lock) and written to Postgres in one UPDATE by flush_phone_counters. Daily counts
+# are keyed by the local date (TIME_ZONE), so they roll over at midnight by themselves.
+DIRTY_KEY = 'phones:counters:dirty'
+DAY_TTL = 2 * 24 * 60 * 60
+# One flush at a time: two flushes reading the same pending counts would both add them
+FLUSH_LOCK_KEY = 'phones:counters:flush_lock'
+FLUSH_LOCK_SECONDS = 300
+
+# KEYS: pending, dirty   ARGV: flushed, phone id
+_SETTLE = """
+local left = redis.call('DECRBY', KEYS[1], ARGV[1])
+if left <= 0 then
+    redis.call('DEL', KEYS[1])
+    redis.call('SREM', KEYS[2], ARGV[2])
+end
+return left
+"""
+
+
+def pending_key(phone_id):
+    return f"phone:{phone_id}:sent:pending"
+
+
+def day_key(phone_id, day=None):
+    day = day or timezone.localdate()
+    return f"phone:{phone_id}:sent:{day.isoformat()}"
+
+
+def count_phone_send(phone_id):
+    """Count one successful send. Returns the phone's sends today (None if Redis is down)."""
+    try:
+        pipe = get_redis().pipeline()
+        pipe.incr(pending_key(phone_id))
+        pipe.incr(day_key(phone_id))
+        pipe.expire(day_key(phone_id), DAY_TTL)
+        pipe.sadd(DIRTY_KEY, str(phone_id))
+        return pipe.execute()[1]
+    except redis.RedisError as e:
+        logger.warning(f"PHONE_COUNTERS: could not count send for {phone_id}: {e}")
+        return None
+
+
+def sends_today(phone_ids):
+    """{phone id: sends today} in one MGET, for allocation and daily caps."""
+    phone_ids = list(phone_ids)
+    if not phone_ids:
+        return {}
+    try:
+        values = get_redis().mget([day_key(phone_id) for phone_id in phone_ids])
+    except redis.RedisError as e:
+        logger.warning(f"PHONE_COUNTERS: daily counts unavailable ({e})")
+        return {}
+    return {phone_id: int(value or 0) for phone_id, value in zip(phone_ids, values)}
+
+
+def seconds_until_tomorrow(now=None):
+    local = timezone.localtime(now or timezone.now())
+    midnight = (local + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - local).total_seconds()
+
+
+def daily_limit_wait(phone):
+    """0 while the phone is under its daily_limit (or has none), else seconds until local midnight."""
+    if not phone.daily_limit:
+        return 0
+    try:
+        sent = int(get_redis().get(day_key(phone.id)) or 0)
+    except redis.RedisError as e:
+        logger.warning(f"PHONE_COUNTERS: daily limit of {phone.id} not enforced, count unavailable ({e})")
+        return 0
+    if sent < phone.daily_limit:
+        return 0
+    return seconds_until_tomorrow()
+
+
+def under_daily_limit(phones):
+    """Phones that may still send today (one MGET for all of them)."""
+    counts = sends_today(phone.id for phone in phones if phone.daily_limit)
+    return [phone for phone in phones if not phone.daily_limit or counts.get(phone.id, 0) < phone.daily_limit]
+
+
+def flush_phone_counters():
+    """Add pending sends to total_sent and copy today's counts to sent_today, in one UPDATE."""
+    client = get_redis()
+    lock = client.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_SECONDS, blocking=False)
+    if not lock.acquire():
+        logger.info("PHONE_COUNTERS: flush already running, skipped")
+        return 0
+    try:
+        return _flush(client)
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockError as e:
+            logger.warning(f"PHONE_COUNTERS: flush lock expired before release: {e}")
+
+
+def _flush(client):
+    phone_ids = sorted(client.smembers(DIRTY_KEY))
+    if not phone_ids:
+        return 0
+    pipe = client.pipeline()
+    for phone_id in phone_ids:
+        pipe.get(pending_key(phone_id))
+        pipe.get(day_key(phone_id))
+    values = pipe.execute()
+    pending = {phone_id: int(values[2 * i] or 0) for i, phone_id in enumerate(phone_ids)}
+    today = {phone_id: int(values[2 * i + 1] or 0) for i, phone_id in enumerate(phone_ids)}
+
+    with transaction.atomic():
+        PhoneInstance.objects.filter(id__in=phone_ids).update(
+            total_sent=F('total_sent') + Case(
+                *[When(id=phone_id, then=Value(count)) for phone_id, count in pending.items()],
+                default=Value(0), output_field=IntegerField(),
+            ),
+            sent_today=Case(
+                *[When(id=phone_id, then=Value(count)) for phone_id, count in today.items()],
+                default=F('sent_today'), output_field=IntegerField(),
+            ),
+        )
+        # Subtract exactly what was written (sends counted meanwhile stay pending), in one
+        # MULTI before the commit: a failure here rolls the UPDATE back instead of letting
+        # the next flush add the same counts again
+        pipe = client.pipeline()
+        for phone_id, count in pending.items():
+            pipe.eval(_SETTLE, 2, pending_key(phone_id), DIRTY_KEY, count, phone_id)
+        pipe.execute()
+    return len(phone_ids)
+
+
+def reset_daily_counters():
+    """Midnight (TIME_ZONE): flush, then zero sent_today for phones that haven't sent yet today."""
+    flush_phone_counters()
+    phone_ids = list(PhoneInstance.objects.values_list('id', flat=True))
+    counts = sends_today(phone_ids)
+    idle = [phone_id for phone_id in phone_ids if counts.get(phone_id, 0) == 0]
+    return PhoneInstance.objects.filter(id__in=idle).exclude(sent_today=0).update(sent_today=0)
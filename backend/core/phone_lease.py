@@ -0,0 +1,204 @@
+import time
+import uuid
+import logging
+import threading
+from django.conf import settings
+from redis.exceptions import RedisError
+from .redis_client import get_redis
+from .lanes import urgent_lane_key
+
+logger = logging.getLogger(__name__)
+
+# Lua keeps check-and-set atomic across workers.
+# KEYS: lease, turns, urgent   ARGV: token, member, ttl, urgent(0/1), now, waiter_ttl, alive_prefix
+_ACQUIRE = """
+local function wait_turn()
+    redis.call('zadd', KEYS[2], 'NX', ARGV[5], ARGV[2])
+    redis.call('set', ARGV[7] .. ARGV[2], '1', 'EX', ARGV[6])
+    return 0
+end
+if redis.call('exists', KEYS[1]) == 1 then
+    return wait_turn()
+end
+if ARGV[4] == '0' then
+    if tonumber(redis.call('get', KEYS[3]) or '0') > 0 then
+        return wait_turn()
+    end
+    while true do
+        local head = redis.call('zrange', KEYS[2], 0, 0)[1]
+        if not head or head == ARGV[2] then break end
+        if redis.call('exists', ARGV[7] .. head) == 1 then
+            return wait_turn()
+        end
+        -- The waiter at the head stopped polling (campaign paused, worker gone): skip it
+        redis.call('zrem', KEYS[2], head)
+    end
+end
+redis.call('set', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('zrem', KEYS[2], ARGV[2])
+return 1
+"""
+
+_RENEW = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class PhoneLease:
+    """
+    Exclusive right to send from one phone, shared by every worker via Redis.
+
+    Only the holder sends, so a phone's real rate is its own pacing no matter how many
+    campaigns target it. The lease expires after TTL_SECONDS unless a heartbeat thread
+    renews it, so a crashed worker frees the phone within a minute.
+
+    Campaigns that find the phone busy queue up for a turn (a zset ordered by arrival).
+    Turns are deficit round robin: each turn adds QUANTUM * weight messages of credit,
+    the holder sends while it has credit for the next target and then hands the phone to
+    the next waiter. With nobody waiting the holder keeps going, so no send slot is wasted.
+    Instant work (core.lanes) skips the turn queue; bulk campaigns never take a phone
+    while its urgent lane is open.
+
+    Redis errors fail open (the lease is treated as held) so a Redis hiccup never stops sending.
+    """
+    TTL_SECONDS = 60
+    HEARTBEAT_SECONDS = 20
+    # How long a queued waiter stays in line without polling again
+    WAITER_TTL_SECONDS = 90
+    QUANTUM = getattr(settings, 'PHONE_DRR_QUANTUM', 10)
+
+    def __init__(self, phone_id, campaign_id, urgent=False, weight=1, client=None):
+        self.phone_id = phone_id
+        self.member = str(campaign_id)
+        self.urgent = urgent
+        self.weight = max(int(weight or 1), 1)
+        self.token = uuid.uuid4().hex
+        self.lost = False
+        self.deficit = 0
+        self._client = client
+        self._stop = threading.Event()
+        self._thread = None
+        prefix = f"phone:{phone_id}"
+        self.lease_key = f"{prefix}:lease"
+        self.turns_key = f"{prefix}:turns"
+        self.drr_key = f"{prefix}:drr"
+        self.alive_prefix = f"{prefix}:waiter:"
+
+    @property
+    def redis(self):
+        return self._client or get_redis()
+
+    # --- lease -----------------------------------------------------------
+
+    def acquire(self):
+        """Take the phone if it's free and it's our turn; otherwise join the queue."""
+        try:
+            got = self.redis.eval(
+                _ACQUIRE, 3, self.lease_key, self.turns_key, urgent_lane_key(self.phone_id),
+                self.token, self.member, self.TTL_SECONDS, '1' if self.urgent else '0',
+                time.time(), self.WAITER_TTL_SECONDS, self.alive_prefix,
+            )
+            if got:
+                # New turn: top up this campaign's credit
+                self.deficit = int(self.redis.hget(self.drr_key, self.member) or 0) + self.QUANTUM * self.weight
+            return bool(got)
+        except RedisError as e:
+            logger.warning(f"LEASE_REDIS_ERROR (phone {self.phone_id}): {e}")
+            self.deficit = self.QUANTUM * self.weight
+            return True
+
+    def renew(self):
+        try:
+            return bool(self.redis.eval(_RENEW, 1, self.lease_key, self.token, self.TTL_SECONDS))
+        except RedisError as e:
+            logger.warning(f"LEASE_REDIS_ERROR (phone {self.phone_id}): {e}")
+            return True
+
+    def start_heartbeat(self):
+        self._thread = threading.Thread(target=self._heartbeat, name=f"lease-{self.phone_id}", daemon=True)
+        self._thread.start()
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.HEARTBEAT_SECONDS):
+            if not self.renew():
+                logger.warning(f"LEASE_LOST: phone {self.phone_id} (campaign {self.member})")
+                self.lost = True
+                return
+
+    def release(self, rejoin=False, finished=False):
+        """
+        Give the phone up. rejoin puts this campaign at the back of the turn queue
+        (it still has work); finished forgets its leftover credit.
+        """
+        self._stop.set()
+        try:
+            pipe = self.redis.pipeline()
+            if finished:
+                pipe.hdel(self.drr_key, self.member)
+            else:
+                pipe.hset(self.drr_key, self.member, max(self.deficit, 0))
+                pipe.expire(self.drr_key, 24 * 60 * 60)
+            if rejoin and not self.urgent:
+                pipe.zadd(self.turns_key, {self.member: time.time()}, nx=True)
+                pipe.set(f"{self.alive_prefix}{self.member}", '1', ex=self.WAITER_TTL_SECONDS)
+            pipe.eval(_RELEASE, 1, self.lease_key, self.token)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"LEASE_REDIS_ERROR (phone {self.phone_id}): {e}")
+
+    # --- deficit round robin --------------------------------------------
+
+    def charge(self, messages):
+        self.deficit -= messages
+
+    def can_afford(self, messages):
+        return self.deficit >= messages
+
+    def others_waiting(self):
+        """Is another live campaign queued for this phone?"""
+        try:
+            for member in self.redis.zrange(self.turns_key, 0, -1):
+                if member == self.member:
+                    continue
+                if self.redis.exists(f"{self.alive_prefix}{member}"):
+                    return True
+                self.redis.zrem(self.turns_key, member)
+        except RedisError:
+            pass
+        return False
+
+    def end_of_turn(self, next_cost):
+        """
+        Credit can't cover the next target. Hand over if someone is waiting,
+        otherwise start a fresh turn in place. Returns True when the phone must be released.
+        """
+        if self.can_afford(next_cost):
+            return False
+        if self.others_waiting():
+            return True
+        while not self.can_afford(next_cost):
+            self.deficit += self.QUANTUM * self.weight
+        return False
+
+
+def incr_phone_send_count(phone_id):
+    """Add one send to the phone-wide counter shared by campaigns holding the lease (pulse & rest); returns the new count."""
+    key = f"phone:{phone_id}:sends"
+    try:
+        pipe = get_redis().pipeline()
+        pipe.incr(key)
+        pipe.expire(key, 24 * 60 * 60)
+        count, _ = pipe.execute()
+        return count
+    except RedisError:
+        return None
@@ -0,0 +1,20 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def chat_id_for(destination):
+    """
+    WAHA chat id for a phone number in any format (group ids pass through), or None.
+    Digits only, leading zeros dropped, 10-digit numbers assumed Indian (+91).
+    """
+    if '@' in str(destination):
+        return str(destination)
+    digits = ''.join(filter(str.isdigit, str(destination))).lstrip('0')
+    if not digits:
+        return None
+    if len(digits) == 10:
+        digits = '91' + digits
+    elif len(digits) > 15:
+        logger.warning(f"Suspicious phone number length: {digits}")
+    return f"{digits}@c.us"
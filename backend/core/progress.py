@@ -0,0 +1,177 @@
+import json
+import time
+import logging
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Live campaign progress. Send tasks keep per-run counters in a Redis hash and publish
+# every change on a pub/sub channel; SSE clients (core.views.campaign_progress_stream)
+# subscribe to the channel, so watching a campaign never touches the database.
+PROGRESS_TTL = 7 * 24 * 60 * 60
+KEEPALIVE_SECONDS = 15
+
+
+def progress_key(campaign_id):
+    return f"campaign:{campaign_id}:progress"
+
+
+def progress_channel(campaign_id):
+    return f"campaign:{campaign_id}:progress:events"
+
+
+def _number(value):
+    return int(float(value or 0))
+
+
+def progress_snapshot(state, now=None):
+    """
+    Event payload from the raw progress hash. The ETA follows the dry-run projection
+    (core.pacing), stretched or shrunk by how far actual progress runs behind or ahead
+    of it; without a projection it extrapolates the throughput so far.
+    """
+    now = now or time.time()
+    total = _number(state.get('total'))
+    sent = _number(state.get('sent'))
+    failed = _number(state.get('failed'))
+    skipped = _number(state.get('skipped'))
+    done = sent + failed + skipped
+    started = float(state.get('started_at') or 0)
+    elapsed = now - started if started else 0
+
+    projected = float(state.get('projected_seconds') or 0)
+
+    eta = None
+    if total and elapsed > 0 and state.get('status') == 'RUNNING':
+        if projected:
+            expected_elapsed = projected * min(done, total) / total
+            drift = elapsed / expected_elapsed if expected_elapsed else 1
+            eta = round(max(projected - expected_elapsed, 0) * drift) if done else round(max(projected - elapsed, 0))
+        elif done:
+            eta = round(max(total - done, 0) * elapsed / done)
+    return {
+        'status': state.get('status'),
+        'total': total,
+        'sent': sent,
+        'failed': failed,
+        'skipped': skipped,
+        'phone': state.get('phone') or None,
+        'eta_seconds': eta,
+    }
+
+
+def _publish(client, campaign_id, event):
+    client.publish(progress_channel(campaign_id), json.dumps(event))
+
+
+def start_progress(campaign_id, total, projected_seconds=None):
+    """New run: reset counters. Best-effort, progress is never worth failing a send over."""
+    key = progress_key(campaign_id)
+    state = {'status': 'RUNNING', 'total': total, 'sent': 0, 'failed': 0, 'skipped': 0, 'phone': '', 'started_at': time.time()}
+    if projected_seconds is not None:
+        state['projected_seconds'] = projected_seconds
+    try:
+        client = get_redis()
+        pipe = client.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping=state)
+        pipe.expire(key, PROGRESS_TTL)
+        pipe.execute()
+        _publish(client, campaign_id, dict(progress_snapshot(state), type='status'))
+    except redis.RedisError as e:
+        logger.warning(f"PROGRESS: could not start progress for {campaign_id}: {e}")
+
+
+def record_progress(campaign_id, success, phone_name):
+    """One message sent (or failed) by phone_name."""
+    key = progress_key(campaign_id)
+    try:
+        client = get_redis()
+        pipe = client.pipeline()
+        pipe.hincrby(key, 'sent' if success else 'failed', 1)
+        pipe.hset(key, 'phone', phone_name)
+        pipe.expire(key, PROGRESS_TTL)
+        pipe.hgetall(key)
+        state = pipe.execute()[-1]
+        _publish(client, campaign_id, dict(progress_snapshot(state), type='sent' if success else 'failed'))
+    except redis.RedisError as e:
+        logger.warning(f"PROGRESS: could not record progress for {campaign_id}: {e}")
+
+
+def record_recovered(campaign_id, phone_name):
+    """A failed message went through on retry."""
+    key = progress_key(campaign_id)
+    try:
+        client = get_redis()
+        pipe = client.pipeline()
+        pipe.hincrby(key, 'sent', 1)
+        pipe.hincrby(key, 'failed', -1)
+        pipe.hset(key, 'phone', phone_name)
+        pipe.hgetall(key)
+        state = pipe.execute()[-1]
+        _publish(client, campaign_id, dict(progress_snapshot(state), type='recovered'))
+    except redis.RedisError as e:
+        logger.warning(f"PROGRESS: could not record recovery for {campaign_id}: {e}")
+
+
+def record_skipped(campaign_id, count):
+    """Messages not sent to a suppressed or already reached recipient."""
+    key = progress_key(campaign_id)
+    try:
+        client = get_redis()
+        pipe = client.pipeline()
+        pipe.hincrby(key, 'skipped', count)
+        pipe.hgetall(key)
+        state = pipe.execute()[-1]
+        _publish(client, campaign_id, dict(progress_snapshot(state), type='skipped'))
+    except redis.RedisError as e:
+        logger.warning(f"PROGRESS: could not record skipped messages for {campaign_id}: {e}")
+
+
+def set_progress_status(campaign_id, status):
+    """Campaign changed state (completed, paused, failed)."""
+    key = progress_key(campaign_id)
+    try:
+        client = get_redis()
+        pipe = client.pipeline()
+        pipe.hset(key, 'status', status)
+        pipe.expire(key, PROGRESS_TTL)
+        pipe.hgetall(key)
+        state = pipe.execute()[-1]
+        _publish(client, campaign_id, dict(progress_snapshot(state), type='status'))
+    except redis.RedisError as e:
+        logger.warning(f"PROGRESS: could not publish status for {campaign_id}: {e}")
+
+
+def sse_event(event, name=None):
+    lines = f"event: {name}\n" if name else ""
+    return f"{lines}data: {json.dumps(event)}\n\n"
+
+
+async def progress_events(campaign_id):
+    """
+    Async SSE body: the current snapshot, then every published event. The stream stays
+    open across pauses and completion (EventSource would only reconnect if it ended);
+    clients close it. Comments keep idle connections (and proxies) alive.
+    """
+    client = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    pubsub = client.pubsub()
+    try:
+        # Subscribe before reading the snapshot so no event falls between the two
+        await pubsub.subscribe(progress_channel(campaign_id))
+        state = await client.hgetall(progress_key(campaign_id))
+        snapshot = dict(progress_snapshot(state), type='snapshot') if state else {'type': 'snapshot', 'status': None}
+        yield sse_event(snapshot, 'progress')
+
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=KEEPALIVE_SECONDS)
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            yield sse_event(json.loads(message['data']), 'progress')
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
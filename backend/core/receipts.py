@@ -0,0 +1,141 @@
+import json
+import logging
+from collections import Counter, defaultdict
+from django.db import connection, transaction
+from .redis_client import get_redis
+from .stats import apply_counter_deltas, counter_deltas
+from .rollups import mark_hours_dirty
+
+logger = logging.getLogger(__name__)
+
+ACK_QUEUE_KEY = 'waha:acks'
+ACK_SCHEDULED_KEY = 'waha:acks:scheduled'
+ACK_BATCH_SIZE = 1000
+# Events arriving within this window are applied together
+ACK_BATCH_WINDOW_SECONDS = 1
+# Receipts only search recent MessageLog partitions; later ones are dropped
+ACK_MAX_AGE_DAYS = 30
+
+# WAHA ack levels: -1 ERROR, 0 PENDING, 1 SERVER, 2 DEVICE, 3 READ, 4 PLAYED
+ACK_STATUS = {2: 'DELIVERED', 3: 'READ', 4: 'READ'}
+# Receipts only move a log forward along SENT -> DELIVERED -> READ (never out of FAILED)
+STATUS_RANK = {'SENT': 1, 'DELIVERED': 2, 'READ': 3}
+
+
+def normalize_message_id(raw):
+    """
+    WAHA ids come as '<fromMe>_<chatId>_<key>[_<participant>]' strings or {'_serialized': ...,
+    'id': <key>} dicts depending on engine and endpoint; the key is what send responses and
+    acks share. Group ids end in the sender's JID, so the key is the third field, not the last.
+    """
+    if isinstance(raw, dict):
+        raw = raw.get('id') or raw.get('_serialized')
+    if not raw:
+        return None
+    parts = str(raw).split('_')
+    return parts[2] if len(parts) >= 3 else parts[-1]
+
+
+def extract_message_id(response_text):
+    """Message id from a sendText response body, or None."""
+    try:
+        data = json.loads(response_text)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    raw = data.get('id')
+    if raw is None and isinstance(data.get('key'), dict):
+        raw = data['key'].get('id')
+    return normalize_message_id(raw)
+
+
+def enqueue_ack(payload):
+    """
+    Queue one message.ack payload; returns True if it was relevant.
+    Called on the webhook request path, so it only touches Redis.
+    """
+    status = ACK_STATUS.get(payload.get('ack'))
+    message_id = normalize_message_id(payload.get('id'))
+    if status is None or message_id is None:
+        return False
+
+    client = get_redis()
+    client.rpush(ACK_QUEUE_KEY, json.dumps([message_id, status]))
+    # One drain per batch window rather than one task per event
+    if client.set(ACK_SCHEDULED_KEY, '1', nx=True, ex=60):
+        from .tasks import apply_waha_acks
+        apply_waha_acks.apply_async(countdown=ACK_BATCH_WINDOW_SECONDS)
+    return True
+
+
+def _pop_batch(client):
+    pipe = client.pipeline()
+    pipe.lrange(ACK_QUEUE_KEY, 0, ACK_BATCH_SIZE - 1)
+    pipe.ltrim(ACK_QUEUE_KEY, ACK_BATCH_SIZE, -1)
+    items, _ = pipe.execute()
+    return items
+
+
+def apply_ack_batch(acks):
+    """
+    Apply {message_id: status} in one UPDATE ... FROM (VALUES ...) and bump campaign
+    counters with the net funnel deltas. Returns the number of logs updated.
+    """
+    if not acks:
+        return 0
+    rows = [(message_id, status, STATUS_RANK[status]) for message_id, status in acks.items()]
+    values_sql = ', '.join(['(%s, %s, %s)'] * len(rows))
+    params = [value for row in rows for value in row]
+
+    sql = f"""
+        UPDATE core_messagelog AS m
+        SET status = v.status
+        FROM (VALUES {values_sql}) AS v(message_id, status, rank), core_messagelog AS old
+        WHERE m.waha_message_id = v.message_id
+          AND m.sent_at >= now() - interval '{ACK_MAX_AGE_DAYS} days'
+          AND old.id = m.id
+          AND old.sent_at = m.sent_at
+          AND old.sent_at >= now() - interval '{ACK_MAX_AGE_DAYS} days'
+          AND CASE m.status WHEN 'SENT' THEN 1 WHEN 'DELIVERED' THEN 2 WHEN 'READ' THEN 3 ELSE 99 END < v.rank
+        RETURNING m.campaign_id, old.status, m.status, m.sent_at
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            changed = cursor.fetchall()
+
+        deltas = defaultdict(Counter)
+        for campaign_id, old_status, new_status, _ in changed:
+            if campaign_id:
+                deltas[campaign_id].update(counter_deltas(old_status, new_status))
+        for campaign_id, delta in deltas.items():
+            apply_counter_deltas(campaign_id, dict(delta))
+    mark_hours_dirty(sent_at for *_, sent_at in changed)
+    return len(changed)
+
+
+def drain_ack_queue():
+    """Apply queued acks in batches until the queue is empty. Returns logs updated."""
+    client = get_redis()
+    updated = 0
+    try:
+        while True:
+            items = _pop_batch(client)
+            if not items:
+                break
+            acks = {}
+            for item in items:
+                message_id, status = json.loads(item)
+                # Keep the furthest receipt per message within the batch
+                if STATUS_RANK[status] > STATUS_RANK.get(acks.get(message_id), 0):
+                    acks[message_id] = status
+            updated += apply_ack_batch(acks)
+    finally:
+        client.delete(ACK_SCHEDULED_KEY)
+
+    # Events that raced the flag deletion still get a drain
+    if client.llen(ACK_QUEUE_KEY) and client.set(ACK_SCHEDULED_KEY, '1', nx=True, ex=60):
+        from .tasks import apply_waha_acks
+        apply_waha_acks.apply_async(countdown=ACK_BATCH_WINDOW_SECONDS)
+    return updated
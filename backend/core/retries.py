@@ -0,0 +1,93 @@
+import random
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+from .models import MessageLog
+
+# Failures worth another attempt: the node, the session or the network was the problem
+RETRYABLE_ERRORS = {'timeout', 'connection', 'server_error', 'rate_limited', 'session_not_ready', 'circuit_open'}
+
+MAX_ATTEMPTS = getattr(settings, 'WAHA_SEND_MAX_ATTEMPTS', 4)
+BACKOFF_BASE_SECONDS = getattr(settings, 'WAHA_RETRY_BASE_SECONDS', 30)
+BACKOFF_MAX_SECONDS = getattr(settings, 'WAHA_RETRY_MAX_SECONDS', 30 * 60)
+
+# WAHA error bodies that mean the session is (re)connecting rather than the request being bad
+_SESSION_NOT_READY_HINTS = ('session status is not', 'not ready', 'starting', 'scan_qr_code')
+_PERMANENT_HINTS = ('not registered', 'does not exist', 'not exist', 'invalid')
+
+
+def classify_failure(status_code=None, body='', exception=None):
+    """Map a failed send to an error class; see RETRYABLE_ERRORS for which ones are retried."""
+    if exception is not None:
+        name = type(exception).__name__.lower()
+        if 'timeout' in name:
+            return 'timeout'
+        return 'connection'
+    if status_code is None:
+        return 'rejected'
+    if status_code == 429:
+        return 'rate_limited'
+    if status_code >= 500:
+        text = (body or '').lower()
+        if any(hint in text for hint in _PERMANENT_HINTS):
+            return 'rejected'
+        return 'server_error'
+    text = (body or '').lower()
+    if any(hint in text for hint in _SESSION_NOT_READY_HINTS):
+        return 'session_not_ready'
+    return 'rejected'
+
+
+def is_retryable(error_class):
+    return error_class in RETRYABLE_ERRORS
+
+
+def backoff_seconds(attempt):
+    """Exponential backoff with equal jitter after `attempt` failed attempts."""
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)))
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+def schedule_retry(log):
+    """Put a failed log on the retry queue if its error is transient and attempts remain."""
+    if not is_retryable(log.error_class) or log.attempts >= MAX_ATTEMPTS:
+        return False
+    log.next_retry_at = timezone.now() + timedelta(seconds=backoff_seconds(log.attempts))
+    log.save(update_fields=['next_retry_at'])
+    return True
+
+
+def claim_due_retry(phone_id, campaign_id=None):
+    """
+    Atomically take the oldest due retry of a RUNNING campaign off the queue.
+    Retries of paused or stopped campaigns stay queued until the campaign runs again.
+    The conditional UPDATE makes the claim safe if two workers race for it.
+    """
+    now = timezone.now()
+    queue = MessageLog.objects.filter(phone_instance_id=phone_id, next_retry_at__lte=now, campaign__status='RUNNING')
+    if campaign_id is not None:
+        queue = queue.filter(campaign_id=campaign_id)
+    due = (
+        queue.order_by('next_retry_at')
+        .values_list('id', flat=True)[:5]
+    )
+    for log_id in due:
+        if MessageLog.objects.filter(id=log_id, next_retry_at__isnull=False).update(next_retry_at=None):
+            return (
+                MessageLog.objects.select_related('campaign', 'contact', 'group', 'property__media', 'body')
+                .defer('property__media__data')
+                .get(id=log_id)
+            )
+    return None
+
+
+def next_retry_due(phone_id, campaign_id=None):
+    queue = MessageLog.objects.filter(phone_instance_id=phone_id, next_retry_at__isnull=False)
+    if campaign_id is not None:
+        queue = queue.filter(campaign_id=campaign_id)
+    return queue.aggregate(due=Min('next_retry_at'))['due']
+
+
+def has_pending_retries(campaign_id):
+    return MessageLog.objects.filter(campaign_id=campaign_id, next_retry_at__isnull=False).exists()
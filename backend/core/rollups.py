@@ -0,0 +1,163 @@
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+import redis
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+from .models import MessageLog, MessageRollup
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Each refresh rebuilds the hours since the previous refresh (new logs always land there)
+# plus the older hours marked dirty by code that changes a log after it was sent:
+# receipts and retries (mark_hours_dirty).
+WATERMARK_KEY = 'rollups:refreshed_at'
+DIRTY_HOURS_KEY = 'rollups:dirty_hours'
+# Without a watermark (first run after a Redis flush) the rebuild falls back to this lookback
+LOOKBACK = timedelta(hours=getattr(settings, 'ROLLUP_LOOKBACK_HOURS', 48))
+# First build walks history in chunks so no single aggregate spans the whole table
+BACKFILL_CHUNK = timedelta(days=7)
+HOUR = timedelta(hours=1)
+# Postgres advisory lock held for a whole refresh: runs never overlap (the first backfill
+# can outlast the 5-minute beat), and a run finding it taken is skipped
+REFRESH_LOCK_ID = 4305
+
+BUCKETS = {'hour': TruncHour, 'day': TruncDay}
+DIMENSIONS = ('campaign', 'phone_instance', 'platform', 'status', 'error_class')
+
+
+def _hour_floor(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _from_epoch(value):
+    return datetime.fromtimestamp(float(value), tz=dt_timezone.utc)
+
+
+def mark_hours_dirty(sent_at_values):
+    """Queue the hours of logs whose status or error class changed for the next refresh."""
+    hours = {int(_hour_floor(sent_at).timestamp()) for sent_at in sent_at_values if sent_at}
+    if not hours:
+        return
+    try:
+        get_redis().sadd(DIRTY_HOURS_KEY, *hours)
+    except redis.RedisError as e:
+        logger.warning(f"ROLLUPS: could not mark {len(hours)} hours dirty ({e}); they stay stale until rebuilt")
+
+
+def _take_dirty_hours(client):
+    pipe = client.pipeline()
+    pipe.smembers(DIRTY_HOURS_KEY)
+    pipe.delete(DIRTY_HOURS_KEY)
+    hours, _ = pipe.execute()
+    return sorted(_from_epoch(hour) for hour in hours)
+
+
+def _ranges(hours):
+    """Merge sorted hour starts into [start, end) runs of consecutive hours."""
+    runs = []
+    for hour in hours:
+        if runs and runs[-1][1] == hour:
+            runs[-1][1] = hour + HOUR
+        else:
+            runs.append([hour, hour + HOUR])
+    return runs
+
+
+def _rebuild(start, end):
+    """Replace rollup rows for hours in [start, end) from one grouped aggregate."""
+    rows = (
+        MessageLog.objects.filter(sent_at__gte=start, sent_at__lt=end)
+        .annotate(hour=TruncHour('sent_at'))
+        .values('hour', 'campaign_id', 'phone_instance_id', 'platform', 'status', 'error_class')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    rollups = [MessageRollup(**row) for row in rows]
+    with transaction.atomic():
+        MessageRollup.objects.filter(hour__gte=start, hour__lt=end).delete()
+        MessageRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def _rebuild_chunked(start, end):
+    written = 0
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + BACKFILL_CHUNK, end)
+        written += _rebuild(chunk_start, chunk_end)
+        chunk_start = chunk_end
+    return written
+
+
+def refresh_rollups(now=None):
+    """Bring rollups up to date. Returns (hours rebuilt from, rows written); (None, 0) if skipped."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_lock(%s)', [REFRESH_LOCK_ID])
+        if not cursor.fetchone()[0]:
+            logger.info("ROLLUPS: another refresh is running; skipped")
+            return None, 0
+    try:
+        return _refresh(now or timezone.now())
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [REFRESH_LOCK_ID])
+
+
+def _refresh(now):
+    end = _hour_floor(now) + HOUR
+    client = get_redis()
+    watermark = client.get(WATERMARK_KEY)
+    # Taken before aggregating: marks made from here on are left for the next run
+    dirty = _take_dirty_hours(client)
+    if watermark is not None:
+        start = _hour_floor(_from_epoch(watermark))
+    else:
+        newest = MessageRollup.objects.aggregate(hour=Max('hour'))['hour']
+        if newest is not None:
+            start = newest - LOOKBACK
+        else:
+            oldest = MessageLog.objects.aggregate(sent_at=Min('sent_at'))['sent_at']
+            if oldest is None:
+                return None, 0
+            start = _hour_floor(oldest)
+
+    try:
+        written = _rebuild_chunked(start, end)
+        for run_start, run_end in _ranges([hour for hour in dirty if hour < start]):
+            written += _rebuild(run_start, run_end)
+    except Exception:
+        # Left dirty for the next run; the watermark has not moved either
+        mark_hours_dirty(dirty)
+        raise
+    client.set(WATERMARK_KEY, now.timestamp())
+    logger.info(f"ROLLUPS: rebuilt {start.isoformat()} -> {end.isoformat()} and {len(dirty)} dirty hours ({written} rows)")
+    return start, written
+
+
+def rollup_series(filters, bucket='hour', group_by=('status',)):
+    """
+    Counts per time bucket, split by group_by dimensions, e.g.
+    [{'bucket': ..., 'status': 'SENT', 'count': 42}, ...]
+    """
+    fields = [field for field in group_by if field in DIMENSIONS]
+    return list(
+        MessageRollup.objects.filter(**filters)
+        .annotate(bucket=BUCKETS[bucket]('hour'))
+        .values('bucket', *fields)
+        .annotate(count=Sum('count'))
+        .order_by('bucket', *fields)
+    )
+
+
+def rollup_totals(filters, group_by=('status',)):
+    fields = [field for field in group_by if field in DIMENSIONS]
+    return list(
+        MessageRollup.objects.filter(**filters)
+        .values(*fields)
+        .annotate(count=Sum('count'))
+        .order_by('-count')
+    )
@@ -0,0 +1,112 @@
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .models import Campaign, CampaignAudience, CampaignSettings, Contact, WhatsAppGroup
+
+RECURRENCE_INTERVALS = {
+    'DAILY': timedelta(days=1),
+    'WEEKLY': timedelta(days=7),
+}
+
+
+def in_send_window(settings_obj, now=None):
+    return seconds_until_window(settings_obj, now) == 0
+
+
+def seconds_until_window(settings_obj, now=None):
+    """0 inside the campaign's daily send window (or when it has none), else seconds until it opens."""
+    start, end = settings_obj.send_window_start, settings_obj.send_window_end
+    if start is None or end is None or start == end:
+        return 0
+    local = timezone.localtime(now or timezone.now())
+    current = local.time()
+    if start < end:
+        inside = start <= current < end
+    else:
+        # Wraps midnight, e.g. 21:00 -> 06:00
+        inside = current >= start or current < end
+    if inside:
+        return 0
+    opens = local.replace(hour=start.hour, minute=start.minute, second=start.second, microsecond=0)
+    if opens <= local:
+        opens += timedelta(days=1)
+    return (opens - local).total_seconds()
+
+
+def next_window_start(settings_obj, at):
+    """Earliest moment at or after `at` when the campaign may send."""
+    return at + timedelta(seconds=seconds_until_window(settings_obj, at))
+
+
+def resolve_audience(campaign):
+    """(contact_ids, group_ids) the campaign targets right now."""
+    contact_ids = []
+    if campaign.send_to_all_contacts and not campaign.target_tags:
+        contact_ids = list(Contact.objects.filter(status='ACTIVE').values_list('id', flat=True))
+    elif campaign.target_tags:
+        # OR logic: contact has ANY of the tags
+        contact_ids = list(
+            Contact.objects.filter(status='ACTIVE', tags__overlap=campaign.target_tags).values_list('id', flat=True)
+        )
+
+    group_ids = []
+    if campaign.send_to_whatsapp:
+        if campaign.send_to_all_groups:
+            group_ids = list(WhatsAppGroup.objects.values_list('id', flat=True))
+        else:
+            group_ids = list(campaign.target_groups.values_list('id', flat=True))
+    return contact_ids, group_ids
+
+
+def snapshot_audience(campaign):
+    contact_ids, group_ids = resolve_audience(campaign)
+    audience, _ = CampaignAudience.objects.update_or_create(
+        campaign=campaign,
+        defaults={
+            'contact_ids': [str(pk) for pk in contact_ids],
+            'group_ids': [str(pk) for pk in group_ids],
+        },
+    )
+    return audience
+
+
+def next_occurrence(campaign, now=None):
+    """The next future run of a recurring campaign, or None for one-offs."""
+    interval = RECURRENCE_INTERVALS.get(campaign.recurrence)
+    if interval is None or campaign.scheduled_at is None:
+        return None
+    now = now or timezone.now()
+    next_at = campaign.scheduled_at + interval
+    while next_at <= now:
+        next_at += interval
+    return next_at
+
+
+@transaction.atomic
+def schedule_next_run(campaign, scheduled_at):
+    """Copy a recurring campaign (targeting, content, settings) as the next SCHEDULED run."""
+    run = Campaign.objects.create(
+        name=campaign.name,
+        send_to_all_groups=campaign.send_to_all_groups,
+        target_tags=campaign.target_tags,
+        send_to_all_contacts=campaign.send_to_all_contacts,
+        send_to_whatsapp=campaign.send_to_whatsapp,
+        post_to_facebook=campaign.post_to_facebook,
+        post_to_instagram=campaign.post_to_instagram,
+        send_weight=campaign.send_weight,
+        recurrence=campaign.recurrence,
+        scheduled_at=scheduled_at,
+        status='SCHEDULED',
+    )
+    run.properties.set(campaign.properties.all())
+    run.target_groups.set(campaign.target_groups.all())
+
+    settings_obj = getattr(campaign, 'settings', None)
+    if settings_obj is not None:
+        fields = {
+            f.name: getattr(settings_obj, f.name)
+            for f in CampaignSettings._meta.concrete_fields
+            if f.name not in ('id', 'campaign')
+        }
+        CampaignSettings.objects.create(campaign=run, **fields)
+    return run
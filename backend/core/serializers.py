@@ -1,19 +1,44 @@
+from django.template import TemplateSyntaxError
 from rest_framework import serializers
-from .models import Contact, ContactCategory, Property, Campaign, CampaignSettings, PhoneInstance, MessageLog, WhatsAppGroup, GroupCollection
+from .models import Contact, ContactCategory, Property, Campaign, CampaignSettings, PhoneInstance, MessageLog, WhatsAppGroup, GroupCollection, WahaNode
+from .tag_counts import get_tag_counts
+from .group_resolver import resolve_group_jids, groups_for_collection
+from .templating import compile_message
+from .media import media_path
+
+class WahaNodeSerializer(serializers.ModelSerializer):
+    session_count = serializers.IntegerField(read_only=True, default=0)
+
+    class Meta:
+        model = WahaNode
+        fields = '__all__'
+        read_only_fields = ['is_healthy', 'last_health_check', 'last_error']
 
 class PhoneInstanceSerializer(serializers.ModelSerializer):
     class Meta:
         model = PhoneInstance
         fields = '__all__'
-        read_only_fields = ['session_name']
+        read_only_fields = ['session_name', 'node', 'api_url', 'provisioning_state', 'provisioning_error', 'provisioning_updated_at', 'provisioning_history', 'total_sent', 'sent_today']
 
     groups = serializers.SerializerMethodField()
-    groups_count = serializers.IntegerField(source='groups.count', read_only=True)
+    groups_count = serializers.SerializerMethodField()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Groups are only embedded on request (?expand=groups); otherwise they
+        # are served paginated from /groups/?phone=<id> to keep the poll light.
+        request = self.context.get('request')
+        expand = request.query_params.get('expand', '').split(',') if request else []
+        if 'groups' not in expand:
+            self.fields.pop('groups')
 
     def get_groups(self, obj):
         return WhatsAppGroupSerializer(obj.groups.all(), many=True).data
 
-        return WhatsAppGroupSerializer(obj.groups.all(), many=True).data
+    def get_groups_count(self, obj):
+        # Annotated by PhoneInstanceViewSet; fall back for freshly created instances
+        count = getattr(obj, 'groups_count', None)
+        return count if count is not None else obj.groups.count()
 
 class ContactCategorySerializer(serializers.ModelSerializer):
     contact_count = serializers.SerializerMethodField()
@@ -24,7 +49,12 @@ class ContactCategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def get_contact_count(self, obj):
-        return Contact.objects.filter(tags__contains=[obj.name]).count()
+        # Counts come from one cached GROUP BY (see tag_counts); the viewset
+        # primes them in the context so a whole page costs at most one query.
+        tag_counts = self.context.get('tag_counts')
+        if tag_counts is None:
+            tag_counts = get_tag_counts()
+        return tag_counts.get(obj.name, 0)
 
 class ContactSerializer(serializers.ModelSerializer):
     class Meta:
@@ -32,20 +62,43 @@ class ContactSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class PropertySerializer(serializers.ModelSerializer):
+    # Set through /properties/<id>/media/ (upload), not by id
+    media = serializers.PrimaryKeyRelatedField(read_only=True)
+    media_url = serializers.SerializerMethodField()
+
     class Meta:
         model = Property
         fields = '__all__'
 
+    def get_media_url(self, obj):
+        return media_path(obj.media) if obj.media_id else None
+
+    def validate_content(self, value):
+        # Personalized bodies must compile before a campaign tries to send them
+        try:
+            compile_message(value)
+        except TemplateSyntaxError as e:
+            raise serializers.ValidationError(f"Template error: {e}")
+        return value
+
 class CampaignSettingsSerializer(serializers.ModelSerializer):
     class Meta:
         model = CampaignSettings
-        fields = ['delay_between_messages_min', 'delay_between_messages_max', 'warmup_mode', 'pause_every_x_messages', 'pause_duration_seconds', 'max_messages_per_hour']
+        fields = ['delay_between_messages_min', 'delay_between_messages_max', 'warmup_mode', 'pause_every_x_messages', 'pause_duration_seconds', 'max_messages_per_hour', 'send_window_start', 'send_window_end']
 
 class WhatsAppGroupSerializer(serializers.ModelSerializer):
     class Meta:
         model = WhatsAppGroup
         fields = '__all__'
 
+class GroupCollectionListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Resolve the JIDs of every collection on the page in one batched lookup
+        collections = list(data.all() if hasattr(data, 'all') else data)
+        all_jids = [jid for collection in collections for jid in collection.group_ids]
+        self.context['groups_by_jid'] = resolve_group_jids(all_jids)
+        return super().to_representation(collections)
+
 class GroupCollectionSerializer(serializers.ModelSerializer):
     """
     Persists JIDs (group_ids) so collections survive phone deletions.
@@ -56,11 +109,14 @@ class GroupCollectionSerializer(serializers.ModelSerializer):
     class Meta:
         model = GroupCollection
         fields = '__all__'
+        list_serializer_class = GroupCollectionListSerializer
 
     def get_groups_details(self, obj):
         """Resolve JIDs to current WhatsAppGroup names for display"""
-        groups = WhatsAppGroup.objects.filter(group_id__in=obj.group_ids)
-        return WhatsAppGroupSerializer(groups, many=True).data
+        groups_by_jid = self.context.get('groups_by_jid')
+        if groups_by_jid is None:
+            groups_by_jid = resolve_group_jids(obj.group_ids)
+        return groups_for_collection(obj.group_ids, groups_by_jid)
 
 class CampaignSerializer(serializers.ModelSerializer):
     settings = CampaignSettingsSerializer()
@@ -70,18 +126,31 @@ class CampaignSerializer(serializers.ModelSerializer):
     class Meta:
         model = Campaign
         fields = '__all__'
+        # Counters are maintained by the send/delivery paths (core.stats), never by clients
+        read_only_fields = ['sent_count', 'failed_count', 'delivered_count', 'read_count', 'recovered_count', 'first_sent_at']
+
+    first_try_count = serializers.SerializerMethodField()
+    time_to_first_send = serializers.SerializerMethodField()
 
-    sent_count = serializers.SerializerMethodField()
+    def get_first_try_count(self, obj):
+        # Sent on the first attempt (the rest of sent_count was recovered by retries)
+        return obj.sent_count - obj.recovered_count
 
-    def get_sent_count(self, obj):
-        # Count non-failed messages
-        return MessageLog.objects.filter(campaign=obj, status__in=['SENT', 'DELIVERED', 'READ']).count()
+    def get_time_to_first_send(self, obj):
+        """Seconds from start to the first successful WhatsApp send."""
+        if obj.started_at and obj.first_sent_at:
+            return (obj.first_sent_at - obj.started_at).total_seconds()
+        return None
 
     def create(self, validated_data):
         settings_data = validated_data.pop('settings')
         properties_data = validated_data.pop('properties')
         target_groups_data = validated_data.pop('target_groups', [])
         
+        if validated_data.get('scheduled_at') and validated_data.get('status', 'DRAFT') == 'DRAFT':
+            # Picked up by core.tasks.dispatch_scheduled_campaigns
+            validated_data['status'] = 'SCHEDULED'
+
         campaign = Campaign.objects.create(**validated_data)
         campaign.properties.set(properties_data)
         campaign.target_groups.set(target_groups_data)
@@ -94,7 +163,8 @@ class MessageLogSerializer(serializers.ModelSerializer):
     contact_phone = serializers.CharField(source='contact.phone', read_only=True)
     contact_name = serializers.CharField(source='contact.name', read_only=True)
     contact_tags = serializers.ListField(source='contact.tags', read_only=True)
+    message_text = serializers.CharField(source='render_text', read_only=True)
 
     class Meta:
         model = MessageLog
-        fields = '__all__'
\ No newline at end of file
+        exclude = ['template_vars']
\ No newline at end of file
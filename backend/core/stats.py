@@ -0,0 +1,97 @@
+import logging
+from django.db.models import Count, F, Q
+from .models import Campaign, MessageLog
+from .partitions import oldest_retained_month
+
+logger = logging.getLogger(__name__)
+
+# Which Campaign counters a single MessageLog in a given status contributes to.
+# Counters are cumulative along the delivery funnel: a READ message is also
+# delivered and sent, so sent_count keeps its old meaning of "not failed".
+STATUS_COUNTERS = {
+    'SENT': ('sent_count',),
+    'DELIVERED': ('sent_count', 'delivered_count'),
+    'READ': ('sent_count', 'delivered_count', 'read_count'),
+    'FAILED': ('failed_count',),
+}
+
+
+def counter_deltas(old_status, new_status):
+    """Counter changes when a log moves from old_status (None if new) to new_status."""
+    deltas = {}
+    for field in STATUS_COUNTERS.get(new_status, ()):
+        deltas[field] = deltas.get(field, 0) + 1
+    for field in STATUS_COUNTERS.get(old_status, ()):
+        deltas[field] = deltas.get(field, 0) - 1
+    return {field: delta for field, delta in deltas.items() if delta}
+
+
+def apply_counter_deltas(campaign_id, deltas):
+    """Atomically bump counters with a single UPDATE (no read-modify-write)."""
+    if not campaign_id or not deltas:
+        return
+    Campaign.objects.filter(id=campaign_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def record_status_change(campaign_id, old_status, new_status):
+    apply_counter_deltas(campaign_id, counter_deltas(old_status, new_status))
+
+
+def record_recovery(campaign_id):
+    """A previously FAILED log succeeded on retry."""
+    apply_counter_deltas(campaign_id, dict(counter_deltas('FAILED', 'SENT'), recovered_count=1))
+
+
+def create_message_log(**fields):
+    """Create a MessageLog and keep its campaign's counters in step."""
+    log = MessageLog.objects.create(**fields)
+    record_status_change(log.campaign_id, None, log.status)
+    return log
+
+
+def reconcile_campaign_stats(campaign_ids=None):
+    """
+    Recompute counters from MessageLog in one grouped aggregate.
+    Repairs drift from crashed workers or manual edits; returns campaigns fixed.
+    """
+    logs = MessageLog.objects.filter(campaign__isnull=False)
+    campaigns = Campaign.objects.all()
+    oldest = oldest_retained_month()
+    if oldest is not None:
+        # Campaigns reaching into archived partitions keep their counters as they were
+        campaigns = campaigns.filter(created_at__gte=oldest)
+        logs = logs.filter(sent_at__gte=oldest)
+    if campaign_ids is not None:
+        logs = logs.filter(campaign_id__in=campaign_ids)
+        campaigns = campaigns.filter(id__in=campaign_ids)
+
+    actual = {
+        row['campaign_id']: row
+        for row in logs.values('campaign_id').annotate(
+            sent_count=Count('id', filter=Q(status__in=['SENT', 'DELIVERED', 'READ'])),
+            failed_count=Count('id', filter=Q(status='FAILED')),
+            delivered_count=Count('id', filter=Q(status__in=['DELIVERED', 'READ'])),
+            read_count=Count('id', filter=Q(status='READ')),
+            recovered_count=Count('id', filter=Q(status__in=['SENT', 'DELIVERED', 'READ'], attempts__gt=1)),
+        )
+    }
+
+    fields = ['sent_count', 'failed_count', 'delivered_count', 'read_count', 'recovered_count']
+    drifted = []
+    for campaign in campaigns.only('id', *fields):
+        row = actual.get(campaign.id, {})
+        changed = False
+        for field in fields:
+            value = row.get(field, 0)
+            if getattr(campaign, field) != value:
+                setattr(campaign, field, value)
+                changed = True
+        if changed:
+            drifted.append(campaign)
+
+    if drifted:
+        Campaign.objects.bulk_update(drifted, fields, batch_size=500)
+        logger.info(f"STATS_RECONCILE: corrected counters for {len(drifted)} campaigns")
+    return len(drifted)
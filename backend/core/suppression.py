@@ -0,0 +1,130 @@
+import logging
+import redis
+from .models import Contact
+from .phones import chat_id_for
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Chat ids that must never be messaged (contacts UNSUBSCRIBED or BLOCKED), checked by the
+# sender right before every send so opt-outs take effect mid-campaign. The database stays
+# the source of truth: rebuild_suppression() recreates the set from Contact.status.
+SUPPRESSION_KEY = 'suppression:chat_ids'
+SUPPRESSED_STATUSES = ('UNSUBSCRIBED', 'BLOCKED')
+REBUILD_BATCH_SIZE = 5000
+# Chat ids already messaged by a campaign run, so a number reached through several
+# contact rows, tags or phones gets the campaign once
+DEDUPE_TTL = 7 * 24 * 60 * 60
+
+# KEYS: suppression, campaign recipients   ARGV: chat id, ttl
+_CLAIM = """
+if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1 then
+    return 'suppressed'
+end
+if redis.call('SADD', KEYS[2], ARGV[1]) == 0 then
+    return 'duplicate'
+end
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return 'ok'
+"""
+
+
+def campaign_recipients_key(campaign_id):
+    return f"campaign:{campaign_id}:recipients"
+
+
+def suppress(phones):
+    chat_ids = [chat_id for chat_id in map(chat_id_for, phones) if chat_id]
+    if chat_ids:
+        get_redis().sadd(SUPPRESSION_KEY, *chat_ids)
+
+
+def unsuppress(phones):
+    chat_ids = [chat_id for chat_id in map(chat_id_for, phones) if chat_id]
+    if chat_ids:
+        get_redis().srem(SUPPRESSION_KEY, *chat_ids)
+
+
+def _suppressed_elsewhere(phone):
+    """Whether any contact row for this number (in any stored format) is still opted out."""
+    chat_id = chat_id_for(phone)
+    if not chat_id:
+        return False
+    return Contact.objects.filter(chat_id=chat_id, status__in=SUPPRESSED_STATUSES).exists()
+
+
+def sync_contact(contact, deleted=False):
+    """
+    Mirror one contact's status into the set (best-effort; the daily rebuild repairs misses).
+    Call after the row is saved or deleted: a number stays suppressed while any other
+    row for it is still UNSUBSCRIBED or BLOCKED.
+    """
+    try:
+        if contact.status in SUPPRESSED_STATUSES and not deleted:
+            suppress([contact.phone])
+        elif not _suppressed_elsewhere(contact.phone):
+            unsuppress([contact.phone])
+    except redis.RedisError as e:
+        logger.warning(f"SUPPRESSION: could not sync {contact.phone}: {e}")
+
+
+def claim_recipient(campaign_id, chat_id):
+    """
+    One O(1) round trip before each send: 'ok' to send, 'suppressed' for opted-out
+    numbers, 'duplicate' if this campaign run already messaged the chat id.
+    Fails open when Redis is unavailable.
+    """
+    try:
+        return get_redis().eval(_CLAIM, 2, SUPPRESSION_KEY, campaign_recipients_key(campaign_id), chat_id, DEDUPE_TTL)
+    except redis.RedisError as e:
+        logger.warning(f"SUPPRESSION: check unavailable for {chat_id} ({e}); sending")
+        return 'ok'
+
+
+def release_recipient(campaign_id, chat_id):
+    """Undo a claim whose send never went out, so the requeued target is not a duplicate."""
+    if not chat_id:
+        return
+    try:
+        get_redis().srem(campaign_recipients_key(campaign_id), chat_id)
+    except redis.RedisError as e:
+        logger.warning(f"SUPPRESSION: could not release {chat_id} for {campaign_id}: {e}")
+
+
+def reset_campaign_recipients(campaign_id):
+    try:
+        get_redis().delete(campaign_recipients_key(campaign_id))
+    except redis.RedisError as e:
+        logger.warning(f"SUPPRESSION: could not reset recipients of {campaign_id}: {e}")
+
+
+def rebuild_suppression():
+    """Recreate the set from the database and swap it in atomically. Returns its size."""
+    client = get_redis()
+    staging = f'{SUPPRESSION_KEY}:rebuild'
+    client.delete(staging)
+    phones = Contact.objects.filter(status__in=SUPPRESSED_STATUSES).values_list('phone', flat=True)
+    batch = []
+    for phone in phones.iterator(chunk_size=REBUILD_BATCH_SIZE):
+        chat_id = chat_id_for(phone)
+        if chat_id:
+            batch.append(chat_id)
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            client.sadd(staging, *batch)
+            batch = []
+    if batch:
+        client.sadd(staging, *batch)
+    if client.exists(staging):
+        client.rename(staging, SUPPRESSION_KEY)
+    else:
+        client.delete(SUPPRESSION_KEY)
+    return client.scard(SUPPRESSION_KEY)
+
+
+def ensure_suppression():
+    """Build the set if Redis has none (fresh install, flushed Redis) before a campaign relies on it."""
+    try:
+        if not get_redis().exists(SUPPRESSION_KEY):
+            rebuild_suppression()
+    except redis.RedisError as e:
+        logger.warning(f"SUPPRESSION: could not build the suppression list: {e}")
@@ -0,0 +1,91 @@
+import logging
+from collections import Counter
+import redis
+from django.db import connection
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# {tag: contact count} as a Redis hash, so imports and edits running at the same time
+# adjust it with HINCRBY instead of overwriting each other's read-modify-write
+TAG_COUNTS_KEY = 'tags:contact_counts'
+# Safety net: even if an incremental update is missed, counts self-heal within this window
+TAG_COUNTS_TTL = 60 * 60
+
+# KEYS: counts   ARGV: tag, change, tag, change, ...
+_APPLY = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 1, #ARGV, 2 do
+    if redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1]) <= 0 then
+        redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+end
+return 1
+"""
+
+
+def compute_tag_counts():
+    """Count contacts per tag in a single GROUP BY pass over unnest(tags)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT t.tag, COUNT(DISTINCT c.id)
+            FROM core_contact c, unnest(c.tags) AS t(tag)
+            GROUP BY t.tag
+            """
+        )
+        return {tag: count for tag, count in cursor.fetchall()}
+
+
+def get_tag_counts():
+    """Cached {tag: contact_count} mapping, rebuilt in one query on a miss."""
+    try:
+        client = get_redis()
+        counts = client.hgetall(TAG_COUNTS_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"TAG_COUNTS: cache unavailable ({e}); counting from the database")
+        return compute_tag_counts()
+    if counts:
+        return {tag: int(count) for tag, count in counts.items()}
+    counts = compute_tag_counts()
+    if counts:
+        try:
+            pipe = client.pipeline()
+            pipe.delete(TAG_COUNTS_KEY)
+            pipe.hset(TAG_COUNTS_KEY, mapping=counts)
+            pipe.expire(TAG_COUNTS_KEY, TAG_COUNTS_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"TAG_COUNTS: could not cache counts: {e}")
+    return counts
+
+
+def tag_delta(old_tags, new_tags):
+    """Per-tag change in contact count when a contact goes from old_tags to new_tags."""
+    old_set = set(old_tags or [])
+    new_set = set(new_tags or [])
+    delta = Counter()
+    for tag in new_set - old_set:
+        delta[tag] += 1
+    for tag in old_set - new_set:
+        delta[tag] -= 1
+    return delta
+
+
+def apply_tag_delta(delta):
+    """
+    Incrementally adjust the cached counts after an import or re-tag.
+    If nothing is cached yet, the next read rebuilds from the database anyway.
+    """
+    args = []
+    for tag, change in delta.items():
+        if change:
+            args.extend([tag, change])
+    if not args:
+        return
+    try:
+        get_redis().eval(_APPLY, 1, TAG_COUNTS_KEY, *args)
+    except redis.RedisError as e:
+        logger.warning(f"TAG_COUNTS: could not apply delta ({e}); counts refresh within the hour")
@@ -1,244 +1,745 @@
+import csv
+import io
+import os
+import json
+import uuid
 import time
 import random
 import requests
 import logging
+from collections import Counter, namedtuple
+from datetime import timedelta
 from celery import shared_task
+from django.db.models import Q
 from django.utils import timezone
 from django.conf import settings  # <--- Added to pull config from settings.py
-from .models import Campaign, Contact, PhoneInstance, MessageLog, Property, WhatsAppGroup
+from django.core.files.storage import FileSystemStorage
+from .models import Campaign, CampaignAudience, Contact, PhoneInstance, MessageLog, Property, WhatsAppGroup, WahaNode
+from .tag_counts import tag_delta, apply_tag_delta
+from .stats import create_message_log, record_recovery, reconcile_campaign_stats
+from .receipts import extract_message_id, drain_ack_queue
+from .lanes import open_urgent_lane, close_urgent_lane, has_urgent_work, BULK_YIELD_SECONDS
+from .phone_lease import PhoneLease, incr_phone_send_count
+from .redis_client import get_redis
+from .phone_counters import count_phone_send, daily_limit_wait, under_daily_limit, flush_phone_counters, reset_daily_counters
+from .templating import compile_message, render_message, pack_digest, DIGEST_SEPARATOR
+from .message_bodies import body_id_for
+from .partitions import ensure_partitions, expired_partitions, archive_partition, default_partition_rows, DEFAULT_PARTITION
+from .rollups import refresh_rollups, mark_hours_dirty
+from .pacing import next_delay, current_delay, record_send_outcome, hourly_cap_wait, count_hourly_send, simulate_send_schedule, SIMULATION_MAX_MESSAGES
+from .progress import start_progress, record_progress, record_recovered, record_skipped, set_progress_status
+from .media import media_reference
+from .suppression import chat_id_for, claim_recipient, release_recipient, reset_campaign_recipients, rebuild_suppression, ensure_suppression
+from .scheduling import resolve_audience, snapshot_audience, seconds_until_window, next_window_start, next_occurrence, schedule_next_run
+from .retries import classify_failure, schedule_retry, claim_due_retry, next_retry_due, has_pending_retries
+from . import waha
+from .waha import WAHA_URL, waha_headers
+from .circuit_breaker import breaker_for, is_node_failure, CLOSED, OPEN
+
+CIRCUIT_OPEN_ERROR = "CIRCUIT_OPEN"
 
 logger = logging.getLogger(__name__)
 
-# WAHA API URL (Internal Docker Network)
-WAHA_URL = "http://waha:3000"
-
-def send_waha_message(session_name, phone_number, message, api_url=WAHA_URL):
-    """Helper to actually hit the API with correct authentication headers."""
-    # Sanitize phone number (remove + and spaces), unless it's a group ID
-    if '@' in str(phone_number):
-        # Allow group IDs like 120363@g.us
-        chat_id = str(phone_number)
+# Broker priorities (Redis transport: 0 is served first, see CELERY_BROKER_TRANSPORT_OPTIONS)
+TASK_PRIORITY_INSTANT = 0
+TASK_PRIORITY_DEFAULT = 5
+
+# Long send loops hand their remaining work back to the queue after this long, so
+# no single task outlives the broker visibility timeout (acks_late) or hogs a worker.
+SEND_TASK_SLICE_SECONDS = getattr(settings, 'SEND_TASK_SLICE_SECONDS', 15 * 60)
+
+# How often a send task waiting for a busy phone checks back (see core.phone_lease)
+LEASE_POLL_SECONDS = 15
+# A phone's remaining targets are kept in Redis under a handle the send task carries
+PHONE_TARGETS_TTL = 7 * 24 * 60 * 60
+URGENT_LEASE_POLL_SECONDS = 2
+
+# Scheduled campaigns get their audience resolved this far ahead of the start
+AUDIENCE_LEAD_SECONDS = getattr(settings, 'CAMPAIGN_AUDIENCE_LEAD_SECONDS', 15 * 60)
+# Longest countdown used to wait for a send window; kept under the broker visibility timeout
+WINDOW_RECHECK_SECONDS = 30 * 60
+# The hourly counter reconcile only looks at campaigns active this recently; delivery and
+# read receipts keep moving counters for a while after a campaign completes
+RECONCILE_WINDOW = timedelta(seconds=getattr(settings, 'STATS_RECONCILE_WINDOW_SECONDS', 3 * 24 * 60 * 60))
+
+# Uploaded contact CSVs: the view saves the file here and hands the import task its name,
+# so large uploads never travel through the broker
+import_uploads = FileSystemStorage(location=getattr(settings, 'IMPORT_UPLOAD_DIR', os.path.join(settings.BASE_DIR, 'imports')))
+
+class SendResult(namedtuple('SendResult', ['success', 'response', 'status_code', 'error_class', 'message_id'], defaults=[None])):
+    """Outcome of one WAHA send; error_class is None on success (see core.retries)."""
+
+def send_waha_message(session_name, phone_number, message, api_url=WAHA_URL, media=None):
+    """
+    Helper to actually hit the API with correct authentication headers.
+    With media (a core.media.media_reference) the message goes out as the image's caption.
+    """
+    # Group ids pass through; phone numbers are normalized (same rules as the suppression list)
+    chat_id = chat_id_for(phone_number)
+    if chat_id is None:
+        logger.warning(f"Skipping empty phone number: {phone_number}")
+        return SendResult(False, "Invalid Phone Number", None, 'invalid_number')
+
+    if media:
+        # WAHA downloads the image from the URL in `media`; we never upload the bytes
+        endpoint, timeout = "sendImage", 30
+        payload = {"session": session_name, "chatId": chat_id, "file": media, "caption": message}
     else:
-        # Robust Sanitization for Individual Contacts
-        clean_phone = ''.join(filter(str.isdigit, str(phone_number)))
-        
-        # Strip leading zeros (handle 098... or 0091...)
-        clean_phone = clean_phone.lstrip('0')
-        
-        if not clean_phone:
-            logger.warning(f"Skipping empty phone number: {phone_number}")
-            return False, "Invalid Phone Number"
-            
-        # Auto-correct common issues
-        if len(clean_phone) == 10:
-            clean_phone = '91' + clean_phone  # Default to India if missing
-        elif len(clean_phone) > 15:
-             # Too long? formatting issue? Log warning but try anyway
-             logger.warning(f"Suspicious phone number length: {clean_phone}")
-             
-        chat_id = f"{clean_phone}@c.us"
-
-    payload = {
-        "session": session_name,
-        "chatId": chat_id,
-        "text": message
-    }
-    
-    # Use the secure key from settings.py
-    api_key = getattr(settings, 'WAHA_API_KEY', 'secret')
-    headers = {
-        'X-Api-Key': api_key,
-        'Content-Type': 'application/json',
-        'Accept': 'application/json'
-    }
-    
+        endpoint, timeout = "sendText", 10
+        payload = {"session": session_name, "chatId": chat_id, "text": message}
+
+    # A node known to be down costs a Redis round trip, not a 10s timeout
+    breaker = breaker_for(api_url)
+    if not breaker.allow():
+        return SendResult(False, f"{CIRCUIT_OPEN_ERROR}: {api_url} unavailable", None, 'circuit_open')
+
     try:
         response = requests.post(
-            f"{api_url}/api/sendText",
+            f"{api_url}/api/{endpoint}",
             json=payload,
-            headers=headers,
-            timeout=10
+            headers=waha_headers(),
+            timeout=timeout
         )
-        return response.status_code == 201 or response.status_code == 200, response.text
     except Exception as e:
         logger.error(f"WAHA_SEND_ERROR: {e}")
-        return False, str(e)
+        breaker.record_failure()
+        return SendResult(False, str(e), None, classify_failure(exception=e))
 
-@shared_task
-def process_phone_queue(phone_id, campaign_id, contact_ids, property_ids, group_ids=None):
+    if is_node_failure(response.status_code):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    if response.status_code in (200, 201):
+        return SendResult(True, response.text, response.status_code, None, extract_message_id(response.text))
+    return SendResult(False, response.text, response.status_code, classify_failure(response.status_code, response.text))
+
+def _node_ready(breaker, phone):
+    """
+    Whether sends may go to the phone's node. Once the cooldown is over one caller probes
+    it with a session status check (closing or re-tripping the breaker); the others wait,
+    so a half-open node never turns queued targets into circuit_open failures.
+    """
+    state = breaker.state()
+    if state == CLOSED:
+        return True
+    if state == OPEN or not breaker.allow():
+        return False
+    try:
+        waha.get_session(phone.api_url, phone.session_name)
+    except requests.HTTPError as e:
+        if is_node_failure(e.response.status_code):
+            breaker.record_failure()
+            return False
+    except requests.RequestException as e:
+        logger.warning(f"Probe of {phone.api_url} failed: {e}")
+        breaker.record_failure()
+        return False
+    breaker.record_success()
+    return True
+
+def _human_delay(settings_obj, phone_id):
+    """Human mimic delay before each send, adapted to how the phone is faring (core.pacing)."""
+    delay = next_delay(phone_id, settings_obj)
+    logger.info(f"⏳ Waiting {delay:.1f}s (Warmup: {settings_obj.warmup_mode})...")
+    time.sleep(delay)
+
+def _rest_if_due(settings_obj, sent_count):
+    """Pulse & Rest"""
+    if sent_count > 0 and settings_obj.pause_every_x_messages > 0:
+        if sent_count % settings_obj.pause_every_x_messages == 0:
+            # Use the configured pause duration with some jitter (+/- 20%)
+            base_pause = settings_obj.pause_duration_seconds
+            actual_pause = random.uniform(base_pause * 0.8, base_pause * 1.2)
+            logger.info(f"😴 Batch Pause: Resting for {actual_pause:.1f}s after {sent_count} messages")
+            time.sleep(actual_pause)
+
+def _count_phone_send(phone):
+    # Redis INCR instead of phone.save(): tasks sharing a phone no longer overwrite each other
+    count_phone_send(phone.id)
+    # Phone-wide so pulse & rest holds across campaigns taking turns on the phone
+    return incr_phone_send_count(phone.id)
+
+def _retry_message(phone, log):
+    """Re-send a FAILED log from the retry queue, updating the same row."""
+    dest_id = log.contact.phone if log.contact else (log.group.group_id if log.group else log.waha_group_id)
+    media = media_reference(log.property.media) if log.property and log.property.media_id else None
+    result = send_waha_message(phone.session_name, dest_id, log.render_text(), api_url=phone.api_url, media=media)
+    if result.error_class == 'circuit_open':
+        # Nothing was sent: back on the queue without using up an attempt
+        retry_at = timezone.now() + timedelta(seconds=max(breaker_for(phone.api_url).retry_after(), 1))
+        MessageLog.objects.filter(id=log.id).update(next_retry_at=retry_at)
+        return result
+    log.attempts += 1
+    if result.success:
+        log.status = 'SENT'
+        log.error_message = None
+        log.error_class = ''
+        log.waha_message_id = result.message_id
+        log.save(update_fields=['status', 'error_message', 'error_class', 'attempts', 'waha_message_id'])
+        record_recovery(log.campaign_id)
+        record_recovered(log.campaign_id, phone.name)
+        logger.info(f"🔁 Retry succeeded after {log.attempts} attempts ({log.id})")
+    else:
+        log.error_message = result.response
+        log.error_class = result.error_class or ''
+        log.save(update_fields=['error_message', 'error_class', 'attempts'])
+        if not schedule_retry(log):
+            logger.warning(f"🔁 Giving up on {log.id} after {log.attempts} attempts ({log.error_class})")
+    # The log keeps its original sent_at, so its rollup hour has to be rebuilt
+    mark_hours_dirty([log.sent_at])
+    return result
+
+def _process_due_retries(phone, campaign, settings_obj, sent_count):
+    """
+    Drain this campaign's due retries with the same pacing as fresh sends. Other campaigns'
+    retries on the phone are left to their own tasks, under their own settings and caps.
+    Returns the updated sent_count.
+    """
+    breaker = breaker_for(phone.api_url)
+    while True:
+        if breaker.state() != CLOSED:
+            # Retries wait for a healthy node; the send loop pauses or probes
+            return sent_count
+        log = claim_due_retry(phone.id, campaign.id)
+        if log is None:
+            return sent_count
+        if log.campaign is None or log.campaign.status != 'RUNNING':
+            # Paused between the claim and here: put the retry back for when it resumes
+            MessageLog.objects.filter(id=log.id).update(next_retry_at=timezone.now())
+            continue
+        _human_delay(settings_obj, phone.id)
+        result = _retry_message(phone, log)
+        if result.error_class == 'circuit_open':
+            return sent_count
+        count_hourly_send(campaign.id, phone.id, settings_obj.max_messages_per_hour)
+        record_send_outcome(phone.id, settings_obj, result.success, result.error_class)
+        if result.success:
+            sent_count += 1
+            _rest_if_due(settings_obj, _count_phone_send(phone) or sent_count)
+
+def _sends_per_target(campaign, properties):
+    """Messages each recipient gets (estimated from the templates in digest mode)."""
+    if campaign.digest_mode:
+        photos = sum(1 for prop in properties if prop.media_id)
+        return len(pack_digest([prop.content for prop in properties if not prop.media_id])) + photos
+    return len(properties)
+
+def _log_skipped(campaign, phone, contact, group, properties, reason):
+    # SKIPPED logs count towards completion but not towards any campaign counter
+    MessageLog.objects.bulk_create([
+        MessageLog(
+            campaign=campaign, phone_instance=phone, contact=contact, group=group, property=prop,
+            status='SKIPPED', error_class=reason, platform='WHATSAPP',
+        )
+        for prop in properties
+    ])
+    logger.info(f"🚫 Skipped {contact or group} for campaign {campaign.id} ({reason})")
+
+def _record_first_send(campaign_id):
+    # Conditional UPDATE: only the first successful send across all phones sets it
+    now = timezone.now()
+    if Campaign.objects.filter(id=campaign_id, first_sent_at__isnull=True).update(first_sent_at=now):
+        started_at = Campaign.objects.filter(id=campaign_id).values_list('started_at', flat=True).first()
+        if started_at:
+            logger.info(f"⚡ Campaign {campaign_id} first send after {(now - started_at).total_seconds():.1f}s")
+
+def _store_targets(targets_key, contact_ids, group_ids):
+    get_redis().set(
+        targets_key, json.dumps({'contacts': list(contact_ids), 'groups': list(group_ids)}, default=str),
+        ex=PHONE_TARGETS_TTL,
+    )
+
+def _load_targets(targets_key):
+    data = get_redis().get(targets_key)
+    if data is None:
+        logger.warning(f"Phone queue {targets_key} expired or was already finished")
+        return [], []
+    data = json.loads(data)
+    return data['contacts'], data['groups']
+
+def dispatch_phone_queue(phone_id, campaign_id, contact_ids, property_ids, group_ids, priority=TASK_PRIORITY_DEFAULT):
+    """Store one phone's targets in Redis and start its send task with a handle to them."""
+    targets_key = f"phone_queue:{uuid.uuid4()}:targets"
+    _store_targets(targets_key, contact_ids, group_ids)
+    process_phone_queue.apply_async(
+        args=(phone_id, campaign_id, targets_key, property_ids),
+        kwargs={'priority': priority},
+        priority=priority,
+    )
+
+@shared_task(acks_late=True)
+def process_phone_queue(phone_id, campaign_id, targets_key, property_ids, priority=TASK_PRIORITY_DEFAULT):
     """Worker for a single phone handling randomization and natural behavior."""
-    if group_ids is None:
-        group_ids = []
+    urgent = priority <= TASK_PRIORITY_INSTANT
+    requeued = False
+    try:
+        summary, requeued = _send_phone_queue(phone_id, campaign_id, targets_key, property_ids, priority)
+        return summary
+    finally:
+        # A re-enqueued instant task keeps the lane open for its continuation
+        if urgent and not requeued:
+            close_urgent_lane(phone_id)
+
+def _send_phone_queue(phone_id, campaign_id, targets_key, property_ids, priority):
+    """Send one campaign's targets from one phone. Returns (summary, requeued)."""
+    slice_deadline = time.monotonic() + SEND_TASK_SLICE_SECONDS
+    urgent = priority <= TASK_PRIORITY_INSTANT
 
     phone = PhoneInstance.objects.get(id=phone_id)
     campaign = Campaign.objects.get(id=campaign_id)
-    properties = list(Property.objects.filter(id__in=property_ids))
-    contacts = list(Contact.objects.filter(id__in=contact_ids))
-    groups = list(WhatsAppGroup.objects.filter(id__in=group_ids))
-
-    settings_obj = campaign.settings
     sent_count = 0
 
-    contact_targets = [{'type': 'contact', 'obj': c} for c in contacts]
-    group_targets = [{'type': 'group', 'obj': g} for g in groups]
-
-    random.shuffle(contact_targets)
-    random.shuffle(group_targets)
-
-    # Priority: Groups FIRST, then Contacts
-    targets = group_targets + contact_targets
-
-    for target in targets:
-        campaign.refresh_from_db()
-        if campaign.status != 'RUNNING':
-            break
-
-        if target['type'] == 'contact':
-            contact = target['obj']
-            dest_id = contact.phone
-            log_contact = contact
-            log_group = None
-        else:
-            group = target['obj']
-            dest_id = group.group_id
-            log_contact = None
-            log_group = group
-
-        shuffled_properties = properties.copy()
-        random.shuffle(shuffled_properties)
-
-        for prop in shuffled_properties:
-            # Human mimic delay
-            min_delay = settings_obj.delay_between_messages_min
-            max_delay = settings_obj.delay_between_messages_max
-            
-            # WARMUP MODE: If enabled, we treat this as a "New/Risk" account
-            # We enforce a higher minimum delay and add extra variability
-            if settings_obj.warmup_mode:
-                 # Double the delays for safety
-                 min_delay = max(min_delay * 2, 20) # At least 20s
-                 max_delay = max(max_delay * 2, 40) # At least 40s
-            
-            delay = random.uniform(min_delay, max_delay)
-            logger.info(f"⏳ Waiting {delay:.1f}s (Warmup: {settings_obj.warmup_mode})...")
-            time.sleep(delay)
-
-            success, response = send_waha_message(
-                phone.session_name,
-                dest_id,
-                prop.content,
-                api_url=phone.api_url
+    breaker = breaker_for(phone.api_url)
+    lease = PhoneLease(phone.id, campaign.id, urgent=urgent, weight=campaign.send_weight)
+    rejoin = False
+
+    def requeue(remaining=None, countdown=0, wait_turn=True):
+        # The targets stay in Redis; only a handle travels through the broker, and the
+        # stored list is rewritten only when this task got through some of it
+        nonlocal rejoin
+        rejoin = wait_turn
+        if remaining is not None:
+            _store_targets(
+                targets_key,
+                [t['obj'].id for t in remaining if t['type'] == 'contact'],
+                [t['obj'].id for t in remaining if t['type'] == 'group'],
             )
+        process_phone_queue.apply_async(
+            args=(phone_id, campaign_id, targets_key, property_ids),
+            kwargs={'priority': priority},
+            countdown=countdown,
+            priority=priority,
+        )
 
-            MessageLog.objects.create(
-                campaign=campaign,
-                phone_instance=phone,
-                contact=log_contact,
-                group=log_group,
-                property=prop,
-                message_text=prop.content,
-                status='SENT' if success else 'FAILED',
-                error_message=None if success else response,
-                platform='WHATSAPP'
-            )
+    def pause_for_open_circuit(remaining):
+        # Node down or being probed: hand the rest of the queue back to Celery until it is closed
+        requeue(remaining, countdown=max(breaker.retry_after(), 1))
+        logger.warning(f"⛔ Node {phone.api_url} is down; pausing {len(remaining)} targets of phone {phone.name}")
+        return f"Phone {phone.name} paused (circuit open). Sent: {sent_count}", True
 
-            if success:
-                sent_count += 1
-                phone.total_sent += 1
-                phone.sent_today += 1
-                phone.save()
-
-            # Pulse & Rest
-            if sent_count > 0 and settings_obj.pause_every_x_messages > 0:
-                if sent_count % settings_obj.pause_every_x_messages == 0:
-                    # Use the configured pause duration with some jitter (+/- 20%)
-                    base_pause = settings_obj.pause_duration_seconds
-                    actual_pause = random.uniform(base_pause * 0.8, base_pause * 1.2)
-                    logger.info(f"😴 Batch Pause: Resting for {actual_pause:.1f}s after {sent_count} messages")
-                    time.sleep(actual_pause)
+    # Before loading any targets: a task waiting for its turn costs two lookups, not the whole list
+    if not lease.acquire():
+        # Another campaign is sending from this phone; acquire() queued us for a turn
+        requeue(countdown=URGENT_LEASE_POLL_SECONDS if urgent else LEASE_POLL_SECONDS)
+        return f"Phone {phone.name} busy; waiting for a turn", True
+    lease.start_heartbeat()
 
+    try:
+        contact_ids, group_ids = _load_targets(targets_key)
+        properties = list(Property.objects.filter(id__in=property_ids).select_related('media').defer('media__data'))
+        contacts = list(Contact.objects.filter(id__in=contact_ids))
+        groups = list(WhatsAppGroup.objects.filter(id__in=group_ids))
+
+        settings_obj = campaign.settings
+        # Parsed once here (and cached per worker), rendered per recipient below
+        messages = {prop.id: compile_message(prop.content) for prop in properties}
+        # Each body is stored once (core.message_bodies); logs point at it
+        bodies = {prop.id: body_id_for(prop.content) for prop in properties}
+        # Image references are built once for this node and campaign, then reused for every recipient
+        media = {prop.id: media_reference(prop.media) for prop in properties if prop.media_id}
+        # Digest mode sends a recipient's properties as few combined messages; turns, pacing
+        # and caps count those sends, not properties
+        sends_per_target = _sends_per_target(campaign, properties)
+
+        contact_targets = [{'type': 'contact', 'obj': c} for c in contacts]
+        group_targets = [{'type': 'group', 'obj': g} for g in groups]
+
+        random.shuffle(contact_targets)
+        random.shuffle(group_targets)
+
+        # Priority: Groups FIRST, then Contacts
+        targets = group_targets + contact_targets
+
+        for index, target in enumerate(targets):
+            campaign.refresh_from_db()
+            if campaign.status != 'RUNNING':
+                break
+
+            if not _node_ready(breaker, phone):
+                return pause_for_open_circuit(targets[index:])
+
+            if lease.lost:
+                requeue(targets[index:], countdown=LEASE_POLL_SECONDS)
+                return f"Phone {phone.name} lost its lease. Sent: {sent_count}", True
+
+            window_wait = seconds_until_window(settings_obj)
+            if window_wait > 0:
+                # Outside the send window: carry the rest over to when it next opens
+                requeue(targets[index:], countdown=min(window_wait, WINDOW_RECHECK_SECONDS), wait_turn=False)
+                return f"Phone {phone.name} outside send window; {len(targets) - index} targets carried over", True
+
+            daily_wait = daily_limit_wait(phone)
+            if daily_wait > 0:
+                requeue(targets[index:], countdown=min(daily_wait, WINDOW_RECHECK_SECONDS), wait_turn=False)
+                return f"Phone {phone.name} reached its daily limit; {len(targets) - index} targets carried over", True
+
+            cap_wait = hourly_cap_wait(campaign.id, phone.id, settings_obj.max_messages_per_hour)
+            if cap_wait > 0:
+                # Hourly cap reached: free the phone for other campaigns until the next hour
+                requeue(targets[index:], countdown=cap_wait, wait_turn=False)
+                return f"Phone {phone.name} reached the hourly cap; {len(targets) - index} targets carried over", True
+
+            if time.monotonic() >= slice_deadline:
+                requeue(targets[index:])
+                return f"Phone {phone.name} yielded after its time slice. Sent: {sent_count}", True
+
+            if not urgent and has_urgent_work(phone.id):
+                # Instant work is waiting for this phone: step aside at the target boundary
+                requeue(targets[index:], countdown=BULK_YIELD_SECONDS)
+                logger.info(f"⚡ Phone {phone.name} pre-empted by instant work; {len(targets) - index} targets requeued")
+                return f"Phone {phone.name} pre-empted. Sent: {sent_count}", True
+
+            if not urgent and lease.end_of_turn(sends_per_target):
+                # Turn used up and another campaign is waiting: pass the phone on
+                requeue(targets[index:], countdown=LEASE_POLL_SECONDS)
+                return f"Phone {phone.name} handed over after its turn. Sent: {sent_count}", True
+
+            # Transient failures due for another attempt go first, under the same pacing
+            sent_count = _process_due_retries(phone, campaign, settings_obj, sent_count)
+
+            if target['type'] == 'contact':
+                contact = target['obj']
+                dest_id = contact.phone
+                log_contact = contact
+                log_group = None
+            else:
+                group = target['obj']
+                dest_id = group.group_id
+                log_contact = None
+                log_group = group
+
+            # Opt-outs since the audience was built, and numbers this run already reached
+            # (duplicate contact rows, several phones), are skipped with a log per property
+            chat_id = chat_id_for(dest_id)
+            verdict = claim_recipient(campaign.id, chat_id) if chat_id else 'ok'
+            if verdict != 'ok':
+                _log_skipped(campaign, phone, log_contact, log_group, properties, verdict)
+                record_skipped(campaign.id, len(properties))
+                continue
+
+            shuffled_properties = properties.copy()
+            random.shuffle(shuffled_properties)
+
+            rendered = []
+            for prop in shuffled_properties:
+                message = messages[prop.id]
+                variables = message.variables_for(contact=log_contact, group=log_group)
+                rendered.append((prop, variables, message.render(variables)))
+            if campaign.digest_mode:
+                # Only text can be combined; each photo goes out with its own caption
+                text_only = [item for item in rendered if item[0].id not in media]
+                batches = [[text_only[i] for i in batch] for batch in pack_digest([text for _, _, text in text_only])]
+                batches += [[item] for item in rendered if item[0].id in media]
+            else:
+                batches = [[item] for item in rendered]
+
+            for batch_index, batch in enumerate(batches):
+                _human_delay(settings_obj, phone.id)
+
+                result = send_waha_message(
+                    phone.session_name,
+                    dest_id,
+                    DIGEST_SEPARATOR.join(text for _, _, text in batch),
+                    api_url=phone.api_url,
+                    media=media.get(batch[0][0].id),
+                )
+                if result.error_class == 'circuit_open' and batch_index == 0:
+                    # Breaker tripped since the check and nothing reached this recipient:
+                    # requeue it instead of logging a failure
+                    release_recipient(campaign.id, chat_id)
+                    return pause_for_open_circuit(targets[index:])
+                count_hourly_send(campaign.id, phone.id, settings_obj.max_messages_per_hour)
+                record_send_outcome(phone.id, settings_obj, result.success, result.error_class)
+
+                # One log per property, even inside a digest: completion, receipts (shared
+                # waha_message_id) and per-property retries work the same in both modes
+                logs = []
+                for prop, variables, _ in batch:
+                    logs.append(create_message_log(
+                        campaign=campaign,
+                        phone_instance=phone,
+                        contact=log_contact,
+                        group=log_group,
+                        property=prop,
+                        body_id=bodies[prop.id],
+                        template_vars=variables or None,
+                        status='SENT' if result.success else 'FAILED',
+                        error_message=None if result.success else result.response,
+                        error_class=result.error_class or '',
+                        waha_message_id=result.message_id,
+                        platform='WHATSAPP'
+                    ))
+                    record_progress(campaign.id, result.success, phone.name)
+
+                if result.success:
+                    if campaign.first_sent_at is None:
+                        _record_first_send(campaign.id)
+                        campaign.first_sent_at = logs[0].sent_at
+                    sent_count += 1
+                    _rest_if_due(settings_obj, _count_phone_send(phone) or sent_count)
+                else:
+                    for log in logs:
+                        schedule_retry(log)
+
+            lease.charge(len(batches))
+
+        # Wait out this campaign's remaining retries before reporting completion
+        while campaign.status == 'RUNNING':
+            due = next_retry_due(phone.id, campaign.id)
+            if due is None:
+                break
+            if not _node_ready(breaker, phone):
+                return pause_for_open_circuit([])
+            wait = (due - timezone.now()).total_seconds()
+            if wait > 0 and (wait > slice_deadline - time.monotonic() or lease.others_waiting()):
+                # Don't hold the worker (or the phone) through a backoff; come back when the retry is due
+                requeue([], countdown=max(wait, 1), wait_turn=False)
+                return f"Phone {phone.name} waiting on retries. Sent: {sent_count}", True
+            if wait > 0:
+                logger.info(f"🔁 Waiting {wait:.0f}s for pending retries on {phone.name}")
+                time.sleep(wait)
+            sent_count = _process_due_retries(phone, campaign, settings_obj, sent_count)
+            campaign.refresh_from_db()
+    finally:
+        lease.release(rejoin=rejoin, finished=not rejoin)
+
+    get_redis().delete(targets_key)
     check_campaign_completion.delay(campaign_id)
-    return f"Phone {phone.name} finished. Sent: {sent_count}"
+    return f"Phone {phone.name} finished. Sent: {sent_count}", False
+
+def _split_targets(phones, contact_ids, group_ids):
+    """Load balancing: (contact ids per phone index, group ids per phone id)."""
+    contact_chunks = [[] for _ in range(len(phones))]
+    for i, contact_id in enumerate(contact_ids):
+        phone_index = (len(phones) - 1) - (i % len(phones))
+        contact_chunks[phone_index].append(contact_id)
+
+    # A group can only be messaged from the (connected) phone that is in it
+    phone_groups = {phone.id: [] for phone in phones}
+    for group_id, phone_id in WhatsAppGroup.objects.filter(
+        id__in=group_ids, phone_instance__in=phones
+    ).values_list('id', 'phone_instance_id'):
+        phone_groups[phone_id].append(group_id)
+    return contact_chunks, phone_groups
+
+def _project_schedule(settings_obj, phones, contact_chunks, phone_groups, messages_per_target, start=None):
+    """Projected schedule, or None when there are more messages than SIMULATION_MAX_MESSAGES."""
+    phone_targets = [
+        (phone.id, phone.name, len(contact_chunks[i]) + len(phone_groups[phone.id])) for i, phone in enumerate(phones)
+    ]
+    busy = [target for target in phone_targets if target[2]]
+    if sum(targets for _, _, targets in busy) * messages_per_target > SIMULATION_MAX_MESSAGES:
+        return None
+    # Each phone at the delay its pacing controller has learned so far
+    delays = {phone.id: current_delay(phone.id, settings_obj) for phone in phones}
+    return simulate_send_schedule(settings_obj, busy, messages_per_target, start, delays)
+
+def _simulate_campaign(campaign):
+    """Dry run: the real audience and phone split, replayed on a virtual clock (nothing is sent)."""
+    phones = under_daily_limit(list(PhoneInstance.objects.filter(status='CONNECTED')))
+    if not phones:
+        return {"error": "No connected phones found."}
+    audience = CampaignAudience.objects.filter(campaign=campaign).first()
+    if campaign.status in ('SCHEDULED', 'QUEUED') and audience is not None:
+        contact_ids, group_ids = audience.contact_ids, audience.group_ids
+    else:
+        contact_ids, group_ids = resolve_audience(campaign)
+    properties = list(campaign.properties.all())
+    if not properties:
+        return {"error": "No properties linked to campaign."}
+
+    contact_chunks, phone_groups = _split_targets(phones, contact_ids, group_ids)
+    start = timezone.now()
+    if campaign.status == 'SCHEDULED' and campaign.scheduled_at:
+        start = max(start, campaign.scheduled_at)
+    projection = _project_schedule(
+        campaign.settings, phones, contact_chunks, phone_groups, _sends_per_target(campaign, properties), start
+    )
+    if projection is None:
+        return {"error": f"Campaign too large to simulate (over {SIMULATION_MAX_MESSAGES} messages)."}
+    return projection
 
 @shared_task
-def start_campaign_task(campaign_id):
+def start_campaign_task(campaign_id, priority=TASK_PRIORITY_DEFAULT, scheduled=False, dry_run=False):
     """Orchestrator for load balancing across connected phones."""
     campaign = Campaign.objects.get(id=campaign_id)
+    if dry_run:
+        # Projected duration, per-phone counts and hourly throughput (core.pacing)
+        return _simulate_campaign(campaign)
+    if scheduled and campaign.status != 'QUEUED':
+        # Paused or started by hand between dispatch and the scheduled time
+        return f"Scheduled start skipped (campaign is {campaign.status})."
     campaign.status = 'RUNNING'
     campaign.started_at = timezone.now()
-    campaign.save()
+    campaign.first_sent_at = None
+    campaign.save(update_fields=['status', 'started_at', 'first_sent_at', 'updated_at'])
 
-    phones = list(PhoneInstance.objects.filter(status='CONNECTED'))
+    # Phones that used up their daily limit get no share of this run
+    phones = under_daily_limit(list(PhoneInstance.objects.filter(status='CONNECTED')))
     if not phones:
         campaign.status = 'FAILED'
-        campaign.save()
+        campaign.save(update_fields=['status', 'updated_at'])
         return "No connected phones found."
 
-    # 3. Determine Recipients
+    # 3. Determine Recipients (pre-resolved for scheduled runs, see core.scheduling)
     # ---------------------------------------------------------
-    # Contacts
-    contacts = []
-    if campaign.send_to_all_contacts and not campaign.target_tags:
-        # Default behavior: Send to ALL if no tags are specified and flag is true
-        contacts = list(Contact.objects.filter(status='ACTIVE'))
-    elif campaign.target_tags:
-        # Tag-based filtering (OR logic: contact has ANY of the tags)
-        # Using Django's __overlap for ArrayField
-        if campaign.target_tags:
-             contacts = list(Contact.objects.filter(status='ACTIVE', tags__overlap=campaign.target_tags))
-    
-    # Groups
-    group_list = []
+    audience = CampaignAudience.objects.filter(campaign=campaign).first() if scheduled else None
+    if audience is not None:
+        contact_ids, group_ids = audience.contact_ids, audience.group_ids
+    else:
+        contact_ids, group_ids = resolve_audience(campaign)
+
     properties = list(campaign.properties.all())
     if not properties:
         campaign.status = 'FAILED'
-        campaign.save()
+        campaign.save(update_fields=['status', 'updated_at'])
         return "No properties linked to campaign."
 
     property_ids = [p.id for p in properties]
 
-    # Meta API Posts
-    from .meta_api import post_to_facebook_page, post_to_instagram_account
-    if campaign.post_to_facebook:
-        for prop in properties:
-            success, response = post_to_facebook_page(prop.content)
-            MessageLog.objects.create(campaign=campaign, property=prop, status='SENT' if success else 'FAILED', platform='FACEBOOK')
+    # Meta API Posts (own queue: image rendering and uploads are slow)
+    if campaign.post_to_facebook or campaign.post_to_instagram:
+        post_campaign_to_meta.delay(campaign.id)
 
-    if campaign.post_to_instagram:
-        for prop in properties:
-            success, response = post_to_instagram_account(prop.content)
-            MessageLog.objects.create(campaign=campaign, property=prop, status='SENT' if success else 'FAILED', platform='INSTAGRAM')
+    contact_chunks, phone_groups = _split_targets(phones, contact_ids, group_ids)
 
-    # Load Balancing
-    contact_chunks = [[] for _ in range(len(phones))]
-    for i, contact in enumerate(contacts):
-        phone_index = (len(phones) - 1) - (i % len(phones))
-        contact_chunks[phone_index].append(contact.id)
-
-    phone_groups = {phone.id: [] for phone in phones}
-    if campaign.send_to_whatsapp:
-        if campaign.send_to_all_groups:
-            for phone in phones:
-                phone_groups[phone.id] = list(WhatsAppGroup.objects.filter(phone_instance=phone).values_list('id', flat=True))
-        else:
-            for group in campaign.target_groups.all():
-                if group.phone_instance.id in phone_groups:
-                    phone_groups[group.phone_instance.id].append(group.id)
-
-    campaign.total_contacts = len(contacts)
+    campaign.total_contacts = len(contact_ids)
     campaign.total_groups = sum(len(ids) for ids in phone_groups.values())
-    campaign.save()
+    campaign.save(update_fields=['total_contacts', 'total_groups', 'updated_at'])
 
-    if (len(contacts) + campaign.total_groups) == 0:
+    if (len(contact_ids) + campaign.total_groups) == 0:
         campaign.status = 'COMPLETED'
-        campaign.save()
+        campaign.save(update_fields=['status', 'updated_at'])
         return "No targets."
 
+    reset_campaign_recipients(campaign.id)
+    ensure_suppression()
+    # The projection anchors the live ETA until actual throughput takes over
+    projection = _project_schedule(
+        campaign.settings, phones, contact_chunks, phone_groups, _sends_per_target(campaign, properties)
+    )
+    start_progress(
+        campaign.id,
+        (campaign.total_contacts + campaign.total_groups) * len(properties),
+        projected_seconds=projection['duration_seconds'] if projection else None,
+    )
+
     for i, phone in enumerate(phones):
         if contact_chunks[i] or phone_groups[phone.id]:
-            process_phone_queue.delay(phone.id, campaign.id, contact_chunks[i], property_ids, phone_groups[phone.id])
+            if priority <= TASK_PRIORITY_INSTANT:
+                # Opened before dispatch so bulk senders on this phone step aside right away
+                open_urgent_lane(phone.id)
+            dispatch_phone_queue(phone.id, campaign.id, contact_chunks[i], property_ids, phone_groups[phone.id], priority)
 
-    return f"Campaign started with {len(contacts)} contacts."
+    return f"Campaign started with {len(contact_ids)} contacts."
+
+@shared_task
+def prepare_campaign_audience(campaign_id):
+    """Snapshot a scheduled campaign's recipients ahead of its start."""
+    campaign = Campaign.objects.get(id=campaign_id)
+    audience = snapshot_audience(campaign)
+    return f"Audience ready: {len(audience.contact_ids)} contacts, {len(audience.group_ids)} groups."
+
+@shared_task
+def dispatch_scheduled_campaigns():
+    """
+    Beat-driven: hand scheduled campaigns starting within AUDIENCE_LEAD_SECONDS to Celery.
+    The audience is resolved now and the start task is queued with an ETA at the first
+    moment the campaign may send (scheduled_at, pushed to its send window).
+    """
+    now = timezone.now()
+    horizon = now + timedelta(seconds=AUDIENCE_LEAD_SECONDS)
+    dispatched = 0
+    for campaign in Campaign.objects.filter(status='SCHEDULED', scheduled_at__lte=horizon).select_related('settings'):
+        settings_obj = getattr(campaign, 'settings', None)
+        start_at = next_window_start(settings_obj, max(campaign.scheduled_at, now)) if settings_obj else max(campaign.scheduled_at, now)
+        if start_at > horizon:
+            continue
+        # Conditional UPDATE so two beat ticks (or schedulers) can't both dispatch it
+        if not Campaign.objects.filter(id=campaign.id, status='SCHEDULED').update(status='QUEUED', updated_at=now):
+            continue
+        prepare_campaign_audience.delay(campaign.id)
+        start_campaign_task.apply_async(args=[campaign.id], kwargs={'scheduled': True}, eta=start_at)
+        dispatched += 1
+
+        next_at = next_occurrence(campaign, now)
+        if next_at is not None:
+            schedule_next_run(campaign, next_at)
+        logger.info(f"🗓️ Campaign {campaign.name} dispatched to start at {start_at.isoformat()}")
+    return f"Dispatched {dispatched} scheduled campaigns."
+
+@shared_task(acks_late=True)
+def post_campaign_to_meta(campaign_id):
+    """Publish a campaign's properties to the Facebook page / Instagram account."""
+    from .meta_api import post_to_facebook_page, post_to_instagram_account
+    campaign = Campaign.objects.get(id=campaign_id)
+    properties = list(campaign.properties.all())
+
+    if campaign.post_to_facebook:
+        for prop in properties:
+            success, response = post_to_facebook_page(render_message(prop.content))
+            create_message_log(campaign=campaign, property=prop, status='SENT' if success else 'FAILED', platform='FACEBOOK')
+
+    if campaign.post_to_instagram:
+        for prop in properties:
+            success, response = post_to_instagram_account(render_message(prop.content))
+            create_message_log(campaign=campaign, property=prop, status='SENT' if success else 'FAILED', platform='INSTAGRAM')
+
+@shared_task(acks_late=True)
+def import_contacts_task(upload_name, tag_list=None):
+    """Bulk CSV import (phone,name columns) with optional tags for every row."""
+    try:
+        with import_uploads.open(upload_name, 'rb') as upload:
+            return _import_contacts(io.TextIOWrapper(upload, encoding='utf-8', newline=''), tag_list or [])
+    finally:
+        import_uploads.delete(upload_name)
+
+def _import_contacts(csv_file, tag_list):
+    reader = csv.DictReader(csv_file)
+    count = 0
+    counts_delta = Counter()
+
+    for row in reader:
+        raw_phone = (row.get('phone') or '').strip()
+        name = (row.get('name') or '').strip()
+        
+        if raw_phone:
+            # Normalization Logic
+            # 1. Remove all non-digit characters
+            clean_phone = ''.join(filter(str.isdigit, raw_phone))
+            
+            # 2. Strip leading zeros (handle 098... or 0091...)
+            clean_phone = clean_phone.lstrip('0')
+            
+            # 3. Handle missing country code (Assume India 91 if 10 digits)
+            if len(clean_phone) == 10:
+                clean_phone = '91' + clean_phone
+            
+            # 4. Basic Validation (WhatsApp numbers are usually 10-15 digits)
+            if 10 <= len(clean_phone) <= 15:
+                # Existing contacts keep their status: re-importing must not undo an opt-out
+                contact, created = Contact.objects.update_or_create(
+                    phone=clean_phone, 
+                    defaults={'name': name}
+                )
+            
+                # Add tags if provided
+                if tag_list:
+                    # using set to avoid duplicates
+                    old_tags = [] if created else list(contact.tags or [])
+                    current_tags = set(contact.tags or [])
+                    current_tags.update(tag_list)
+                    contact.tags = list(current_tags)
+                    contact.save()
+                    counts_delta.update(tag_delta(old_tags, contact.tags))
+                elif created:
+                    counts_delta.update(tag_delta([], contact.tags))
+                
+                count += 1
+            # Invalid numbers are skipped silently
+
+    apply_tag_delta(counts_delta)
+    return f"Imported {count} contacts successfully"
 
 @shared_task
 def check_campaign_completion(campaign_id):
@@ -248,13 +749,204 @@ def check_campaign_completion(campaign_id):
         if campaign.status != 'RUNNING':
             return
 
-        whatsapp_logs = MessageLog.objects.filter(campaign=campaign, platform='WHATSAPP').count()
+        if has_pending_retries(campaign.id):
+            # The phone task waiting on those retries triggers another check when done
+            return
+
+        # Bounded by started_at so only the partitions of this run are scanned
+        whatsapp_logs = MessageLog.objects.filter(
+            campaign=campaign, platform='WHATSAPP', sent_at__gte=campaign.started_at
+        ).count()
         properties_count = campaign.properties.count()
         expected = (campaign.total_contacts + campaign.total_groups) * properties_count
 
         if whatsapp_logs >= expected:
             campaign.status = 'COMPLETED'
             campaign.completed_at = timezone.now()
-            campaign.save()
+            campaign.save(update_fields=['status', 'completed_at', 'updated_at'])
+            set_progress_status(campaign.id, 'COMPLETED')
+            reconcile_campaign_stats([campaign.id])
     except Exception as e:
         logger.error(f"COMPLETION_CHECK_ERROR: {e}")
+
+@shared_task
+def reconcile_campaign_stats_task(campaign_ids=None):
+    """
+    Periodic repair of denormalized campaign counters: skips live campaigns and
+    ones untouched for RECONCILE_WINDOW, whose logs no longer change.
+    """
+    if campaign_ids is None:
+        since = timezone.now() - RECONCILE_WINDOW
+        campaign_ids = list(
+            Campaign.objects.exclude(status__in=['RUNNING', 'QUEUED'])
+            .filter(Q(completed_at__gte=since) | Q(updated_at__gte=since))
+            .values_list('id', flat=True)
+        )
+    fixed = reconcile_campaign_stats(campaign_ids)
+    return f"Reconciled {len(campaign_ids)} campaigns, corrected {fixed}."
+
+
+# ---------------------------------------------------------
+# WAHA session lifecycle
+# ---------------------------------------------------------
+# Each transition is recorded on PhoneInstance (provisioning_state/history);
+# readiness is detected by polling with backoff instead of fixed sleeps.
+
+def _phone_or_none(phone_id):
+    try:
+        return PhoneInstance.objects.get(id=phone_id)
+    except PhoneInstance.DoesNotExist:
+        logger.warning(f"WAHA_LIFECYCLE: phone {phone_id} no longer exists")
+        return None
+
+def _sync_phone_status(phone, waha_status):
+    new_status = phone.status
+    if waha_status == 'WORKING':
+        new_status = 'CONNECTED'
+    elif waha_status == 'SCAN_QR_CODE':
+        new_status = 'SCAN_QR_CODE'
+    elif waha_status in ['STOPPED', 'FAILED', None]:
+        new_status = 'DISCONNECTED'
+    if new_status != phone.status:
+        phone.status = new_status
+        phone.save(update_fields=['status', 'updated_at'])
+
+def _stop_and_remove(api_url, session_name):
+    """Stop then delete a session, waiting for WAHA to actually let go of it."""
+    waha.stop_session(api_url, session_name)
+    waha.wait_for_session(api_url, session_name, lambda s: s in [None, 'STOPPED', 'FAILED'], timeout=20)
+    waha.delete_session(api_url, session_name)
+    waha.wait_for_session(api_url, session_name, lambda s: s is None, timeout=20)
+
+def _bring_up(api_url, session_name):
+    """Create (or start) the session and wait until it is alive."""
+    resp = waha.create_session(api_url, session_name)
+    logger.info(f"✅ Session created: {resp.status_code}")
+    status = waha.wait_for_session(
+        api_url, session_name,
+        lambda s: s in waha.ACTIVE_SESSION_STATES + ['STOPPED', 'FAILED'],
+        timeout=30,
+    )
+    if status not in waha.ACTIVE_SESSION_STATES:
+        start_resp = waha.start_session(api_url, session_name)
+        logger.info(f"▶️ Session started: {start_resp.status_code}")
+        status = waha.wait_for_session(api_url, session_name, lambda s: s in waha.ACTIVE_SESSION_STATES, timeout=30)
+    return status
+
+@shared_task
+def provision_waha_session(phone_id):
+    """Idempotent session bring-up. Forces a fresh session unless one is already alive."""
+    phone = _phone_or_none(phone_id)
+    if phone is None:
+        return
+    api_url, session_name = phone.api_url, phone.session_name
+    logger.info(f"🚀 WAHA SESSION START: {session_name} on {api_url}")
+    phone.record_transition('PROVISIONING')
+    try:
+        current = waha.get_session_status(api_url, session_name)
+        if current in waha.ACTIVE_SESSION_STATES:
+            logger.info(f"Session '{session_name}' is already {current}. Skipping recreation.")
+        else:
+            if current is not None:
+                logger.info(f"Cleanup: Removing stale/failed session '{session_name}'...")
+                _stop_and_remove(api_url, session_name)
+            current = _bring_up(api_url, session_name)
+        _sync_phone_status(phone, current)
+        phone.record_transition('READY')
+    except Exception as e:
+        logger.error(f"❌ ENGINE_START_ERROR: {e}")
+        phone.record_transition('FAILED', error=str(e))
+
+@shared_task
+def restart_waha_session(phone_id):
+    phone = _phone_or_none(phone_id)
+    if phone is None:
+        return
+    phone.record_transition('RESTARTING')
+    try:
+        waha.stop_session(phone.api_url, phone.session_name)
+        waha.wait_for_session(phone.api_url, phone.session_name, lambda s: s in [None, 'STOPPED', 'FAILED'], timeout=20)
+        if waha.get_session_status(phone.api_url, phone.session_name) is None:
+            current = _bring_up(phone.api_url, phone.session_name)
+        else:
+            waha.start_session(phone.api_url, phone.session_name)
+            current = waha.wait_for_session(phone.api_url, phone.session_name, lambda s: s in waha.ACTIVE_SESSION_STATES, timeout=30)
+        _sync_phone_status(phone, current)
+        phone.record_transition('READY')
+    except Exception as e:
+        logger.error(f"❌ ENGINE_RESTART_ERROR: {e}")
+        phone.record_transition('FAILED', error=str(e))
+
+@shared_task
+def stop_waha_session(phone_id):
+    phone = _phone_or_none(phone_id)
+    if phone is None:
+        return
+    phone.record_transition('STOPPING')
+    try:
+        waha.stop_session(phone.api_url, phone.session_name)
+        waha.wait_for_session(phone.api_url, phone.session_name, lambda s: s in [None, 'STOPPED', 'FAILED'], timeout=20)
+        _sync_phone_status(phone, 'STOPPED')
+        phone.record_transition('STOPPED')
+    except Exception as e:
+        logger.error(f"❌ ENGINE_STOP_ERROR: {e}")
+        phone.record_transition('FAILED', error=str(e))
+
+@shared_task
+def teardown_waha_session(api_url, session_name):
+    """Stop and delete the WAHA session of a phone that was removed from the DB."""
+    try:
+        _stop_and_remove(api_url, session_name)
+    except Exception as e:
+        logger.warning(f"Teardown non-fatal error for '{session_name}' on {api_url}: {e}")
+
+@shared_task
+def check_waha_nodes():
+    """Periodic health check; unhealthy nodes stop receiving new phones."""
+    from .nodes import check_node_health
+    results = {node.name: check_node_health(node) for node in WahaNode.objects.filter(is_active=True)}
+    unhealthy = [name for name, ok in results.items() if not ok]
+    return f"Checked {len(results)} nodes, unhealthy: {unhealthy or 'none'}"
+
+@shared_task
+def maintain_messagelog_partitions():
+    """Daily: keep MessageLog partitions created ahead and archive the ones past retention."""
+    created = ensure_partitions()
+    archived = []
+    for month, name in expired_partitions():
+        archive_partition(name)
+        archived.append(name)
+    stray = default_partition_rows()
+    if stray:
+        # Outside every monthly partition (far past or future sent_at): needs a look
+        logger.error(f"MESSAGELOG_PARTITIONS: {stray} rows in {DEFAULT_PARTITION} outside any monthly partition")
+    return f"Partitions created: {created or '-'}; archived: {archived or '-'}"
+
+@shared_task
+def refresh_message_rollups():
+    """Every few minutes: re-aggregate recent MessageLog hours into MessageRollup."""
+    start, written = refresh_rollups()
+    if start is None:
+        return "No messages to roll up."
+    return f"Rolled up {written} rows from {start.isoformat()}."
+
+@shared_task
+def rebuild_suppression_list():
+    """Daily: recreate the Redis suppression set from contact statuses."""
+    return f"Suppression list rebuilt ({rebuild_suppression()} chat ids)."
+
+@shared_task
+def flush_phone_counters_task():
+    """Every minute: write Redis send counters to PhoneInstance in one UPDATE."""
+    return f"Flushed send counters of {flush_phone_counters()} phones."
+
+@shared_task
+def reset_phone_daily_counters():
+    """Local midnight: start every phone's sent_today from zero."""
+    return f"Reset sent_today on {reset_daily_counters()} phones."
+
+@shared_task
+def apply_waha_acks():
+    """Apply queued WAHA message.ack receipts in batched UPDATEs."""
+    updated = drain_ack_queue()
+    return f"Applied receipts to {updated} messages."
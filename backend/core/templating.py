@@ -0,0 +1,83 @@
+import re
+from functools import lru_cache
+from django.template import Context, Engine
+
+# Plain-text engine: no loaders, no HTML autoescaping (WhatsApp is not HTML)
+_engine = Engine(autoescape=False)
+
+TEMPLATE_MARKERS = ('{{', '{%')
+# Per-recipient variables available to Property.content, e.g.
+#   Hi {{ first_name|default:"there" }}! {% if "Broker" in tags %}Brokerage: 2%{% endif %}
+VARIABLES = ('name', 'first_name', 'phone', 'tags', 'group')
+
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+# Digest mode (Campaign.digest_mode): a recipient's properties go out as one message,
+# split where the next listing would exceed the length WhatsApp displays in full
+DIGEST_SEPARATOR = '\n\n━━━━━━━━━━\n\n'
+DIGEST_MAX_CHARS = 4096
+
+
+def is_template(content):
+    return any(marker in (content or '') for marker in TEMPLATE_MARKERS)
+
+
+class CompiledMessage:
+    """A Property body parsed once; render() only walks the node tree."""
+
+    def __init__(self, source):
+        self.source = source or ''
+        self.is_static = not is_template(self.source)
+        self._template = None if self.is_static else _engine.from_string(self.source)
+        # Only what the template mentions is stored per MessageLog row
+        self.variables = () if self.is_static else tuple(
+            name for name in VARIABLES if re.search(rf'\b{name}\b', self.source)
+        )
+
+    def variables_for(self, contact=None, group=None):
+        if not self.variables:
+            return {}
+        values = {
+            'name': contact.name if contact else (group.name if group else ''),
+            'first_name': (contact.name.split() or [''])[0] if contact else '',
+            'phone': contact.phone if contact else '',
+            'tags': list(contact.tags or []) if contact else [],
+            'group': group.name if group else '',
+        }
+        return {name: values[name] for name in self.variables}
+
+    def render(self, variables=None):
+        if self.is_static:
+            return self.source
+        text = self._template.render(Context(variables or {}, autoescape=False))
+        # Dropped conditional blocks leave runs of empty lines behind
+        return _BLANK_LINES.sub('\n\n', text).strip()
+
+
+@lru_cache(maxsize=256)
+def compile_message(source):
+    """Compiled template for a body; cached per worker so each Property is parsed once."""
+    return CompiledMessage(source)
+
+
+def render_message(source, variables=None):
+    return compile_message(source).render(variables)
+
+
+def pack_digest(texts, limit=DIGEST_MAX_CHARS):
+    """
+    Group texts, in order, into digests of at most `limit` characters once joined.
+    Returns lists of indexes into texts; a text longer than the limit goes out alone.
+    """
+    batches, current, size = [], [], 0
+    for index, text in enumerate(texts):
+        extra = len(text) + (len(DIGEST_SEPARATOR) if current else 0)
+        if current and size + extra > limit:
+            batches.append(current)
+            current, size = [], 0
+            extra = len(text)
+        current.append(index)
+        size += extra
+    if current:
+        batches.append(current)
+    return batches
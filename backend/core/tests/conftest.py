@@ -0,0 +1,15 @@
+import pytest
+import redis
+
+from core.redis_client import get_redis
+
+
+@pytest.fixture
+def redis_client():
+    """The app's Redis client; tests that need a live server are skipped without one."""
+    client = get_redis()
+    try:
+        client.ping()
+    except redis.RedisError:
+        pytest.skip("Redis is not reachable")
+    return client
@@ -0,0 +1,10 @@
+from core.group_resolver import groups_for_collection
+
+
+def test_groups_for_collection_keeps_jid_order_and_skips_unsynced():
+    resolved = {
+        'a@g.us': [{'id': 1, 'group_id': 'a@g.us'}],
+        'b@g.us': [{'id': 2, 'group_id': 'b@g.us'}, {'id': 3, 'group_id': 'b@g.us'}],
+    }
+    details = groups_for_collection(['b@g.us', 'missing@g.us', 'a@g.us', 'b@g.us'], resolved)
+    assert [g['id'] for g in details] == [2, 3, 1]
@@ -0,0 +1,40 @@
+import io
+
+import pytest
+from PIL import Image
+
+from core.media import InvalidMedia, image_type
+
+
+def image_bytes(image_format):
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4), 'white').save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def test_type_comes_from_the_bytes():
+    assert image_type(image_bytes('PNG')) == 'image/png'
+    assert image_type(image_bytes('JPEG')) == 'image/jpeg'
+
+
+def test_rejects_non_images_and_unsupported_formats():
+    with pytest.raises(InvalidMedia):
+        image_type(b'%PDF-1.4 not an image')
+    with pytest.raises(InvalidMedia):
+        image_type(image_bytes('GIF'))
+    with pytest.raises(InvalidMedia):
+        image_type(b'')
+
+
+def test_cached_file_is_served_from_a_memory_map(tmp_path, monkeypatch):
+    from core import media
+    monkeypatch.setattr(media, 'MEDIA_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(media, 'CHUNK_SIZE', 1000)
+    data = image_bytes('PNG') * 50
+    digest = 'ab' + '0' * 62
+    (tmp_path / 'ab').mkdir()
+    (tmp_path / 'ab' / digest).write_bytes(data)
+    chunks = list(media.iter_media(digest))
+    assert b''.join(chunks) == data
+    assert max(len(chunk) for chunk in chunks) == 1000
+    media.mapped.cache_clear()
@@ -0,0 +1,97 @@
+import uuid
+from datetime import datetime, time, timezone as dt_timezone
+from types import SimpleNamespace
+
+import pytest
+
+from core.pacing import (
+    AIMD_DECREASE_SECONDS, AIMD_INCREASE_FACTOR, AIMD_SUCCESS_STREAK, current_delay, delay_bounds,
+    next_delay, pacing_key, record_send_outcome, simulate_send_schedule,
+)
+
+START = datetime(2026, 10, 19, 10, 0, tzinfo=dt_timezone.utc)
+
+
+def campaign_settings(**overrides):
+    values = dict(
+        delay_between_messages_min=8, delay_between_messages_max=12, warmup_mode=False,
+        pause_every_x_messages=5, pause_duration_seconds=30, max_messages_per_hour=0,
+        send_window_start=None, send_window_end=None,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_warmup_doubles_delays_with_a_floor():
+    assert delay_bounds(campaign_settings()) == (8, 12)
+    assert delay_bounds(campaign_settings(warmup_mode=True)) == (20, 40)
+    assert delay_bounds(campaign_settings(warmup_mode=True, delay_between_messages_min=15, delay_between_messages_max=25)) == (30, 50)
+
+
+def test_delays_and_rests():
+    projection = simulate_send_schedule(campaign_settings(), [('p1', 'A', 10)], 1, START)
+    # 10 sends at a 10s mean delay plus a 30s rest after the 5th and the 10th
+    assert projection['duration_seconds'] == 10 * 10 + 2 * 30
+    assert projection['messages'] == 10
+
+
+def test_phones_send_in_parallel():
+    projection = simulate_send_schedule(campaign_settings(pause_every_x_messages=0), [('p1', 'A', 6), ('p2', 'B', 3)], 2, START)
+    assert [phone['duration_seconds'] for phone in projection['phones']] == [120, 60]
+    assert projection['duration_seconds'] == 120
+
+
+def test_hourly_cap_carries_over_to_next_hour():
+    capped = campaign_settings(pause_every_x_messages=0, max_messages_per_hour=100)
+    projection = simulate_send_schedule(capped, [('p1', 'A', 250)], 1, START)
+    assert [hour['messages'] for hour in projection['hourly']] == [100, 100, 50]
+    assert projection['finishes_at'] == datetime(2026, 10, 19, 12, 8, 20, tzinfo=dt_timezone.utc).isoformat()
+
+
+def test_send_window_delays_start():
+    evenings = campaign_settings(pause_every_x_messages=0, send_window_start=time(18), send_window_end=time(21))
+    projection = simulate_send_schedule(evenings, [('p1', 'A', 1)], 1, START)
+    assert projection['finishes_at'] == datetime(2026, 10, 19, 18, 0, 10, tzinfo=dt_timezone.utc).isoformat()
+
+
+def test_learned_delay_drives_projection():
+    projection = simulate_send_schedule(campaign_settings(pause_every_x_messages=0), [('p1', 'A', 10), ('p2', 'A', 10)], 1, START, delays={'p1': 8})
+    # Phones are told apart by id, even when they share a name
+    assert [phone['mean_delay_seconds'] for phone in projection['phones']] == [8, 10]
+    assert [phone['duration_seconds'] for phone in projection['phones']] == [80, 100]
+
+
+@pytest.fixture
+def phone_id(redis_client):
+    phone_id = f'test-{uuid.uuid4()}'
+    yield phone_id
+    redis_client.delete(pacing_key(phone_id))
+
+
+def test_successes_shrink_the_delay_additively(phone_id):
+    bounds = campaign_settings()
+    for _ in range(AIMD_SUCCESS_STREAK - 1):
+        assert record_send_outcome(phone_id, bounds, True) == 10
+    assert record_send_outcome(phone_id, bounds, True) == 10 - AIMD_DECREASE_SECONDS
+
+
+def test_throttle_errors_grow_the_delay_up_to_the_bound(phone_id, redis_client):
+    bounds = campaign_settings(delay_between_messages_min=2, delay_between_messages_max=12)
+    redis_client.hset(pacing_key(phone_id), mapping={'delay': 5, 'streak': 3})
+    assert record_send_outcome(phone_id, bounds, False, 'rate_limited') == 5 * AIMD_INCREASE_FACTOR
+    assert record_send_outcome(phone_id, bounds, False, 'timeout') == 12
+    assert redis_client.hget(pacing_key(phone_id), 'streak') == '0'
+
+
+def test_recipient_errors_leave_the_delay_alone(phone_id, redis_client):
+    assert record_send_outcome(phone_id, campaign_settings(), False, 'rejected') is None
+    assert not redis_client.exists(pacing_key(phone_id))
+
+
+def test_learned_delay_is_clamped_to_each_campaigns_bounds(phone_id, redis_client):
+    redis_client.hset(pacing_key(phone_id), mapping={'delay': 3, 'streak': 0})
+    assert current_delay(phone_id, campaign_settings()) == 8
+    draws = {next_delay(phone_id, campaign_settings()) for _ in range(50)}
+    # Converged to the minimum, yet still jittered rather than pinned to it
+    assert all(8 <= draw <= 8 * 1.15 for draw in draws)
+    assert len(draws) > 1
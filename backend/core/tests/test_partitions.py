@@ -0,0 +1,24 @@
+from datetime import datetime, timezone as dt_timezone
+
+from core.partitions import add_months, create_partition_sql, month_start, partition_month, partition_name
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+def test_month_arithmetic_crosses_years():
+    assert month_start(utc(2026, 10, 19, 13, 5)) == utc(2026, 10, 1)
+    assert add_months(utc(2026, 11, 1), 3) == utc(2027, 2, 1)
+    assert add_months(utc(2026, 1, 1), -1) == utc(2025, 12, 1)
+
+
+def test_partition_names_round_trip():
+    assert partition_name(utc(2026, 3, 1)) == 'core_messagelog_p2026_03'
+    assert partition_month('core_messagelog_p2026_03') == utc(2026, 3, 1)
+    assert partition_month('core_messagelog_unpartitioned') is None
+
+
+def test_partition_covers_one_month():
+    sql = create_partition_sql(utc(2026, 12, 1))
+    assert "FROM ('2026-12-01T00:00:00+00:00') TO ('2027-01-01T00:00:00+00:00')" in sql
@@ -0,0 +1,87 @@
+from datetime import datetime, timezone as dt_timezone
+from types import SimpleNamespace
+
+import pytest
+import redis
+
+from core.models import PhoneInstance
+from core.phone_counters import (
+    DIRTY_KEY, FLUSH_LOCK_KEY, count_phone_send, daily_limit_wait, day_key, flush_phone_counters, pending_key,
+    reset_daily_counters, seconds_until_tomorrow,
+)
+
+
+def test_seconds_until_local_midnight():
+    assert seconds_until_tomorrow(datetime(2026, 10, 19, 23, 30, tzinfo=dt_timezone.utc)) == 30 * 60
+    assert seconds_until_tomorrow(datetime(2026, 10, 19, 0, 0, tzinfo=dt_timezone.utc)) == 24 * 60 * 60
+
+
+def test_phones_without_a_limit_never_wait():
+    assert daily_limit_wait(SimpleNamespace(id='p1', daily_limit=0)) == 0
+
+
+@pytest.fixture
+def phones(redis_client):
+    created = [PhoneInstance.objects.create(name=name, session_name=name) for name in ('p1', 'p2')]
+    yield created
+    for phone in created:
+        redis_client.delete(pending_key(phone.id), day_key(phone.id))
+        redis_client.srem(DIRTY_KEY, str(phone.id))
+
+
+@pytest.mark.django_db
+def test_flush_writes_counts_and_settles_pending(redis_client, phones):
+    busy, idle = phones
+    PhoneInstance.objects.filter(id=busy.id).update(total_sent=5)
+    count_phone_send(busy.id)
+    count_phone_send(busy.id)
+
+    assert flush_phone_counters() >= 1
+
+    busy.refresh_from_db()
+    idle.refresh_from_db()
+    assert (busy.total_sent, busy.sent_today) == (7, 2)
+    assert (idle.total_sent, idle.sent_today) == (0, 0)
+    assert not redis_client.exists(pending_key(busy.id))
+    assert not redis_client.sismember(DIRTY_KEY, str(busy.id))
+    # Today's count stays in Redis for the daily limit
+    assert redis_client.get(day_key(busy.id)) == '2'
+
+
+@pytest.mark.django_db
+def test_flush_is_skipped_while_another_holds_the_lock(redis_client, phones):
+    busy, _ = phones
+    count_phone_send(busy.id)
+    redis_client.set(FLUSH_LOCK_KEY, 'other-worker', ex=60)
+    try:
+        assert flush_phone_counters() == 0
+    finally:
+        redis_client.delete(FLUSH_LOCK_KEY)
+
+    busy.refresh_from_db()
+    assert busy.total_sent == 0
+    assert redis_client.get(pending_key(busy.id)) == '1'
+
+
+@pytest.mark.django_db
+def test_daily_reset_zeroes_only_phones_idle_today(redis_client, phones):
+    busy, idle = phones
+    PhoneInstance.objects.filter(id__in=[busy.id, idle.id]).update(sent_today=9)
+    count_phone_send(busy.id)
+
+    reset_daily_counters()
+
+    busy.refresh_from_db()
+    idle.refresh_from_db()
+    assert busy.sent_today == 1
+    assert idle.sent_today == 0
+
+
+def test_daily_limit_fails_open_with_a_warning(monkeypatch, caplog):
+    class DownRedis:
+        def get(self, key):
+            raise redis.ConnectionError("down")
+
+    monkeypatch.setattr('core.phone_counters.get_redis', DownRedis)
+    assert daily_limit_wait(SimpleNamespace(id='p1', daily_limit=100)) == 0
+    assert 'not enforced' in caplog.text
@@ -0,0 +1,40 @@
+from core.phone_lease import PhoneLease
+
+
+class TurnQueue:
+    """Just the reads end_of_turn() makes: who is queued and who is still polling."""
+
+    def __init__(self, waiting=()):
+        self.waiting = list(waiting)
+
+    def zrange(self, key, start, stop):
+        return list(self.waiting)
+
+    def exists(self, key):
+        return 1
+
+    def zrem(self, key, member):
+        self.waiting.remove(member)
+
+
+def test_turn_ends_when_credit_runs_out_and_another_campaign_waits():
+    lease = PhoneLease(1, 'a', client=TurnQueue(['a', 'b']))
+    lease.deficit = lease.QUANTUM
+    lease.charge(lease.QUANTUM - 2)
+    assert not lease.end_of_turn(2)
+    lease.charge(2)
+    assert lease.end_of_turn(2)
+
+
+def test_turn_is_extended_in_place_when_nobody_waits():
+    lease = PhoneLease(1, 'a', weight=3, client=TurnQueue(['a']))
+    lease.deficit = 1
+    assert not lease.end_of_turn(2)
+    assert lease.deficit == 1 + 3 * lease.QUANTUM
+
+
+def test_targets_larger_than_a_quantum_still_get_sent():
+    lease = PhoneLease(1, 'a', client=TurnQueue())
+    lease.deficit = 0
+    assert not lease.end_of_turn(lease.QUANTUM * 2 + 1)
+    assert lease.can_afford(lease.QUANTUM * 2 + 1)
@@ -0,0 +1,31 @@
+import json
+
+from core.progress import progress_snapshot, sse_event
+
+
+def test_eta_from_throughput_so_far():
+    state = {'status': 'RUNNING', 'total': '100', 'sent': '18', 'failed': '2', 'phone': 'Phone 1', 'started_at': '1000.0'}
+    snapshot = progress_snapshot(state, now=1200.0)
+    # 20 messages in 200s, 80 to go
+    assert snapshot['eta_seconds'] == 800
+    assert (snapshot['sent'], snapshot['failed'], snapshot['phone']) == (18, 2, 'Phone 1')
+
+
+def test_no_eta_before_first_send_or_once_stopped():
+    assert progress_snapshot({'status': 'RUNNING', 'total': '10', 'started_at': '1000'}, now=1100)['eta_seconds'] is None
+    paused = {'status': 'PAUSED', 'total': '10', 'sent': '5', 'started_at': '1000'}
+    assert progress_snapshot(paused, now=1100)['eta_seconds'] is None
+
+
+def test_sse_framing():
+    frame = sse_event({'sent': 1}, 'progress')
+    assert frame.startswith('event: progress\ndata: ') and frame.endswith('\n\n')
+    assert json.loads(frame.split('data: ', 1)[1]) == {'sent': 1}
+
+
+def test_eta_follows_projection_adjusted_for_drift():
+    state = {'status': 'RUNNING', 'total': '100', 'sent': '25', 'started_at': '1000', 'projected_seconds': '4000'}
+    # A quarter done after 1500s instead of the projected 1000s: the rest takes 1.5x longer too
+    assert progress_snapshot(state, now=2500)['eta_seconds'] == 4500
+    # Before the first send the projection is all there is
+    assert progress_snapshot(dict(state, sent='0'), now=1100)['eta_seconds'] == 3900
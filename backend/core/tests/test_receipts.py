@@ -0,0 +1,23 @@
+import json
+
+from core.receipts import extract_message_id, normalize_message_id
+
+
+def test_ack_and_send_ids_normalize_to_the_same_key():
+    assert normalize_message_id('true_919876543210@c.us_3EB0C767D82A1E1E') == '3EB0C767D82A1E1E'
+    assert normalize_message_id({'_serialized': 'true_120363@g.us_ABCDEF', 'id': 'ABCDEF'}) == 'ABCDEF'
+    assert normalize_message_id(None) is None
+
+
+def test_group_ids_keep_their_own_key_not_the_sender():
+    first = normalize_message_id('true_120363025@g.us_3EB0ABC_919876543210@c.us')
+    second = normalize_message_id('true_120363025@g.us_3EB0DEF_919876543210@c.us')
+    assert (first, second) == ('3EB0ABC', '3EB0DEF')
+    assert normalize_message_id({'_serialized': 'true_120363025@g.us_3EB0ABC_919876543210@c.us'}) == '3EB0ABC'
+    assert normalize_message_id('3EB0ABC') == '3EB0ABC'
+
+
+def test_extract_message_id_from_send_responses():
+    assert extract_message_id(json.dumps({'id': 'true_91987@c.us_XYZ'})) == 'XYZ'
+    assert extract_message_id(json.dumps({'key': {'remoteJid': '91987@c.us', 'id': 'XYZ'}})) == 'XYZ'
+    assert extract_message_id('not json') is None
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+import pytest
+import requests
+from django.utils import timezone
+
+from core.models import Campaign, CampaignSettings, MessageLog, PhoneInstance
+from core.retries import BACKOFF_BASE_SECONDS, BACKOFF_MAX_SECONDS, backoff_seconds, classify_failure, is_retryable
+from core.tasks import _process_due_retries
+
+
+def test_transient_failures_are_retryable():
+    assert classify_failure(exception=requests.Timeout()) == 'timeout'
+    assert classify_failure(exception=requests.ConnectionError()) == 'connection'
+    assert classify_failure(503, 'Service Unavailable') == 'server_error'
+    assert classify_failure(429, '') == 'rate_limited'
+    assert classify_failure(422, 'Session status is not as expected: STARTING') == 'session_not_ready'
+    for error_class in ('timeout', 'connection', 'server_error', 'rate_limited', 'session_not_ready'):
+        assert is_retryable(error_class)
+
+
+def test_bad_requests_are_permanent():
+    assert classify_failure(400, 'chatId is invalid') == 'rejected'
+    assert classify_failure(500, 'Number not registered on WhatsApp') == 'rejected'
+    assert not is_retryable('rejected')
+    assert not is_retryable('invalid_number')
+
+
+def test_backoff_grows_exponentially_within_jitter_bounds():
+    for attempt in range(1, 10):
+        ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+        delay = backoff_seconds(attempt)
+        assert ceiling / 2 <= delay <= ceiling
+
+
+@pytest.mark.django_db
+def test_paused_campaign_keeps_its_retries_through_a_phone_queue_pass():
+    phone = PhoneInstance.objects.create(name='Phone 1', session_name='default')
+    paused = Campaign.objects.create(name='Paused', status='PAUSED')
+    due_at = timezone.now() - timedelta(minutes=1)
+    log = MessageLog.objects.create(
+        campaign=paused, phone_instance=phone, status='FAILED', error_class='timeout', next_retry_at=due_at
+    )
+
+    assert _process_due_retries(phone, paused, CampaignSettings(campaign=paused), 0) == 0
+
+    log.refresh_from_db()
+    assert log.next_retry_at == due_at
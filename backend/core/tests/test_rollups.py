@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from django.utils import timezone
+
+from core.models import MessageLog, MessageRollup
+from core.rollups import DIRTY_HOURS_KEY, WATERMARK_KEY, _ranges, mark_hours_dirty, refresh_rollups
+
+HOUR = timedelta(hours=1)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+def test_consecutive_hours_merge_into_one_range():
+    hours = [utc(2026, 10, 19, 9), utc(2026, 10, 19, 10), utc(2026, 10, 19, 13)]
+    assert _ranges(hours) == [[utc(2026, 10, 19, 9), utc(2026, 10, 19, 11)], [utc(2026, 10, 19, 13), utc(2026, 10, 19, 14)]]
+    assert _ranges([]) == []
+
+
+@pytest.fixture
+def rollup_keys(redis_client):
+    redis_client.delete(WATERMARK_KEY, DIRTY_HOURS_KEY)
+    yield redis_client
+    redis_client.delete(WATERMARK_KEY, DIRTY_HOURS_KEY)
+
+
+def test_marks_are_hour_starts(rollup_keys):
+    mark_hours_dirty([utc(2026, 10, 19, 10, 15), utc(2026, 10, 19, 10, 45), None, utc(2026, 10, 19, 12, 1)])
+    marked = {int(hour) for hour in rollup_keys.smembers(DIRTY_HOURS_KEY)}
+    assert marked == {int(utc(2026, 10, 19, 10).timestamp()), int(utc(2026, 10, 19, 12).timestamp())}
+
+
+def _log(sent_at, status='SENT'):
+    log = MessageLog.objects.create(status=status)
+    MessageLog.objects.filter(id=log.id).update(sent_at=sent_at)
+    return log
+
+
+def _counts(hour):
+    return {row.status: row.count for row in MessageRollup.objects.filter(hour=hour)}
+
+
+@pytest.mark.django_db
+def test_refresh_rebuilds_recent_and_dirty_hours_only(rollup_keys):
+    now = timezone.now()
+    current = now.replace(minute=0, second=0, microsecond=0)
+    old_hour = current - 5 * HOUR
+    rollup_keys.set(WATERMARK_KEY, (now - timedelta(minutes=5)).timestamp())
+    _log(now)
+    old = _log(old_hour + timedelta(minutes=10))
+
+    refresh_rollups(now)
+    assert _counts(current) == {'SENT': 1}
+    # Older than the watermark and not marked: left alone
+    assert _counts(old_hour) == {}
+
+    MessageLog.objects.filter(id=old.id).update(status='READ')
+    mark_hours_dirty([old_hour + timedelta(minutes=10)])
+    refresh_rollups(now)
+    assert _counts(old_hour) == {'READ': 1}
+    assert not rollup_keys.exists(DIRTY_HOURS_KEY)
+    assert float(rollup_keys.get(WATERMARK_KEY)) == now.timestamp()
@@ -0,0 +1,37 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+
+from core.scheduling import next_occurrence, seconds_until_window
+
+
+def window(start, end):
+    return SimpleNamespace(send_window_start=start, send_window_end=end)
+
+
+def at(hour, minute=0):
+    return datetime(2026, 10, 19, hour, minute, tzinfo=dt_timezone.utc)
+
+
+def test_no_window_means_any_time():
+    assert seconds_until_window(window(None, None), at(3)) == 0
+
+
+def test_daytime_window():
+    business_hours = window(time(9), time(18))
+    assert seconds_until_window(business_hours, at(12)) == 0
+    assert seconds_until_window(business_hours, at(8, 30)) == 30 * 60
+    # After closing, sends carry over to tomorrow morning
+    assert seconds_until_window(business_hours, at(18)) == 15 * 60 * 60
+
+
+def test_window_wrapping_midnight():
+    night = window(time(21), time(6))
+    assert seconds_until_window(night, at(23)) == 0
+    assert seconds_until_window(night, at(2)) == 0
+    assert seconds_until_window(night, at(20)) == 60 * 60
+
+
+def test_next_occurrence_skips_missed_runs():
+    campaign = SimpleNamespace(recurrence='DAILY', scheduled_at=at(9) - timedelta(days=3))
+    assert next_occurrence(campaign, now=at(10)) == at(9) + timedelta(days=1)
+    assert next_occurrence(SimpleNamespace(recurrence='NONE', scheduled_at=at(9))) is None
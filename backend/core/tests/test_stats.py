@@ -0,0 +1,13 @@
+from core.stats import counter_deltas
+
+
+def test_new_log_counts_once_per_funnel_stage():
+    assert counter_deltas(None, 'SENT') == {'sent_count': 1}
+    assert counter_deltas(None, 'FAILED') == {'failed_count': 1}
+
+
+def test_delivery_receipt_moves_log_down_the_funnel():
+    """A SENT -> READ ack bumps delivered and read but leaves sent_count alone."""
+    assert counter_deltas('SENT', 'READ') == {'delivered_count': 1, 'read_count': 1}
+    assert counter_deltas('DELIVERED', 'READ') == {'read_count': 1}
+    assert counter_deltas('READ', 'READ') == {}
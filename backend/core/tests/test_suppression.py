@@ -0,0 +1,39 @@
+import pytest
+
+from core.models import Contact
+from core.suppression import SUPPRESSION_KEY, chat_id_for, sync_contact
+
+
+def test_number_formats_share_one_chat_id():
+    formats = ['9876543210', '09876543210', '+91 98765 43210', '0091-98765-43210', '919876543210']
+    assert {chat_id_for(phone) for phone in formats} == {'919876543210@c.us'}
+
+
+def test_group_ids_pass_through_and_empty_numbers_are_rejected():
+    assert chat_id_for('120363025@g.us') == '120363025@g.us'
+    assert chat_id_for(' - ') is None
+
+
+@pytest.mark.django_db
+def test_number_stays_suppressed_while_another_row_has_opted_out(redis_client):
+    opted_out = Contact.objects.create(phone='919876543210', status='UNSUBSCRIBED')
+    active = Contact.objects.create(phone='+91 98765 43210', status='ACTIVE')
+    redis_client.sadd(SUPPRESSION_KEY, '919876543210@c.us')
+
+    sync_contact(active)
+    active.delete()
+    sync_contact(active, deleted=True)
+    assert redis_client.sismember(SUPPRESSION_KEY, '919876543210@c.us')
+
+    opted_out.delete()
+    sync_contact(opted_out, deleted=True)
+    assert not redis_client.sismember(SUPPRESSION_KEY, '919876543210@c.us')
+
+
+@pytest.mark.django_db
+def test_saving_an_active_row_keeps_a_number_opted_out_in_another_format(redis_client):
+    Contact.objects.create(phone='+91 98765 43210', status='UNSUBSCRIBED')
+    redis_client.sadd(SUPPRESSION_KEY, '919876543210@c.us')
+
+    sync_contact(Contact.objects.create(phone='9876543210', status='ACTIVE'))
+    assert redis_client.sismember(SUPPRESSION_KEY, '919876543210@c.us')
@@ -0,0 +1,22 @@
+from core.tag_counts import TAG_COUNTS_KEY, apply_tag_delta, tag_delta
+
+
+def test_tag_delta_only_counts_changes():
+    """Re-tagging should only move counts for tags that were added or removed."""
+    delta = tag_delta(['Broker', 'Builder'], ['Builder', 'Investor'])
+    assert delta == {'Broker': -1, 'Investor': 1}
+
+
+def test_apply_tag_delta_updates_cached_counts(redis_client):
+    redis_client.delete(TAG_COUNTS_KEY)
+    redis_client.hset(TAG_COUNTS_KEY, mapping={'Broker': 2, 'Builder': 1})
+    apply_tag_delta({'Broker': 1, 'Builder': -1, 'Investor': 3})
+    apply_tag_delta({'Broker': 1})
+    assert redis_client.hgetall(TAG_COUNTS_KEY) == {'Broker': '4', 'Investor': '3'}
+    redis_client.delete(TAG_COUNTS_KEY)
+
+
+def test_apply_tag_delta_without_cached_counts_is_noop(redis_client):
+    redis_client.delete(TAG_COUNTS_KEY)
+    apply_tag_delta({'Broker': 1})
+    assert not redis_client.exists(TAG_COUNTS_KEY)
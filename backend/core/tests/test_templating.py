@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from core.templating import compile_message, pack_digest, DIGEST_SEPARATOR
+
+
+def test_static_bodies_are_sent_verbatim_without_variables():
+    message = compile_message("3 BHK in Worli, 6.75 Cr")
+    assert message.is_static
+    assert message.variables_for(contact=SimpleNamespace(name="Asha Rao", phone="91", tags=[])) == {}
+    assert message.render({}) == "3 BHK in Worli, 6.75 Cr"
+
+
+def test_personalized_body_keeps_only_referenced_variables():
+    message = compile_message('Hi {{ first_name }}!\n\n{% if "Broker" in tags %}2% brokerage{% endif %}\n\n\nCall us')
+    broker = SimpleNamespace(name="Asha Rao", phone="919900000001", tags=["Broker"])
+    buyer = SimpleNamespace(name="Vik", phone="919900000002", tags=["Buyer"])
+
+    variables = message.variables_for(contact=broker)
+    assert variables == {'first_name': 'Asha', 'tags': ['Broker']}
+    assert message.render(variables) == "Hi Asha!\n\n2% brokerage\n\nCall us"
+    assert message.render(message.variables_for(contact=buyer)) == "Hi Vik!\n\nCall us"
+
+
+def test_bodies_are_compiled_once():
+    assert compile_message("Hi {{ name }}") is compile_message("Hi {{ name }}")
+
+
+def test_digest_packs_in_order_under_the_limit():
+    texts = ['a' * 40, 'b' * 40, 'c' * 40, 'd' * 200]
+    separator = len(DIGEST_SEPARATOR)
+    # Two listings plus a separator fit, a third does not; an oversized one goes alone
+    assert pack_digest(texts, limit=80 + separator) == [[0, 1], [2], [3]]
+    assert pack_digest(texts[:3], limit=1000) == [[0, 1, 2]]
+    assert pack_digest([]) == []
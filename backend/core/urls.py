@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     ContactViewSet, ContactCategoryViewSet, PropertyViewSet, CampaignViewSet, 
     PhoneInstanceViewSet, MessageLogViewSet, InstantBroadcastViewSet,
-    WhatsAppGroupViewSet, GroupCollectionViewSet
+    WhatsAppGroupViewSet, GroupCollectionViewSet, WahaNodeViewSet, WahaWebhookViewSet, AnalyticsViewSet,
+    campaign_progress_stream, media_file
 )
 
 router = DefaultRouter()
@@ -12,11 +13,16 @@ router.register(r'contact-categories', ContactCategoryViewSet)
 router.register(r'properties', PropertyViewSet)
 router.register(r'campaigns', CampaignViewSet)
 router.register(r'phones', PhoneInstanceViewSet)
+router.register(r'waha-nodes', WahaNodeViewSet)
 router.register(r'groups', WhatsAppGroupViewSet)
 router.register(r'group-collections', GroupCollectionViewSet)
 router.register(r'logs', MessageLogViewSet)
 router.register(r'broadcast', InstantBroadcastViewSet, basename='broadcast')
+router.register(r'webhooks', WahaWebhookViewSet, basename='webhooks')
+router.register(r'analytics', AnalyticsViewSet, basename='analytics')
 
 urlpatterns = [
+    path('media/<str:sha256>/', media_file, name='media-file'),
+    path('campaigns/<uuid:pk>/progress/', campaign_progress_stream, name='campaign-progress'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
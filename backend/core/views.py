@@ -1,23 +1,42 @@
 import requests
-import time
-import csv
-import io
 import logging
 import os
 import base64
-from django.http import HttpResponse
+import hashlib
+import hmac
+import uuid
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
 from rest_framework import viewsets, status
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+from rest_framework.exceptions import ValidationError
+from django.utils.dateparse import parse_datetime
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from .models import Contact, ContactCategory, Property, Campaign, CampaignSettings, PhoneInstance, MessageLog, WhatsAppGroup, GroupCollection
+from .models import Contact, ContactCategory, Property, Campaign, CampaignSettings, PhoneInstance, MessageLog, WhatsAppGroup, GroupCollection, WahaNode
 from .serializers import (
     ContactSerializer, ContactCategorySerializer, PropertySerializer, CampaignSerializer, 
-    PhoneInstanceSerializer, MessageLogSerializer, WhatsAppGroupSerializer, GroupCollectionSerializer
+    PhoneInstanceSerializer, MessageLogSerializer, WhatsAppGroupSerializer, GroupCollectionSerializer,
+    WahaNodeSerializer
 )
-from .tasks import start_campaign_task
+from .tasks import (
+    start_campaign_task, provision_waha_session, restart_waha_session,
+    stop_waha_session, teardown_waha_session, import_contacts_task,
+    TASK_PRIORITY_INSTANT, import_uploads
+)
+from .waha import waha_headers
+from .circuit_breaker import breaker_for, is_node_failure, OPEN
+from .receipts import enqueue_ack
+from .nodes import assign_node, session_name_for, nodes_with_load, NoNodeCapacity
+from .tag_counts import get_tag_counts, tag_delta, apply_tag_delta
+from .group_resolver import resolve_group_jids, groups_for_collection, invalidate_group_resolution
+from .rollups import BUCKETS, DIMENSIONS, rollup_series, rollup_totals
+from .progress import progress_events, set_progress_status
+from .suppression import chat_id_for, sync_contact, suppress
+from .media import InvalidMedia, store_media, iter_media, mapped, media_info
 
 logger = logging.getLogger(__name__)
 
@@ -26,25 +45,47 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 1000
 
+class MessageLogCursorPagination(CursorPagination):
+    """Keyset pagination on (sent_at, id): every page is an index range scan, however deep."""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = ('-sent_at', '-id')
+
 class PhoneInstanceViewSet(viewsets.ModelViewSet):
     queryset = PhoneInstance.objects.all()
     serializer_class = PhoneInstanceSerializer
 
-    def _get_waha_headers(self):
-        """Standardized headers for all WAHA API interactions using Django settings."""
-        api_key = getattr(settings, 'WAHA_API_KEY', 'secret')
-        return {
-            'X-Api-Key': api_key,
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        }
+    def get_queryset(self):
+        queryset = super().get_queryset().annotate(groups_count=Count('groups'))
+        if 'groups' in self.request.query_params.get('expand', '').split(','):
+            queryset = queryset.prefetch_related('groups')
+        return queryset.order_by('created_at')
+
+    def _node_down_response(self, instance):
+        """Fail fast (503) when the phone's WAHA node circuit is open."""
+        breaker = breaker_for(instance.api_url)
+        if breaker.state() == OPEN:
+            return Response(
+                {"error": "WAHA node unavailable", "retry_after": round(breaker.retry_after())},
+                status=503,
+            )
+        return None
 
     def sync_waha_status(self, instance):
         """Expert Status Sync: Queries the specific engine assigned to this phone."""
+        breaker = breaker_for(instance.api_url)
+        if breaker.state() == OPEN:
+            # Known-dead node: keep the last known status instead of waiting on a timeout
+            return
         # Dynamic base URL based on the IP saved in the database
         base_url = f"{instance.api_url}/api"
         try:
-            r = requests.get(f"{base_url}/sessions/{instance.session_name}", headers=self._get_waha_headers(), timeout=5)
+            r = requests.get(f"{base_url}/sessions/{instance.session_name}", headers=waha_headers(), timeout=5)
+            if is_node_failure(r.status_code):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
             if r.status_code == 200:
                 data = r.json()
                 waha_curr = data.get('status')
@@ -60,103 +101,64 @@ class PhoneInstanceViewSet(viewsets.ModelViewSet):
                 if instance.status != new_status:
                     logger.info(f"DB_SYNC: Phone '{instance.name}' status changed to {new_status}")
                     instance.status = new_status
-                    instance.save()
+                    instance.save(update_fields=['status', 'updated_at'])
             elif r.status_code in [401, 403]:
                 logger.error(f"AUTH_ERROR: WAHA rejected API Key for {instance.name}")
-        except Exception as e:
+        except requests.RequestException as e:
+            breaker.record_failure()
             logger.error(f"DB_SYNC_ERROR: {e}")
-
-    def start_waha_session(self, instance):
-        """Atomic Handshake with registry verification loop. Forces fresh session to ensure config."""
-        base_url = f"{instance.api_url}/api"
-        headers = self._get_waha_headers()
-        logger.info(f"🚀 WAHA SESSION START: {instance.session_name} on {instance.api_url}")
-        
-        try:
-            # 1. Check existing session first (Idempotency)
-            logger.info(f"Checking existing session '{instance.session_name}'...")
-            try:
-                check_req = requests.get(f"{base_url}/sessions/{instance.session_name}", headers=headers, timeout=5)
-                if check_req.status_code == 200:
-                    current_status = check_req.json().get('status')
-                    if current_status in ['WORKING', 'SCAN_QR_CODE', 'STARTING']:
-                        logger.info(f"Session '{instance.session_name}' is already {current_status}. Skipping recreation.")
-                        self.sync_waha_status(instance)
-                        return
-            except Exception as e:
-                logger.warning(f"Pre-check failed: {e}")
-
-            # 2. Cleanup stale session ONLY if needed
-            logger.info(f"Cleanup: Removing stale/failed session '{instance.session_name}'...")
-            try:
-                requests.post(f"{base_url}/sessions/{instance.session_name}/stop", headers=headers, timeout=5)
-                time.sleep(1)
-                requests.delete(f"{base_url}/sessions/{instance.session_name}", headers=headers, timeout=5)
-                time.sleep(2)
-            except Exception as e:
-                logger.warning(f"Cleanup non-fatal error: {e}")
-
-            # 3. Create new session with CORRECT CONFIG
-            logger.info(f"ENGINE: Initializing session registry for {instance.session_name}...")
-            payload = {
-                'name': instance.session_name,
-                'start': True,
-                'config': {
-                    'noweb': {
-                        'store': {
-                            'enabled': True,
-                            'fullSync': True
-                        }
-                    }
-                }
-            }
-            create_resp = requests.post(f"{base_url}/sessions", json=payload, headers=headers, timeout=10)
-            logger.info(f"✅ Session created: {create_resp.status_code}")
-            
-            # 3. Final Verification
-            time.sleep(4)
-            curr_resp = requests.get(f"{base_url}/sessions/{instance.session_name}", headers=headers)
-            if curr_resp.status_code == 200:
-                curr = curr_resp.json()
-                if curr.get('status') not in ['WORKING', 'STARTING', 'SCAN_QR_CODE']:
-                    start_resp = requests.post(f"{base_url}/sessions/{instance.session_name}/start", headers=headers, timeout=10)
-                    logger.info(f"▶️ Session started: {start_resp.status_code}")
-                    
         except Exception as e:
-            logger.error(f"❌ ENGINE_START_ERROR: {e}")
+            logger.error(f"DB_SYNC_ERROR: {e}")
 
     def perform_create(self, serializer):
         """
-        Multi-Node Round Robin Assignment:
-        - First Phone -> Node 1 (172.19.0.7)
-        - Second Phone -> Node 2 (172.19.0.4)
+        Capacity-aware node assignment: the phone goes to the healthy WAHA node
+        with the lowest load (see core.nodes). The WAHA session itself is brought
+        up in the background (provision_waha_session); clients follow
+        provisioning_state instead of waiting on the request.
         """
-        existing_count = PhoneInstance.objects.count()
-        session_name = "default"
-        
-        # IPS RETRIEVED FROM DOCKER INSPECT
-        NODE_1_IP = "http://waha:3000"
-        NODE_2_IP = "http://waha2:3000"
-        
-        if existing_count % 2 == 0:
-            api_url = NODE_1_IP
-        else:
-            api_url = NODE_2_IP
-
-        logger.info(f"🆕 Creating Phone #{existing_count + 1} on Node: {api_url}")
-        instance = serializer.save(session_name=session_name, api_url=api_url)
-        self.start_waha_session(instance)
+        phone_id = uuid.uuid4()
+        with transaction.atomic():
+            try:
+                node = assign_node()
+            except NoNodeCapacity as e:
+                raise ValidationError({"error": str(e)})
+            logger.info(f"🆕 Creating Phone on Node: {node.name} ({node.api_url})")
+            instance = serializer.save(
+                id=phone_id,
+                node=node,
+                api_url=node.api_url,
+                session_name=session_name_for(node, phone_id),
+                provisioning_state='PENDING',
+            )
+        transaction.on_commit(lambda: provision_waha_session.delay(instance.id))
 
     def perform_destroy(self, instance):
-        base_url = f"{instance.api_url}/api"
-        headers = self._get_waha_headers()
-        try:
-            requests.post(f"{base_url}/sessions/{instance.session_name}/stop", headers=headers, timeout=5)
-            time.sleep(1)
-            requests.delete(f"{base_url}/sessions/{instance.session_name}", headers=headers, timeout=5)
-        except:
-            pass
+        teardown_waha_session.delay(instance.api_url, instance.session_name)
         instance.delete()
+        invalidate_group_resolution()
+
+    def _lifecycle_response(self, instance, task):
+        """Record PENDING first, then queue the task, so the worker's transitions land after ours."""
+        with transaction.atomic():
+            instance.record_transition('PENDING')
+            transaction.on_commit(lambda: task.delay(instance.id))
+        return Response(
+            {"id": str(instance.id), "provisioning_state": instance.provisioning_state},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(detail=True, methods=['post'])
+    def start(self, request, pk=None):
+        return self._lifecycle_response(self.get_object(), provision_waha_session)
+
+    @action(detail=True, methods=['post'])
+    def restart(self, request, pk=None):
+        return self._lifecycle_response(self.get_object(), restart_waha_session)
+
+    @action(detail=True, methods=['post'])
+    def stop(self, request, pk=None):
+        return self._lifecycle_response(self.get_object(), stop_waha_session)
 
     @action(detail=True, methods=['get'])
     def qr(self, request, pk=None):
@@ -165,8 +167,11 @@ class PhoneInstanceViewSet(viewsets.ModelViewSet):
         Uses instance.api_url to target the correct node (172.19.0.7 or .4).
         """
         instance = self.get_object()
+        unavailable = self._node_down_response(instance)
+        if unavailable:
+            return unavailable
         base_url = f"{instance.api_url}/api"
-        headers = self._get_waha_headers()
+        headers = waha_headers()
         try:
             # Fetch as JSON to get base64 string
             qr_res = requests.get(
@@ -193,6 +198,9 @@ class PhoneInstanceViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def request_code(self, request, pk=None):
         instance = self.get_object()
+        unavailable = self._node_down_response(instance)
+        if unavailable:
+            return unavailable
         phone_number = request.data.get('phoneNumber')
         if not phone_number:
             return Response({"error": "Phone number required"}, status=400)
@@ -201,7 +209,7 @@ class PhoneInstanceViewSet(viewsets.ModelViewSet):
             r = requests.post(
                 f"{base_url}/{instance.session_name}/auth/request-code",
                 json={"phoneNumber": phone_number},
-                headers=self._get_waha_headers(),
+                headers=waha_headers(),
                 timeout=10
             )
             if r.status_code in [200, 201]:
@@ -213,8 +221,11 @@ class PhoneInstanceViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def sync_groups(self, request, pk=None):
         instance = self.get_object()
+        unavailable = self._node_down_response(instance)
+        if unavailable:
+            return unavailable
         base_url = f"{instance.api_url}/api"
-        headers = self._get_waha_headers()
+        headers = waha_headers()
         try:
             # Increase limit allow for all chats (even if not groups) to be fetched
             # Increase timeout to handle large payloads
@@ -241,6 +252,7 @@ class PhoneInstanceViewSet(viewsets.ModelViewSet):
                             }
                         )
                         synced_count += 1
+                invalidate_group_resolution()
                 return Response({'message': f'Synced {synced_count} groups'})
             return Response({'error': f'WAHA Error {r.status_code}: {r.text}'}, status=r.status_code)
         except Exception as e:
@@ -252,14 +264,39 @@ class PhoneInstanceViewSet(viewsets.ModelViewSet):
         return super().retrieve(request, *args, **kwargs)
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        for instance in queryset:
+        # Plain queryset: the status sync needs neither the group count nor prefetched groups
+        for instance in PhoneInstance.objects.all():
             self.sync_waha_status(instance)
         return super().list(request, *args, **kwargs)
 
+class WahaNodeViewSet(viewsets.ModelViewSet):
+    """Registry of WAHA containers; session_count is the number of phones hosted."""
+    queryset = nodes_with_load()
+    serializer_class = WahaNodeSerializer
+
 class WhatsAppGroupViewSet(viewsets.ModelViewSet):
-    queryset = WhatsAppGroup.objects.all()
+    queryset = WhatsAppGroup.objects.all().order_by('name', 'id')
     serializer_class = WhatsAppGroupSerializer
+    pagination_class = StandardResultsSetPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        phone = self.request.query_params.get('phone')
+        if phone:
+            queryset = queryset.filter(phone_instance_id=phone)
+        return queryset
+
+    def perform_create(self, serializer):
+        serializer.save()
+        invalidate_group_resolution()
+
+    def perform_update(self, serializer):
+        serializer.save()
+        invalidate_group_resolution()
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        invalidate_group_resolution()
 
 class GroupCollectionViewSet(viewsets.ModelViewSet):
     queryset = GroupCollection.objects.all()
@@ -270,6 +307,11 @@ class ContactCategoryViewSet(viewsets.ModelViewSet):
     queryset = ContactCategory.objects.all()
     serializer_class = ContactCategorySerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['tag_counts'] = get_tag_counts()
+        return context
+
 class ContactViewSet(viewsets.ModelViewSet):
     """Manage Contacts"""
     queryset = Contact.objects.all().order_by('-imported_at')
@@ -291,15 +333,51 @@ class ContactViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def perform_create(self, serializer):
+        contact = serializer.save()
+        apply_tag_delta(tag_delta([], contact.tags))
+        sync_contact(contact)
+
+    def perform_update(self, serializer):
+        old_tags = list(serializer.instance.tags or [])
+        old_phone = serializer.instance.phone
+        contact = serializer.save()
+        apply_tag_delta(tag_delta(old_tags, contact.tags))
+        if old_phone != contact.phone:
+            sync_contact(Contact(phone=old_phone), deleted=True)
+        sync_contact(contact)
+
+    def perform_destroy(self, instance):
+        old_tags = list(instance.tags or [])
+        instance.delete()
+        apply_tag_delta(tag_delta(old_tags, []))
+        sync_contact(instance, deleted=True)
+
+    @action(detail=False, methods=['POST'])
+    def opt_out(self, request):
+        """
+        Unsubscribe a number, effective for sends already in progress (core.suppression).
+        Matches contacts by normalized number (Contact.chat_id); unknown numbers get an UNSUBSCRIBED contact
+        so the opt-out survives a rebuild of the suppression list.
+        """
+        phone = str(request.data.get('phone', '')).strip()
+        chat_id = chat_id_for(phone)
+        if not chat_id or '@c.us' not in chat_id:
+            return Response({"error": "A phone number is required"}, status=status.HTTP_400_BAD_REQUEST)
+        digits = chat_id.split('@', 1)[0]
+        matches = Contact.objects.filter(chat_id=chat_id)
+        updated = matches.exclude(status='BLOCKED').update(status='UNSUBSCRIBED')
+        if not matches.exists():
+            Contact.objects.create(phone=digits, status='UNSUBSCRIBED')
+            updated = 1
+        suppress([digits])
+        return Response({"chat_id": chat_id, "contacts_updated": updated})
+
     @action(detail=False, methods=['POST'])
     def bulk_import(self, request):
         file = request.FILES.get('file')
         if not file:
             return Response({"error": "No file uploaded"}, status=status.HTTP_400_BAD_REQUEST)
-        decoded_file = file.read().decode('utf-8')
-        io_string = io.StringIO(decoded_file)
-        reader = csv.DictReader(io_string)
-        count = 0
         tags = request.data.get('tags')  # Check for tags in the request
         tag_list = []
         if tags:
@@ -309,45 +387,17 @@ class ContactViewSet(viewsets.ModelViewSet):
             else:
                 tag_list = [t.strip() for t in tags.split(',') if t.strip()]
 
-        for row in reader:
-            raw_phone = row.get('phone', '').strip()
-            name = row.get('name', '').strip()
-            
-            if raw_phone:
-                # Normalization Logic
-                # 1. Remove all non-digit characters
-                clean_phone = ''.join(filter(str.isdigit, raw_phone))
-                
-                # 2. Strip leading zeros (handle 098... or 0091...)
-                clean_phone = clean_phone.lstrip('0')
-                
-                # 3. Handle missing country code (Assume India 91 if 10 digits)
-                if len(clean_phone) == 10:
-                    clean_phone = '91' + clean_phone
-                
-                # 4. Basic Validation (WhatsApp numbers are usually 10-15 digits)
-                if 10 <= len(clean_phone) <= 15:
-                    contact, created = Contact.objects.update_or_create(
-                        phone=clean_phone, 
-                        defaults={'name': name, 'status': 'ACTIVE'}
-                    )
-                
-                    # Add tags if provided
-                    if tag_list:
-                        # using set to avoid duplicates
-                        current_tags = set(contact.tags or [])
-                        current_tags.update(tag_list)
-                        contact.tags = list(current_tags)
-                        contact.save()
-                    
-                    count += 1
-                else:
-                    # Skip invalid numbers silently as requested
-                    pass
-        return Response({"message": f"Imported {count} contacts successfully"})
+        # Parsing and upserts run on the imports queue so large files don't hold a web worker;
+        # the file goes through shared storage, only its name through the broker
+        upload_name = import_uploads.save(f"{uuid.uuid4()}.csv", file)
+        result = import_contacts_task.delay(upload_name, tag_list)
+        return Response(
+            {"message": "Import started", "task_id": result.id},
+            status=status.HTTP_202_ACCEPTED,
+        )
 
 class PropertyViewSet(viewsets.ModelViewSet):
-    queryset = Property.objects.all()
+    queryset = Property.objects.select_related('media').defer('media__data')
     serializer_class = PropertySerializer
 
     def perform_create(self, serializer):
@@ -357,6 +407,23 @@ class PropertyViewSet(viewsets.ModelViewSet):
             title = f"Property {timezone.now().strftime('%Y-%m-%d %H:%M')}"
         serializer.save(title=title)
 
+    @action(detail=True, methods=['POST', 'DELETE'])
+    def media(self, request, pk=None):
+        """Attach (POST, multipart `file`) or remove (DELETE) the photo sent with this property."""
+        property_obj = self.get_object()
+        if request.method == 'DELETE':
+            property_obj.media = None
+        else:
+            file = request.FILES.get('file')
+            if not file:
+                return Response({"error": "No file uploaded"}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                property_obj.media = store_media(file.read(), file.name or '')
+            except InvalidMedia as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        property_obj.save(update_fields=['media', 'updated_at'])
+        return Response(self.get_serializer(property_obj).data)
+
     @action(detail=True, methods=['POST'])
     def quick_send(self, request, pk=None):
         property_obj = self.get_object()
@@ -376,11 +443,11 @@ class PropertyViewSet(viewsets.ModelViewSet):
         campaign.properties.add(property_obj)
         from .models import CampaignSettings
         CampaignSettings.objects.create(campaign=campaign)
-        start_campaign_task.delay(campaign.id)
+        start_campaign_task.apply_async(args=[campaign.id], kwargs={'priority': TASK_PRIORITY_INSTANT}, priority=TASK_PRIORITY_INSTANT)
         return Response({"message": "Broadcasting now!", "campaign_id": str(campaign.id)})
 
 class CampaignViewSet(viewsets.ModelViewSet):
-    queryset = Campaign.objects.all()
+    queryset = Campaign.objects.select_related('settings').prefetch_related('properties', 'target_groups')
     serializer_class = CampaignSerializer
 
     @action(detail=True, methods=['POST'])
@@ -390,15 +457,25 @@ class CampaignViewSet(viewsets.ModelViewSet):
             return Response({"error": "Campaign already running"}, status=400)
         if campaign.status in ['COMPLETED', 'FAILED']:
             campaign.status = 'DRAFT'
-            campaign.save()
+            campaign.save(update_fields=['status', 'updated_at'])
         start_campaign_task.delay(campaign.id)
         return Response({"message": "Started"})
 
+    @action(detail=True, methods=['GET'])
+    def simulate(self, request, pk=None):
+        """Dry run under the current settings and phones: projected duration, per-phone load, hourly curve."""
+        campaign = self.get_object()
+        projection = start_campaign_task(campaign.id, dry_run=True)
+        if 'error' in projection:
+            return Response(projection, status=400)
+        return Response(projection)
+
     @action(detail=True, methods=['POST'])
     def pause(self, request, pk=None):
         campaign = self.get_object()
         campaign.status = 'PAUSED'
-        campaign.save()
+        campaign.save(update_fields=['status', 'updated_at'])
+        set_progress_status(campaign.id, 'PAUSED')
         return Response({"status": "Paused"})
 
 class InstantBroadcastViewSet(viewsets.ViewSet):
@@ -419,7 +496,8 @@ class InstantBroadcastViewSet(viewsets.ViewSet):
                 collection = GroupCollection.objects.get(id=collection_id)
                 # Resolve JIDs (group_ids) to current DB IDs (rows)
                 # This ensures we only target groups that currently exist/are synced
-                collection_group_db_ids = list(WhatsAppGroup.objects.filter(group_id__in=collection.group_ids).values_list('id', flat=True))
+                resolved = resolve_group_jids(collection.group_ids)
+                collection_group_db_ids = [g['id'] for g in groups_for_collection(collection.group_ids, resolved)]
                 
                 # Combine with manually selected groups
                 target_groups = list(set(target_groups + [str(g) for g in collection_group_db_ids]))
@@ -460,9 +538,149 @@ class InstantBroadcastViewSet(viewsets.ViewSet):
             campaign.target_groups.set(target_groups)
         from .models import CampaignSettings
         CampaignSettings.objects.create(campaign=campaign)
-        start_campaign_task.delay(campaign.id)
+        start_campaign_task.apply_async(args=[campaign.id], kwargs={'priority': TASK_PRIORITY_INSTANT}, priority=TASK_PRIORITY_INSTANT)
         return Response({"message": "Broadcasting now!", "campaign_id": str(campaign.id)})
 
+class WahaWebhookViewSet(viewsets.ViewSet):
+    """
+    Receives WAHA webhooks. Events are only queued in Redis here so the response
+    is immediate; core.receipts applies them in batches from a Celery task.
+    WAHA has no user session, so every request must carry the HMAC of its body
+    signed with WAHA_WEBHOOK_HMAC_KEY; without a key configured nothing is accepted.
+    """
+    authentication_classes = []
+    permission_classes = []
+
+    def _verify_hmac(self, request):
+        key = getattr(settings, 'WAHA_WEBHOOK_HMAC_KEY', '')
+        if not key:
+            logger.error("WEBHOOK: WAHA_WEBHOOK_HMAC_KEY is not set; rejecting unsigned webhook")
+            return False
+        expected = hmac.new(key.encode(), request.body, hashlib.sha512).hexdigest()
+        return hmac.compare_digest(expected, request.headers.get('X-Webhook-Hmac', ''))
+
+    @action(detail=False, methods=['POST'])
+    def waha(self, request):
+        if not self._verify_hmac(request):
+            return Response({"error": "Invalid signature"}, status=403)
+        event = request.data
+        events = event if isinstance(event, list) else [event]
+        queued = 0
+        for item in events:
+            if isinstance(item, dict) and item.get('event') == 'message.ack':
+                queued += enqueue_ack(item.get('payload') or {})
+        return Response({"queued": queued})
+
 class MessageLogViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = MessageLog.objects.all().order_by('-sent_at')
+    queryset = MessageLog.objects.select_related('campaign', 'contact', 'property', 'body').order_by('-sent_at', '-id')
     serializer_class = MessageLogSerializer
+    pagination_class = MessageLogCursorPagination
+
+    def _parse_time(self, param):
+        value = self.request.query_params.get(param)
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValidationError({param: "Expected an ISO 8601 datetime"})
+        return parsed
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+
+        for param, lookup in (('campaign', 'campaign_id'), ('platform', 'platform'), ('status', 'status')):
+            value = params.get(param)
+            if value:
+                queryset = queryset.filter(**{lookup: value})
+
+        since = self._parse_time('since')
+        until = self._parse_time('until')
+        if since:
+            queryset = queryset.filter(sent_at__gte=since)
+        if until:
+            queryset = queryset.filter(sent_at__lt=until)
+
+        return queryset
+
+class AnalyticsViewSet(viewsets.ViewSet):
+    """
+    Dashboard numbers served from the hourly MessageRollup table (core.rollups), so a
+    chart over months reads a few hundred rows instead of scanning MessageLog.
+    Filters: since, until, campaign, phone, platform. bucket=hour|day,
+    group_by=status,error_class,... (any of campaign, phone_instance, platform, status, error_class).
+    """
+
+    def _filters(self, request):
+        params = request.query_params
+        filters = {}
+        for param, lookup in (('campaign', 'campaign_id'), ('phone', 'phone_instance_id'), ('platform', 'platform')):
+            value = params.get(param)
+            if value:
+                filters[lookup] = value
+        for param, lookup in (('since', 'hour__gte'), ('until', 'hour__lt')):
+            value = params.get(param)
+            if value:
+                parsed = parse_datetime(value)
+                if parsed is None:
+                    raise ValidationError({param: "Expected an ISO 8601 datetime"})
+                filters[lookup] = parsed
+        return filters
+
+    def _group_by(self, request, default):
+        fields = [field for field in request.query_params.get('group_by', default).split(',') if field]
+        unknown = [field for field in fields if field not in DIMENSIONS]
+        if unknown:
+            raise ValidationError({"group_by": f"Unknown dimensions: {', '.join(unknown)}"})
+        return fields
+
+    def list(self, request):
+        """Totals by status and by error class for the filtered range."""
+        filters = self._filters(request)
+        return Response({
+            "status": rollup_totals(filters, ['status']),
+            "errors": rollup_totals({**filters, 'status': 'FAILED'}, ['error_class']),
+        })
+
+    @action(detail=False, methods=['GET'])
+    def timeseries(self, request):
+        bucket = request.query_params.get('bucket', 'hour')
+        if bucket not in BUCKETS:
+            raise ValidationError({"bucket": f"Expected one of: {', '.join(BUCKETS)}"})
+        filters = self._filters(request)
+        return Response(rollup_series(filters, bucket, self._group_by(request, 'status')))
+
+async def campaign_progress_stream(request, pk):
+    """
+    Server-Sent Events with live progress of one campaign, relayed from Redis pub/sub
+    (core.progress). Async so an idle stream holds no worker: served by the ASGI app
+    (the `stream` service), not gunicorn.
+    """
+    response = StreamingHttpResponse(progress_events(pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def media_file(request, sha256):
+    """
+    Property images by content hash, for WAHA nodes and the UI. Served from a per-process
+    memory map of the disk cache, with the type and size cached per process too, so after
+    the first fetch a worker serves a campaign photo with no disk reads or database queries.
+    Content-addressed URLs never change, hence immutable.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponse(status=405)
+    info = media_info(sha256)
+    if info is None:
+        raise Http404("Unknown media")
+    content_type, size = info
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+    else:
+        # Map (writing the disk cache if needed) before the response starts, so a failure is a 500, not a cut-off body
+        mapped(sha256)
+        response = StreamingHttpResponse(iter_media(sha256), content_type=content_type)
+    response['Content-Length'] = size
+    response['ETag'] = f'"{sha256}"'
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
@@ -0,0 +1,102 @@
+import time
+import logging
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# WAHA API URL (Internal Docker Network)
+WAHA_URL = "http://waha:3000"
+
+# Session states reported by WAHA that mean "alive, leave it alone"
+ACTIVE_SESSION_STATES = ['WORKING', 'SCAN_QR_CODE', 'STARTING']
+
+
+def waha_headers():
+    """Standardized headers for all WAHA API interactions using Django settings."""
+    api_key = getattr(settings, 'WAHA_API_KEY', 'secret')
+    return {
+        'X-Api-Key': api_key,
+        'Content-Type': 'application/json',
+        'Accept': 'application/json'
+    }
+
+
+def session_config():
+    """Session config sent on creation (NOWEB store must be on for group sync)."""
+    config = {
+        'noweb': {
+            'store': {
+                'enabled': True,
+                'fullSync': True
+            }
+        }
+    }
+    webhook_url = getattr(settings, 'WAHA_WEBHOOK_URL', '')
+    if webhook_url:
+        # Delivery/read receipts -> /api/webhooks/waha/ (see core.receipts)
+        webhook = {'url': webhook_url, 'events': ['message.ack']}
+        hmac_key = getattr(settings, 'WAHA_WEBHOOK_HMAC_KEY', '')
+        if hmac_key:
+            webhook['hmac'] = {'key': hmac_key}
+        config['webhooks'] = [webhook]
+    return config
+
+
+def get_session(api_url, session_name, timeout=5):
+    """Current session JSON, or None if WAHA doesn't know the session."""
+    r = requests.get(f"{api_url}/api/sessions/{session_name}", headers=waha_headers(), timeout=timeout)
+    if r.status_code == 404:
+        return None
+    r.raise_for_status()
+    return r.json()
+
+
+def get_session_status(api_url, session_name, timeout=5):
+    session = get_session(api_url, session_name, timeout=timeout)
+    return session.get('status') if session else None
+
+
+def create_session(api_url, session_name, start=True, timeout=10):
+    payload = {
+        'name': session_name,
+        'start': start,
+        'config': session_config(),
+    }
+    return requests.post(f"{api_url}/api/sessions", json=payload, headers=waha_headers(), timeout=timeout)
+
+
+def start_session(api_url, session_name, timeout=10):
+    return requests.post(f"{api_url}/api/sessions/{session_name}/start", headers=waha_headers(), timeout=timeout)
+
+
+def stop_session(api_url, session_name, timeout=5):
+    return requests.post(f"{api_url}/api/sessions/{session_name}/stop", headers=waha_headers(), timeout=timeout)
+
+
+def delete_session(api_url, session_name, timeout=5):
+    return requests.delete(f"{api_url}/api/sessions/{session_name}", headers=waha_headers(), timeout=timeout)
+
+
+def wait_for_session(api_url, session_name, predicate, timeout=30, initial_delay=0.5, max_delay=5.0):
+    """
+    Poll the session with exponential backoff until predicate(status) is true.
+    status is None when the session doesn't exist. Returns the matching status,
+    or raises TimeoutError with the last status seen.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    last_status = None
+    while True:
+        try:
+            last_status = get_session_status(api_url, session_name)
+            if predicate(last_status):
+                return last_status
+        except requests.RequestException as e:
+            logger.debug(f"WAHA_POLL: {session_name} on {api_url} not reachable yet: {e}")
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Session '{session_name}' on {api_url} stuck in {last_status}")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
@@ -81,7 +81,8 @@ export default function Broadcast() {
 
     const fetchPhones = async () => {
         try {
-            const res = await api.get('/phones/');
+            // Groups are only embedded when explicitly expanded
+            const res = await api.get('/phones/', { params: { expand: 'groups' } });
             // DRF returns paginated response { results: [...] } if pagination is enabled
             const phoneData = Array.isArray(res.data) ? res.data : (res.data.results || []);
             setPhones(phoneData);
@@ -153,7 +153,7 @@ export default function Contacts() {
                 headers: { 'Content-Type': 'multipart/form-data' }
             });
 
-            alert('Contacts imported successfully!');
+            alert('Import started. Contacts will appear as they are processed.');
             setFile(null);
             fetchContacts();
             setImporting(false);
@@ -73,6 +73,15 @@ export default function PhoneManager() {
         } catch (e) { }
     };
 
+    const openGroupList = async (phone: any) => {
+        setGroupList({ id: phone.id, name: phone.name, count: phone.groups_count, groups: [] });
+        try {
+            const res = await api.get('/groups/', { params: { phone: phone.id, page_size: 1000 } });
+            const groups = Array.isArray(res.data) ? res.data : (res.data.results || []);
+            setGroupList({ id: phone.id, name: phone.name, count: phone.groups_count, groups });
+        } catch (e) { }
+    };
+
     const [selectedNode, setSelectedNode] = useState('http://waha:3000');
 
     const handleConnect = async (e: React.FormEvent) => {
@@ -188,13 +197,18 @@ export default function PhoneManager() {
                             <Badge variant={phone.status === 'CONNECTED' ? 'default' : 'destructive'} className="rounded-full px-4">
                                 {phone.status}
                             </Badge>
+                            {phone.provisioning_state && phone.provisioning_state !== 'READY' && (
+                                <p className="mt-2 text-xs text-slate-500" title={phone.provisioning_error || ''}>
+                                    Session: {phone.provisioning_state.toLowerCase()}
+                                </p>
+                            )}
                             {phone.groups_count !== undefined && (
                                 <div className="mt-4 flex items-center justify-between bg-slate-100 p-2 rounded-lg">
                                     <div className="flex items-center gap-2 text-slate-600">
                                         <Users className="h-4 w-4" />
                                         <span className="text-xs font-medium">{phone.groups_count} Groups</span>
                                     </div>
-                                    <Button variant="ghost" size="sm" className="h-6 text-[10px] uppercase font-bold text-blue-500 hover:text-blue-700" onClick={() => setGroupList({ id: phone.id, name: phone.name, count: phone.groups_count, groups: phone.groups })}>
+                                    <Button variant="ghost" size="sm" className="h-6 text-[10px] uppercase font-bold text-blue-500 hover:text-blue-700" onClick={() => openGroupList(phone)}>
                                         View All
                                     </Button>
                                 </div>